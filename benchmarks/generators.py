@@ -0,0 +1,152 @@
+"""
+Synthetic data generators for the benchmark suite.
+
+Each generator produces input in the exact shape a processor reads, at
+any multiple of the real dataset size:
+- GRAS notices and FDA substances: rows resampled from the source exports,
+  written back with the same preamble lines, header and latin1 encoding
+- WHO obesity: rows resampled from BEFA58B_ALL_LATEST.csv
+- CDC obesity: Socrata JSON payload records with the API's field names
+- FSIS recalls: API JSON payload records rebuilt from the processed recalls
+
+Resampling keeps the real value distributions (HTML, entities, date and
+CAS formats), so cleaning and parsing costs scale like production data.
+"""
+
+import csv
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SOURCE_DIR = REPO_ROOT / 'etl/data/source'
+PROCESSED_DIR = REPO_ROOT / 'etl/data/processed'
+
+# Rows produced at scale 1, roughly the size of the real datasets
+BASE_ROWS = {
+    'gras': 1219,
+    'fda': 3971,
+    'who': 20790,
+    'cdc': 13260,
+    'fsis': 1364
+}
+
+
+def _read_export(path: Path, preamble_lines: int):
+    """Preamble text, header and data rows of an FDA export (latin1, quoted fields)"""
+    with path.open(encoding='latin1', newline='') as f:
+        preamble = ''.join(f.readline() for _ in range(preamble_lines))
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+    return preamble, header, rows
+
+
+def _write_export(path: Path, preamble: str, header: List[str], rows: List[List[str]]) -> None:
+    with path.open('w', encoding='latin1', newline='') as f:
+        f.write(preamble)
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def generate_gras(scale: float, path: Path, seed: int = 0) -> int:
+    """GRASNotices.csv at `scale` times the real size, with unique GRN numbers"""
+    preamble, header, rows = _read_export(SOURCE_DIR / 'GRASNotices.csv', 2)
+    rng = np.random.default_rng(seed)
+    n = max(int(BASE_ROWS['gras'] * scale), 1)
+    sampled = []
+    for i, index in enumerate(rng.integers(0, len(rows), n)):
+        row = list(rows[index])
+        row[0] = f'=T("{i + 1}")'
+        sampled.append(row)
+    _write_export(path, preamble, header, sampled)
+    return n
+
+
+def generate_fda(scale: float, path: Path, seed: int = 0) -> int:
+    """FoodSubstances.csv at `scale` times the real size"""
+    preamble, header, rows = _read_export(SOURCE_DIR / 'FoodSubstances.csv', 4)
+    rng = np.random.default_rng(seed)
+    n = max(int(BASE_ROWS['fda'] * scale), 1)
+    _write_export(path, preamble, header, [rows[i] for i in rng.integers(0, len(rows), n)])
+    return n
+
+
+def generate_who(scale: float, path: Path, seed: int = 0) -> int:
+    """BEFA58B_ALL_LATEST.csv at `scale` times the real size"""
+    source = pd.read_csv(SOURCE_DIR / 'BEFA58B_ALL_LATEST.csv', dtype=str, keep_default_na=False)
+    n = max(int(BASE_ROWS['who'] * scale), 1)
+    source.sample(n, replace=True, random_state=seed).to_csv(path, index=False)
+    return n
+
+
+def generate_cdc_payload(scale: float, seed: int = 0) -> bytes:
+    """JSON body of the CDC nutrition/obesity API with `scale` times the base record count"""
+    from geography import STATES  # etl/scripts must be on sys.path
+
+    rng = np.random.default_rng(seed)
+    n = max(int(BASE_ROWS['cdc'] * scale), 1)
+    locations = pd.DataFrame(
+        [(abbr, 'National' if code == 0 else name) for code, abbr, name in STATES],
+        columns=['locationabbr', 'locationdesc']
+    )
+    strata = pd.DataFrame(
+        [('Sex', 'Male'), ('Sex', 'Female'), ('Age (years)', '18 - 24'), ('Income', '$50,000 - $74,999')],
+        columns=['stratificationcategory1', 'stratification1']
+    )
+
+    years = rng.integers(2011, 2024, n)
+    values = pd.Series(25 + (years - 2011) * 0.5 + rng.normal(0, 3, n)).round(1)
+    values[rng.random(n) < 0.05] = np.nan
+    payload = pd.concat([
+        locations.iloc[rng.integers(0, len(locations), n)].reset_index(drop=True),
+        strata.iloc[rng.integers(0, len(strata), n)].reset_index(drop=True)
+    ], axis=1)
+    payload.insert(0, 'yearstart', years.astype(str))
+    payload.insert(1, 'yearend', payload['yearstart'])
+    payload['datasource'] = 'BRFSS'
+    payload['class'] = payload['topic'] = 'Obesity / Weight Status'
+    payload['question'] = 'Percent of adults aged 18 years and older who have obesity'
+    payload['data_value_type'] = 'Value'
+    # Socrata sends numbers as strings and leaves out missing values
+    payload['data_value'] = payload['data_value_alt'] = values.map('{:.1f}'.format).where(values.notna())
+    payload['low_confidence_limit'] = (values - 2).map('{:.1f}'.format).where(values.notna())
+    payload['high_confidence_limit'] = (values + 2).map('{:.1f}'.format).where(values.notna())
+    payload['sample_size'] = rng.integers(100, 5000, n).astype(str)
+    payload['classid'], payload['topicid'], payload['questionid'] = 'OWS', 'OWS1', 'Q036'
+    return payload.to_json(orient='records').encode()
+
+
+def generate_fsis_payload(scale: float, seed: int = 0) -> bytes:
+    """JSON body of the FSIS recall API rebuilt from the processed recalls, `scale` times the base count"""
+    recalls = pd.read_csv(PROCESSED_DIR / 'processed_fsis_recalls.csv', dtype=str, keep_default_na=False)
+    n = max(int(BASE_ROWS['fsis'] * scale), 1)
+    sampled = recalls.sample(n, replace=True, random_state=seed).reset_index(drop=True)
+
+    quantity = pd.to_numeric(sampled['quantity_lbs'], errors='coerce')
+    ids = pd.RangeIndex(n)
+    payload = pd.DataFrame({
+        'field_title': sampled['title'],
+        'field_recall_number': [f"{i % 1000:03d}-{i // 1000:05d}" for i in ids],
+        'field_recall_date': sampled['recall_date'],
+        'field_closed_date': sampled['closed_date'],
+        'field_last_modified_date': sampled['recall_date'],
+        'field_establishment': sampled['establishment'],
+        'field_risk_level': sampled['risk_level_raw'],
+        'field_recall_reason': sampled['recall_reason'],
+        'field_recall_type': sampled['recall_type'],
+        'field_related_to_outbreak': sampled['related_to_outbreak'],
+        'field_active_notice': sampled['is_active'],
+        'field_product_items': sampled['products'],
+        'field_processing': sampled['processing_type'],
+        # The processor splits on commas, so "A| B" in the output came from "A, B"
+        'field_states': sampled['states'].str.replace('|', ',', regex=False),
+        'field_qty_recovered': quantity.map('{:,.0f} pounds'.format).where(quantity.notna(), ''),
+        'field_summary': '<p>' + sampled['title'] + '</p>',
+        'langcode': 'English'
+    })
+    return payload.to_json(orient='records').encode()
+
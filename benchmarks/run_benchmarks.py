@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the ETL processors and the verification analyses.
+
+For every scale, synthetic inputs are generated (see generators.py), then
+each processor's read and process steps run on them, their outputs are
+written as the processed datasets, and every DataVerifier section runs on
+those. Each step records wall time, throughput and peak traced memory.
+
+Timing and memory are measured in separate passes because tracemalloc
+slows allocation-heavy code considerably; the timing pass keeps the best
+of several runs. Results go to results.json; with a stored baseline,
+steps whose throughput drops or whose peak memory grows beyond the
+tolerance are flagged and the exit status is 1. Baselines are machine
+specific and are not committed.
+
+Usage (from the repository root):
+    python benchmarks/run_benchmarks.py --scales 1 10 100
+    python benchmarks/run_benchmarks.py --scales 1 --save-baseline
+    python benchmarks/run_benchmarks.py --only gras fda --scales 1000
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+sys.path[:0] = [str(REPO_ROOT / 'etl/scripts'), str(REPO_ROOT / 'verification')]
+
+import generators  # noqa: E402
+from geography import save_tables  # noqa: E402
+
+RESULTS_FILE = BENCH_DIR / 'results.json'
+BASELINE_FILE = BENCH_DIR / 'baseline.json'
+PROCESSORS = ['gras', 'fda', 'who', 'cdc', 'fsis']
+
+
+def load_script(filename: str):
+    """Import one of the hyphen-named ETL scripts as a module"""
+    path = REPO_ROOT / 'etl/scripts' / filename
+    spec = importlib.util.spec_from_file_location(path.stem.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Runner:
+    """Runs and records the benchmark steps for one scale"""
+
+    def __init__(self, scale: float, workdir: Path, memory: bool = True, seed: int = 0, repeat: int = 3):
+        self.scale = scale
+        self.workdir = workdir
+        self.processed_dir = workdir / 'processed'
+        self.processed_dir.mkdir()
+        self.memory = memory
+        self.seed = seed
+        self.repeat = repeat
+        self.records: List[Dict[str, Any]] = []
+        self.dataset_rows: Dict[str, int] = {}
+
+    def measure(self, name: str, rows: int, func: Callable[[Any], Any],
+                make_input: Callable[[], Any] = lambda: None) -> Any:
+        """Run func on a fresh input for peak memory, then best-of-`repeat` for time; returns the last result"""
+        peak = None
+        if self.memory:
+            data = make_input()
+            tracemalloc.start()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    func(data)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        # The scripts print progress; keep it out of the benchmark output
+        seconds = float('inf')
+        for _ in range(self.repeat):
+            data = make_input()
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                result = func(data)
+                seconds = min(seconds, time.perf_counter() - start)
+
+        self.records.append({
+            'benchmark': name,
+            'scale': self.scale,
+            'rows': rows,
+            'seconds': seconds,
+            'rows_per_second': rows / seconds if seconds > 0 else None,
+            'peak_memory_mb': peak / 1e6 if peak is not None else None
+        })
+        print(f"  {name:<36} {rows:>10,} rows {seconds:>9.3f}s"
+              + (f" {peak / 1e6:>9.1f} MB" if peak is not None else ''))
+        return result
+
+    def write(self, name: str, df: pd.DataFrame, filename: str) -> None:
+        self.measure(f"{name}.write", len(df), lambda _: df.to_csv(self.processed_dir / filename, index=False))
+        self.dataset_rows[filename] = len(df)
+
+    def run_export_processor(self, name: str, module_file: str, class_name: str,
+                             generate: Callable, output_name: str):
+        """GRAS / FDA / WHO: generate the source file, then read, process and write it"""
+        source = self.workdir / f"{name}_source.csv"
+        rows = generate(self.scale, source, self.seed)
+        processor = getattr(load_script(module_file), class_name)()
+        processor.input_file = source
+        if hasattr(processor, 'reset_stats'):
+            processor.output_dir = self.processed_dir
+            processor.output_file = self.processed_dir / output_name
+
+        raw = self.measure(f"{name}.read_data", rows, lambda _: processor.read_data())
+
+        def process(df):
+            # Statistics accumulate across calls; start each pass from zero
+            if hasattr(processor, 'reset_stats'):
+                processor.reset_stats()
+            return processor.process_data(df)
+
+        processed = self.measure(f"{name}.process_data", rows, process, raw.copy)
+        self.write(name, processed, output_name)
+        return processor, processed
+
+    def run_api_processor(self, name: str, processor, payload: bytes) -> pd.DataFrame:
+        """CDC / FSIS: decode a generated API payload, then process it"""
+        rows = len(json.loads(payload))
+        raw = self.measure(f"{name}.decode_payload", rows, lambda _: pd.DataFrame(json.loads(payload)))
+        return self.measure(f"{name}.process_data", rows, processor.process_data, raw.copy)
+
+    def run_processors(self, selected: List[str]) -> None:
+        if 'gras' in selected:
+            self.run_export_processor('gras', 'gras-notices-data-new.py', 'GRASNoticesProcessor',
+                                      generators.generate_gras, 'processed_gras_notices.csv')
+        if 'fda' in selected:
+            processor, _ = self.run_export_processor('fda', 'fda-substances-data-new.py', 'FDASubstancesProcessor',
+                                                     generators.generate_fda, 'processed_fda_substances.csv')
+            processor.year_summary_file = self.processed_dir / 'fda_approvals_by_year.csv'
+            processor.save_year_summary()
+        if 'who' in selected:
+            self.run_export_processor('who', 'who-obesity-data.py', 'WHODataProcessor',
+                                      generators.generate_who, 'processed_who_obesity_data.csv')
+        if 'cdc' in selected:
+            fetcher = load_script('cdc-obesity-data.py').CDCDataFetcher()
+            cdc = self.run_api_processor('cdc', fetcher, generators.generate_cdc_payload(self.scale, self.seed))
+            self.write('cdc', cdc, 'processed_cdc_obesity_data.csv')
+        if 'fsis' in selected:
+            api = load_script('fsis-recall-api.py').FSISRecallAPI()
+            recalls = self.run_api_processor('fsis', api, generators.generate_fsis_payload(self.scale, self.seed))
+            recalls = recalls[recalls['year'].between(2011, 2023)]
+            self.write('fsis', recalls, 'processed_fsis_recalls.csv')
+            save_tables(recalls, self.processed_dir)
+
+    def run_verification(self) -> None:
+        """Every DataVerifier section on the processed outputs, each with freshly loaded datasets"""
+        from dataset_registry import DATASETS, LazyDatasets
+        from verify_statistics import DataVerifier
+
+        verifier = DataVerifier(use_cache=False)
+        for name, spec in DATASETS.items():
+            if spec['file'] not in self.dataset_rows:
+                self.dataset_rows[spec['file']] = sum(1 for _ in (self.processed_dir / spec['file']).open()) - 1
+
+        for key, method_name in DataVerifier.SECTIONS.items():
+            required = getattr(getattr(verifier, method_name), 'required_columns', {})
+            rows = sum(self.dataset_rows[DATASETS[name]['file']] for name in required)
+
+            def fresh_datasets():
+                verifier.datasets = LazyDatasets(self.processed_dir)
+
+            self.measure(f"verify.{key}", rows, lambda _: verifier.run_section(key), fresh_datasets)
+
+
+def compare(records: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float,
+            min_seconds: float = 0.05) -> List[str]:
+    """Regression messages for steps slower or bigger than the baseline beyond the tolerance"""
+    reference = {(r['benchmark'], r['scale']): r for r in baseline}
+    regressions = []
+    for record in records:
+        base = reference.get((record['benchmark'], record['scale']))
+        if base is None:
+            continue
+        label = f"{record['benchmark']} @ {record['scale']:g}x"
+        # Steps this short are dominated by timer and scheduler noise
+        timed = base['seconds'] >= min_seconds
+        if timed and base['rows_per_second'] and record['rows_per_second'] is not None:
+            ratio = record['rows_per_second'] / base['rows_per_second']
+            if ratio < 1 - tolerance:
+                regressions.append(f"{label}: throughput {ratio:.0%} of baseline "
+                                   f"({record['rows_per_second']:,.0f} vs {base['rows_per_second']:,.0f} rows/s)")
+        if base.get('peak_memory_mb') and record['peak_memory_mb'] is not None:
+            ratio = record['peak_memory_mb'] / base['peak_memory_mb']
+            if ratio > 1 + tolerance:
+                regressions.append(f"{label}: peak memory {ratio:.0%} of baseline "
+                                   f"({record['peak_memory_mb']:.1f} vs {base['peak_memory_mb']:.1f} MB)")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the ETL processors and verification analyses")
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100],
+                        help="multiples of the real dataset sizes (default: 1 10 100)")
+    parser.add_argument('--only', nargs='+', choices=PROCESSORS + ['verification'],
+                        help="benchmark only these steps (verification still generates every dataset)")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="skip the tracemalloc pass and record timings only")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="timing runs per step, the fastest is recorded (default: 3)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for the generators")
+    parser.add_argument('--output', type=Path, default=RESULTS_FILE, help="results file")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_FILE, help="baseline to compare against")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store these results as the new baseline instead of comparing")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed throughput drop / memory growth before flagging (default: 0.25)")
+    parser.add_argument('--min-seconds', type=float, default=0.05,
+                        help="skip throughput checks for steps faster than this in the baseline (default: 0.05)")
+    args = parser.parse_args()
+
+    selected = args.only or PROCESSORS + ['verification']
+    processors = PROCESSORS if 'verification' in selected else [p for p in PROCESSORS if p in selected]
+
+    # Import the scripts before silencing them; their logging setup runs at import time
+    for filename in ['gras-notices-data-new.py', 'fsis-recall-api.py']:
+        load_script(filename)
+    logging.disable(logging.INFO)
+
+    records = []
+    for scale in args.scales:
+        print(f"\nScale {scale:g}x")
+        with tempfile.TemporaryDirectory(prefix='etl-bench-') as tmp:
+            runner = Runner(scale, Path(tmp), memory=not args.no_memory, seed=args.seed, repeat=args.repeat)
+            runner.run_processors(processors)
+            if 'verification' in selected:
+                runner.run_verification()
+            records.extend(r for r in runner.records if r['benchmark'].split('.')[0] in selected
+                           or (r['benchmark'].startswith('verify.') and 'verification' in selected))
+
+    results = {
+        'generated': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'results': records
+    }
+    args.output.write_text(json.dumps(results, indent=2))
+    print(f"\nResults saved to {args.output}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2))
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    regressions = compare(records, json.loads(args.baseline.read_text())['results'],
+                          args.tolerance, args.min_seconds)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+        for message in regressions:
+            print(f"  REGRESSION {message}")
+        return 1
+    print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
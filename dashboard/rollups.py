@@ -0,0 +1,190 @@
+"""
+Precomputed rollups behind the dashboard API.
+
+Each rollup is a small frame aggregated once per version of its input
+datasets, keyed by the dimensions the endpoints filter on and holding
+counts and sums rather than means, so any filter can be re-aggregated
+exactly. Recall questions read the cube that the FSIS stage materializes
+(etl/scripts/recall_cube.py), which already holds every subtotal. The
+query functions below only filter and group these frames; no request
+touches the row-level data.
+"""
+
+from typing import Any, Dict, List, Mapping, Optional
+
+import pandas as pd
+
+from dataset_registry import DATASETS
+from lagged_correlation import heatmap_table, lagged_correlations
+from recall_cube import CUBE_FILE, UNKNOWN_STATE, load_cube, select
+
+Frames = Mapping[str, pd.DataFrame]
+
+
+class InvalidQuery(ValueError):
+    """A query parameter outside the range a rollup can answer"""
+
+
+def _years(values: pd.Series) -> pd.Series:
+    """Calendar years as nullable integers; accepts numbers and YYYY-MM-DD strings"""
+    if values.dtype == object or pd.api.types.is_string_dtype(values):
+        values = values.str[:4]
+    return pd.to_numeric(values, errors='coerce').astype('Int64')
+
+
+# Builders: one frame per rollup from the lazily loaded datasets
+
+def build_recall_cube(datasets) -> pd.DataFrame:
+    """The recall cube materialized by the FSIS stage (recall_cube.py)"""
+    return load_cube(datasets.base_path)
+
+
+def build_obesity(datasets) -> pd.DataFrame:
+    """Sum and count of the CDC obesity values by state and year"""
+    cdc = datasets.require('cdc', ['year', 'locationabbr', 'data_value'])
+    cdc = cdc[cdc['data_value'].notna()]
+    return (cdc.assign(year=_years(cdc['year']))
+            .groupby(['locationabbr', 'year'])['data_value'].agg(value_sum='sum', value_count='count')
+            .reset_index()
+            .rename(columns={'locationabbr': 'state'}))
+
+
+def build_gras(datasets) -> pd.DataFrame:
+    """GRAS notice counts by filing year and FDA response"""
+    gras = datasets.require('gras', ['filing_year', 'fda_response'])
+    return (gras.assign(year=_years(gras['filing_year']))
+            .groupby(['year', 'fda_response'], dropna=False).size()
+            .rename('notices').reset_index())
+
+
+def build_yearly_metrics(datasets) -> pd.DataFrame:
+    """Year-indexed food safety metrics and obesity rate, as correlated by the verifier
+
+    Datasets that have not been produced yet are left out rather than failing the rollup.
+    """
+    metrics = {}
+    if 'fda_yearly' in datasets:
+        fda_yearly = datasets.require('fda_yearly', ['year', 'new_approvals'])
+        metrics['fda_approvals'] = fda_yearly.set_index(_years(fda_yearly['year']))['new_approvals']
+    if 'gras' in datasets:
+        metrics['gras_notices'] = _years(datasets.require('gras', ['filing_year'])['filing_year']).value_counts()
+    if 'recalls' in datasets:
+        metrics['recalls'] = _years(datasets.require('recalls', ['year'])['year']).value_counts()
+    if 'cdc' in datasets:
+        cdc = datasets.require('cdc', ['year', 'data_value'])
+        metrics['obesity_rate'] = cdc.groupby(_years(cdc['year']))['data_value'].mean()
+
+    for name, series in metrics.items():
+        series = series[series.index.notna()]
+        series.index = series.index.astype(int)
+        metrics[name] = series.astype(float)
+    return pd.concat(metrics, axis=1).sort_index()
+
+
+# Files behind the rollups, under the processed directory: the verifier's datasets plus the recall cube
+FILES: Dict[str, str] = {
+    **{name: spec['file'] for name, spec in DATASETS.items()},
+    'recall_cube': CUBE_FILE
+}
+
+# Rollup name -> datasets it is built from (optional ones may be missing) and its builder
+ROLLUPS: Dict[str, Dict[str, Any]] = {
+    'recall_cube': {'datasets': ['recall_cube'], 'build': build_recall_cube},
+    'obesity': {'datasets': ['cdc'], 'build': build_obesity},
+    'gras': {'datasets': ['gras'], 'build': build_gras},
+    'yearly_metrics': {'datasets': [], 'optional': ['fda_yearly', 'gras', 'recalls', 'cdc'],
+                       'build': build_yearly_metrics}
+}
+
+
+# Queries: filter a rollup and re-aggregate it along one dimension
+
+def records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """JSON-ready rows, with missing values as None"""
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+
+def _filter(df: pd.DataFrame, **filters) -> pd.DataFrame:
+    for column, value in filters.items():
+        if value is not None:
+            df = df[df[column] == value]
+    return df
+
+
+def recall_counts(rollups: Frames, by: str, year: Optional[int] = None,
+                  state: Optional[str] = None, risk_level: Optional[str] = None) -> Dict[str, Any]:
+    """Recalls and quantity grouped by year, state or risk level under optional filters on the other two"""
+    filters = {dim: value for dim, value in [('year', year), ('state', state), ('risk_level', risk_level)]
+               if value is not None}
+    cells = select(rollups['recall_cube'], [by], **filters)
+    if by == 'year':
+        cells = cells.sort_values('year')
+    else:
+        if by == 'state':
+            # Nationwide recalls are listed under US and recalls without a state under Unknown in the cube;
+            # the state ranking leaves both out
+            cells = cells[~cells['state'].isin(['US', UNKNOWN_STATE])]
+        cells = cells.sort_values(['recalls', by], ascending=[False, True])
+    cells[by] = cells[by].astype(object)
+
+    # Distinct recalls come from the cell with every dimension rolled up, since a recall may span several states
+    total = select(rollups['recall_cube'], **filters)['recalls'].sum()
+    return {'total': int(total), 'rows': records(cells)}
+
+
+def obesity_trends(rollups: Frames, state: Optional[str] = None) -> Dict[str, Any]:
+    """Mean obesity value per year, nationally or for one state"""
+    frame = _filter(rollups['obesity'], state=state)
+    yearly = frame.groupby('year')[['value_sum', 'value_count']].sum()
+    trend = pd.DataFrame({
+        'year': yearly.index,
+        'obesity_rate': yearly['value_sum'] / yearly['value_count'],
+        'records': yearly['value_count']
+    })
+    return {'rows': records(trend)}
+
+
+def obesity_by_state(rollups: Frames, year: Optional[int] = None) -> Dict[str, Any]:
+    """Mean obesity value per state, for one year or over all years"""
+    frame = _filter(rollups['obesity'], year=year)
+    by_state = frame.groupby('state')[['value_sum', 'value_count']].sum()
+    rates = pd.DataFrame({
+        'state': by_state.index,
+        'obesity_rate': by_state['value_sum'] / by_state['value_count'],
+        'records': by_state['value_count']
+    }).sort_values('obesity_rate', ascending=False)
+    return {'rows': records(rates)}
+
+
+def gras_responses(rollups: Frames, year: Optional[int] = None) -> Dict[str, Any]:
+    """GRAS notices per FDA response, for one filing year or overall"""
+    frame = _filter(rollups['gras'], year=year)
+    counts = (frame.groupby('fda_response', dropna=False)['notices'].sum().reset_index()
+              .sort_values(['notices', 'fda_response'], ascending=[False, True]))
+    return {'total': int(counts['notices'].sum()), 'rows': records(counts)}
+
+
+def correlations(rollups: Frames, max_lag: int = 3, lag: Optional[int] = None,
+                 metric: Optional[str] = None) -> Dict[str, Any]:
+    """Lagged correlations between the yearly metrics, optionally one lag or one leading metric
+
+    max_lag is bounded by the years covered: the tensor grows with lags x years x metrics²,
+    and lags past the covered span have no overlapping years.
+    """
+    frame = rollups['yearly_metrics']
+    longest = int(frame.index.max() - frame.index.min()) if len(frame) else 0
+    if not 0 <= max_lag <= longest:
+        raise InvalidQuery(f"max_lag must be between 0 and {longest}, the years covered minus one")
+    if lag is not None and not 0 <= lag <= max_lag:
+        raise InvalidQuery(f"lag must be between 0 and max_lag ({max_lag})")
+    result = lagged_correlations(frame, max_lag)
+    cells = heatmap_table(result)
+    cells = _filter(cells, lag=lag, leading_metric=metric)
+    cells = cells[cells['leading_metric'] != cells['lagging_metric']]
+    return {
+        'metrics': result['metrics'],
+        'year_range': result['year_range'],
+        'min_overlap': result['min_overlap'],
+        'rows': records(cells)
+    }
+
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Local dashboard API over the processed datasets.
+
+A small aiohttp service answering the questions the static reports cover:
+recalls by year, state and risk level, obesity trends, GRAS responses and
+lagged correlations between the yearly metrics. Requests are served from
+three layers:
+
+- Rollups (rollups.py) are aggregated once per version of their input
+  datasets, at startup and again only after a dataset changes.
+- Each response body is serialized once and kept in an in-memory LRU
+  keyed by endpoint, parameters and the fingerprints of the datasets
+  behind it, so a changed CSV makes its old entries unreachable.
+- Responses carry a strong ETag; clients revalidating with If-None-Match
+  get a bodiless 304.
+
+Dataset fingerprints are content hashes, recomputed only when a file's
+size or mtime changes, so the per-request check is a few stat() calls and
+re-running an ETL stage that produces identical output keeps the cache.
+
+Usage (from the repository root):
+    python dashboard/server.py --port 8050
+    curl 'http://127.0.0.1:8050/api/recalls/by-year?state=TX'
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from aiohttp import web
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(REPO_ROOT / 'etl/scripts'), str(REPO_ROOT / 'verification')]
+
+import rollups  # noqa: E402
+from dataset_cache import DatasetCache, file_sha256  # noqa: E402
+from dataset_registry import DATASETS, LazyDatasets  # noqa: E402
+from rollups import FILES, ROLLUPS  # noqa: E402
+
+PROCESSED_DIR = REPO_ROOT / 'etl/data/processed'
+CACHE_DIR = REPO_ROOT / 'etl/data/cache'
+
+# Route -> query function, the rollups it reads and its query parameters with their types
+ENDPOINTS: Dict[str, Dict[str, Any]] = {
+    '/api/recalls/by-year': {
+        'query': partial(rollups.recall_counts, by='year'),
+        'rollups': ['recall_cube'],
+        'params': {'state': str, 'risk_level': str}
+    },
+    '/api/recalls/by-state': {
+        'query': partial(rollups.recall_counts, by='state'),
+        'rollups': ['recall_cube'],
+        'params': {'year': int, 'risk_level': str}
+    },
+    '/api/recalls/by-risk-level': {
+        'query': partial(rollups.recall_counts, by='risk_level'),
+        'rollups': ['recall_cube'],
+        'params': {'year': int, 'state': str}
+    },
+    '/api/obesity/trends': {
+        'query': rollups.obesity_trends,
+        'rollups': ['obesity'],
+        'params': {'state': str}
+    },
+    '/api/obesity/by-state': {
+        'query': rollups.obesity_by_state,
+        'rollups': ['obesity'],
+        'params': {'year': int}
+    },
+    '/api/gras/responses': {
+        'query': rollups.gras_responses,
+        'rollups': ['gras'],
+        'params': {'year': int}
+    },
+    '/api/correlations': {
+        'query': rollups.correlations,
+        'rollups': ['yearly_metrics'],
+        'params': {'max_lag': int, 'lag': int, 'metric': str}
+    }
+}
+
+
+class ResultCache:
+    """Least-recently-used map of serialized responses"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[bytes, str]]' = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Tuple[bytes, str]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, entry: Tuple[bytes, str]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+class DatasetUnavailable(Exception):
+    """A dataset an endpoint needs has not been produced yet"""
+
+
+class Dashboard:
+    """Dataset fingerprints, versioned rollups and the response cache behind the routes"""
+
+    def __init__(self, processed_dir: Path = PROCESSED_DIR, cache_size: int = 256, use_cache: bool = True):
+        self.processed_dir = Path(processed_dir)
+        self.dataset_cache = DatasetCache(CACHE_DIR) if use_cache else None
+        self.results = ResultCache(cache_size)
+        # Dataset name -> ((size, mtime_ns), sha256) of the file last seen
+        self._fingerprints: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        # Rollup name -> (fingerprints it was built from, frame)
+        self._rollups: Dict[str, Tuple[Tuple, Any]] = {}
+        self._locks = {name: asyncio.Lock() for name in ROLLUPS}
+        # Result-cache key -> future of a response still being computed
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+
+    # Fingerprints
+
+    def _hash(self, name: str, path: Path) -> str:
+        if self.dataset_cache is not None:
+            return self.dataset_cache.fingerprint(name, path)['sha256']
+        return file_sha256(path)
+
+    async def fingerprint(self, name: str) -> Optional[str]:
+        """Content hash of a dataset, None while its file does not exist"""
+        path = self.processed_dir / FILES[name]
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._fingerprints.pop(name, None)
+            return None
+
+        key = (stat.st_size, stat.st_mtime_ns)
+        known = self._fingerprints.get(name)
+        if known is None or known[0] != key:
+            # Hashing reads the whole file, so keep it off the event loop
+            sha256 = await asyncio.get_running_loop().run_in_executor(None, self._hash, name, path)
+            known = self._fingerprints[name] = (key, sha256)
+        return known[1]
+
+    async def fingerprints(self, rollup_names: Iterable[str]) -> Tuple[Tuple[str, Optional[str]], ...]:
+        """(dataset, fingerprint) pairs for every dataset behind the given rollups"""
+        names = sorted({
+            dataset for rollup in rollup_names
+            for dataset in ROLLUPS[rollup]['datasets'] + ROLLUPS[rollup].get('optional', [])
+        })
+        return tuple([(name, await self.fingerprint(name)) for name in names])
+
+    # Rollups
+
+    def _build(self, name: str, present: Iterable[str]):
+        # A fresh registry per build, holding only the datasets that exist, so no stale frame is reused
+        specs = {dataset: DATASETS[dataset] for dataset in present if dataset in DATASETS}
+        datasets = LazyDatasets(self.processed_dir, specs=specs, cache=self.dataset_cache,
+                                snapshots=self.dataset_cache is not None)
+        return ROLLUPS[name]['build'](datasets)
+
+    async def rollup(self, name: str):
+        """The rollup frame for the current dataset versions, rebuilt when any of them changed"""
+        async with self._locks[name]:
+            versions = await self.fingerprints([name])
+            missing = [dataset for dataset in ROLLUPS[name]['datasets'] if dict(versions)[dataset] is None]
+            if missing:
+                raise DatasetUnavailable(f"{', '.join(missing)} not processed yet; run etl/scripts/run-pipeline.py")
+
+            built = self._rollups.get(name)
+            if built is None or built[0] != versions:
+                present = [dataset for dataset, fingerprint in versions if fingerprint is not None]
+                start = time.perf_counter()
+                frame = await asyncio.get_running_loop().run_in_executor(None, self._build, name, present)
+                print(f"Built rollup {name}: {len(frame)} rows in {time.perf_counter() - start:.2f}s")
+                built = self._rollups[name] = (versions, frame)
+            return built[1]
+
+    async def warm(self) -> None:
+        """Build every rollup whose datasets are available"""
+        for name in ROLLUPS:
+            try:
+                await self.rollup(name)
+            except DatasetUnavailable as e:
+                print(f"Skipping rollup {name}: {e}")
+
+    # Responses
+
+    async def respond(self, path: str, params: Dict[str, Any]) -> Tuple[bytes, str]:
+        """Serialized body and ETag of an endpoint's answer, from the result cache when possible"""
+        endpoint = ENDPOINTS[path]
+        key = (path, tuple(sorted(params.items())), await self.fingerprints(endpoint['rollups']))
+        entry = self.results.get(key)
+        if entry is not None:
+            return entry
+
+        # Concurrent misses for the same key wait for the first one instead of recomputing
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        pending = self._pending[key] = asyncio.get_running_loop().create_future()
+        try:
+            frames = {name: await self.rollup(name) for name in endpoint['rollups']}
+            payload = endpoint['query'](frames, **params)
+            body = json.dumps(payload, default=_json_default).encode()
+            entry = (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+            self.results.put(key, entry)
+            pending.set_result(entry)
+            return entry
+        except Exception as e:
+            pending.set_exception(e)
+            # Only waiters see the exception; the caller raises it directly
+            pending.exception()
+            raise
+        finally:
+            del self._pending[key]
+
+
+def _json_default(value: Any) -> Any:
+    # numpy scalars left in records
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+# How a parameter type is named in error messages
+TYPE_NAMES = {int: 'an integer', str: 'a string'}
+
+
+def _parse_params(query, types: Dict[str, Callable]) -> Dict[str, Any]:
+    """Query parameters cast to their declared types; badly typed and unknown ones are a 400"""
+    params, errors = {}, []
+    for name, cast in types.items():
+        if name in query:
+            try:
+                params[name] = cast(query[name])
+            except ValueError:
+                errors.append(f"Invalid value for {name}: {query[name]!r} is not {TYPE_NAMES.get(cast, cast.__name__)}")
+    unknown = set(query) - set(types)
+    if unknown:
+        errors.append(f"Unknown parameters: {', '.join(sorted(unknown))} "
+                      f"(accepted: {', '.join(sorted(types)) or 'none'})")
+    if errors:
+        raise web.HTTPBadRequest(text='\n'.join(errors))
+    return params
+
+
+def _json_response(payload: Any, status: int = 200) -> web.Response:
+    return web.json_response(payload, status=status, headers={'Cache-Control': 'no-store'})
+
+
+def create_app(dashboard: Dashboard, warm: bool = True) -> web.Application:
+    """aiohttp application with one route per endpoint plus /api/datasets and /api/cache"""
+
+    def handler(path: str):
+        async def handle(request: web.Request) -> web.StreamResponse:
+            params = _parse_params(request.query, ENDPOINTS[path]['params'])
+            try:
+                body, etag = await dashboard.respond(path, params)
+            except DatasetUnavailable as e:
+                return _json_response({'error': str(e)}, status=503)
+            except rollups.InvalidQuery as e:
+                raise web.HTTPBadRequest(text=str(e))
+
+            headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+            if etag in request.headers.get('If-None-Match', ''):
+                return web.Response(status=304, headers=headers)
+            return web.Response(body=body, content_type='application/json', headers=headers)
+        return handle
+
+    async def datasets(request: web.Request) -> web.Response:
+        return _json_response({name: await dashboard.fingerprint(name) for name in FILES})
+
+    async def cache(request: web.Request) -> web.Response:
+        return _json_response(dashboard.results.stats())
+
+    async def index(request: web.Request) -> web.Response:
+        return _json_response({
+            path: sorted(endpoint['params']) for path, endpoint in ENDPOINTS.items()
+        })
+
+    app = web.Application()
+    app.router.add_get('/api', index)
+    app.router.add_get('/api/datasets', datasets)
+    app.router.add_get('/api/cache', cache)
+    for path in ENDPOINTS:
+        app.router.add_get(path, handler(path))
+
+    if warm:
+        async def on_startup(app: web.Application) -> None:
+            await dashboard.warm()
+        app.on_startup.append(on_startup)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the processed datasets to the dashboard front end")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--cache-size', type=int, default=256, help="responses kept in the LRU result cache")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="read the CSVs directly instead of their snapshots or the typed dataset cache")
+    parser.add_argument('--no-warm', action='store_true', help="build rollups on first request instead of at startup")
+    args = parser.parse_args()
+
+    dashboard = Dashboard(cache_size=args.cache_size, use_cache=not args.no_cache)
+    web.run_app(create_app(dashboard, warm=not args.no_warm), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+'''
+Analytical Store
+
+Embedded SQLite copy of the processed datasets for indexed queries:
+- One table per processed CSV, named like the verifier's dataset registry
+- Indexes on year, state, recall_number, grn_no and cas_reg_no columns
+- Tables are reloaded only when their CSV changed (size, mtime, then
+  SHA-256), so refreshing an up-to-date store costs a few stat() calls
+- query() returns a DataFrame for any SQL; named queries cover the common
+  analyst questions and the awk-grep.md recipes
+- Runnable as a CLI: build, list, run <named query>, sql "<statement>"
+
+SQLite ships with Python, so the store needs no extra dependency. The
+database lives in etl/data/analytics.sqlite and is rebuilt from the
+CSVs at any time; the CSVs stay the source of truth.
+'''
+
+import argparse
+import hashlib
+import sqlite3
+import sys
+import time
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import pandas as pd
+
+PROCESSED_DIR = Path(__file__).parent.parent / 'data/processed'
+DEFAULT_DB = Path(__file__).parent.parent / 'data/analytics.sqlite'
+
+# Table name -> processed file and the columns to index
+TABLES: Dict[str, Dict[str, Any]] = {
+    'fda': {'file': 'processed_fda_substances.csv', 'indexes': ['cas_reg_no', 'approval_year']},
+    'gras': {'file': 'processed_gras_notices.csv', 'indexes': ['grn_no', 'filing_year']},
+    'who': {'file': 'processed_who_obesity_data.csv', 'indexes': ['DIM_TIME', 'GEO_NAME_SHORT']},
+    'cdc': {'file': 'processed_cdc_obesity_data.csv', 'indexes': ['yearstart', 'year', 'locationabbr']},
+    'recalls': {'file': 'processed_fsis_recalls.csv', 'indexes': ['recall_number', 'year', 'risk_level']},
+    'fda_yearly': {'file': 'fda_approvals_by_year.csv', 'indexes': ['year']},
+    'geography': {'file': 'geography_states.csv', 'indexes': ['state_code', 'state_abbr']},
+    'recall_states': {'file': 'recall_state_bridge.csv', 'indexes': ['recall_number', 'state_code']}
+}
+
+# Ready-made questions; :name placeholders are filled from keyword parameters
+QUERIES: Dict[str, str] = {
+    'row_counts': """
+        SELECT table_name, rows, loaded FROM _sources ORDER BY table_name""",
+    'recalls_by_year': """
+        SELECT year, COUNT(*) AS recalls, SUM(quantity_lbs) AS quantity_lbs
+        FROM recalls GROUP BY year ORDER BY year""",
+    'recalls_by_risk_level': """
+        SELECT risk_level, COUNT(*) AS recalls FROM recalls
+        GROUP BY risk_level ORDER BY recalls DESC""",
+    'recalls_by_state': """
+        SELECT g.state_abbr, g.state_name, COUNT(*) AS recalls
+        FROM recall_states rs JOIN geography g ON g.state_code = rs.state_code
+        WHERE rs.state_code > 0
+        GROUP BY g.state_code ORDER BY recalls DESC""",
+    'recalls_in_state_year': """
+        SELECT r.recall_number, r.recall_date, r.risk_level, r.recall_reason, r.title
+        FROM recall_states rs
+        JOIN geography g ON g.state_code = rs.state_code
+        JOIN recalls r ON r.recall_number = rs.recall_number
+        WHERE g.state_abbr = :state AND r.year = :year
+        ORDER BY r.recall_date""",
+    'recall': """
+        SELECT * FROM recalls WHERE recall_number = :recall_number""",
+    'gras_notice': """
+        SELECT * FROM gras WHERE grn_no = :grn_no""",
+    'gras_responses': """
+        SELECT fda_response, COUNT(*) AS notices FROM gras
+        GROUP BY fda_response ORDER BY notices DESC""",
+    'gras_by_year': """
+        SELECT CAST(filing_year AS INTEGER) AS year, COUNT(*) AS notices FROM gras
+        WHERE filing_year IS NOT NULL GROUP BY year ORDER BY year""",
+    'fda_substance': """
+        SELECT * FROM fda WHERE cas_reg_no = :cas_reg_no""",
+    'fda_approvals_by_year': """
+        SELECT CAST(year AS INTEGER) AS year, new_approvals, cumulative_approvals
+        FROM fda_yearly ORDER BY year""",
+    'cdc_obesity_by_year': """
+        SELECT CAST(yearstart AS INTEGER) AS year, AVG(data_value) AS obesity_rate, COUNT(*) AS records
+        FROM cdc GROUP BY yearstart ORDER BY yearstart""",
+    'cdc_obesity_by_state': """
+        SELECT locationabbr AS state, AVG(data_value) AS obesity_rate FROM cdc
+        WHERE yearstart = :year GROUP BY locationabbr ORDER BY obesity_rate DESC""",
+    'who_country_trend': """
+        SELECT CAST(DIM_TIME AS INTEGER) AS year, DIM_SEX AS sex, RATE_PER_100_N AS obesity_rate
+        FROM who WHERE GEO_NAME_SHORT = :country ORDER BY year, sex"""
+}
+
+
+def _file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with path.open('rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AnalyticsStore:
+    """SQLite database holding one indexed table per processed dataset"""
+
+    def __init__(self, path: Path = DEFAULT_DB, processed_dir: Path = PROCESSED_DIR):
+        self.path = Path(path)
+        self.processed_dir = Path(processed_dir)
+
+    def connect(self) -> sqlite3.Connection:
+        """New connection; cheap enough to open one per query, which keeps threads independent"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    # Loading
+
+    def _sources(self, conn: sqlite3.Connection) -> Dict[str, Dict[str, Any]]:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS _sources (
+                table_name TEXT PRIMARY KEY, file TEXT, size INTEGER, mtime_ns INTEGER,
+                sha256 TEXT, rows INTEGER, loaded TEXT
+            )""")
+        cursor = conn.execute("SELECT table_name, size, mtime_ns, sha256 FROM _sources")
+        return {name: {'size': size, 'mtime_ns': mtime_ns, 'sha256': sha256}
+                for name, size, mtime_ns, sha256 in cursor}
+
+    def _load_table(self, conn: sqlite3.Connection, name: str, csv_path: Path) -> int:
+        """Replace a table with the CSV's content and recreate its indexes"""
+        df = pd.read_csv(csv_path, low_memory=False)
+        with conn:
+            conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+            df.to_sql(name, conn, index=False, chunksize=10000)
+            for column in TABLES[name]['indexes']:
+                if column in df.columns:
+                    conn.execute(f'CREATE INDEX "idx_{name}_{column}" ON "{name}" ("{column}")')
+        return len(df)
+
+    def refresh(self, tables: Optional[Sequence[str]] = None, force: bool = False) -> List[str]:
+        """Load every table whose CSV changed since it was loaded; returns the reloaded names"""
+        reloaded = []
+        with closing(self.connect()) as conn:
+            known = self._sources(conn)
+            for name in tables or TABLES:
+                csv_path = self.processed_dir / TABLES[name]['file']
+                if not csv_path.exists():
+                    continue
+                stat = csv_path.stat()
+                previous = known.get(name)
+                if not force and previous and (previous['size'], previous['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                sha256 = _file_sha256(csv_path)
+                if not force and previous and previous['sha256'] == sha256:
+                    # Touched but unchanged: remember the new mtime so the hash is not recomputed next time
+                    with conn:
+                        conn.execute("UPDATE _sources SET size = ?, mtime_ns = ? WHERE table_name = ?",
+                                     (stat.st_size, stat.st_mtime_ns, name))
+                    continue
+
+                rows = self._load_table(conn, name, csv_path)
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO _sources VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 (name, csv_path.name, stat.st_size, stat.st_mtime_ns, sha256, rows,
+                                  datetime.now().isoformat()))
+                reloaded.append(name)
+
+            if reloaded:
+                # Planner statistics for the new indexes
+                conn.execute("ANALYZE")
+        return reloaded
+
+    # Querying
+
+    def query(self, sql: str, params: Union[Sequence[Any], Dict[str, Any]] = ()) -> pd.DataFrame:
+        """Run any SQL statement and return its rows as a DataFrame"""
+        with closing(self.connect()) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def scalar(self, sql: str, params: Union[Sequence[Any], Dict[str, Any]] = ()) -> Any:
+        """First column of the first row, None when there are no rows"""
+        with closing(self.connect()) as conn:
+            row = conn.execute(sql, params).fetchone()
+        return row[0] if row else None
+
+    def named(self, name: str, **params) -> pd.DataFrame:
+        """Run one of the QUERIES with keyword parameters"""
+        return self.query(QUERIES[name], params)
+
+    def explain(self, sql: str, params: Union[Sequence[Any], Dict[str, Any]] = ()) -> List[str]:
+        """SQLite's query plan, to check that a question uses an index"""
+        with closing(self.connect()) as conn:
+            return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def _parse_params(pairs: List[str]) -> Dict[str, Any]:
+    """key=value arguments; numeric values become numbers"""
+    params = {}
+    for pair in pairs:
+        key, _, value = pair.partition('=')
+        try:
+            params[key] = int(value)
+        except ValueError:
+            try:
+                params[key] = float(value)
+            except ValueError:
+                params[key] = value
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the SQLite store of the processed datasets")
+    parser.add_argument('--db', type=Path, default=DEFAULT_DB, help="database file")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="load changed processed CSVs into the store")
+    build.add_argument('--force', action='store_true', help="reload every table")
+    commands.add_parser('list', help="list the named queries")
+    run = commands.add_parser('run', help="run a named query")
+    run.add_argument('name', choices=sorted(QUERIES))
+    run.add_argument('params', nargs='*', metavar='KEY=VALUE')
+    sql = commands.add_parser('sql', help="run an SQL statement")
+    sql.add_argument('statement')
+    sql.add_argument('--explain', action='store_true', help="show the query plan instead of the rows")
+    args = parser.parse_args()
+
+    store = AnalyticsStore(args.db)
+    if args.command == 'list':
+        for name, statement in QUERIES.items():
+            print(f"{name}: {' '.join(statement.split())}")
+        return
+
+    start = time.perf_counter()
+    if args.command == 'build':
+        reloaded = store.refresh(force=args.force)
+        # Mark the store as checked even when nothing changed, for timestamp-based tools like run-pipeline.py
+        store.path.touch()
+        print(f"Reloaded: {', '.join(reloaded) or 'none, store is up to date'}")
+        print(f"Store: {store.path} ({time.perf_counter() - start:.2f}s)")
+        return
+
+    if args.command == 'sql' and args.explain:
+        for line in store.explain(args.statement):
+            print(line)
+        return
+
+    result = store.query(args.statement) if args.command == 'sql' else store.named(args.name, **_parse_params(args.params))
+    with pd.option_context('display.max_rows', 100, 'display.width', 200):
+        print(result.to_string(index=False))
+    print(f"\n{len(result)} rows in {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
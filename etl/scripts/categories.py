@@ -0,0 +1,77 @@
+'''
+Category Definitions
+
+Categorical values the processors emit, shared with the data quality
+schemas so every value a processor can produce is a valid one:
+- FDA responses to GRAS notices, with the keywords the GRAS processor
+  standardizes the letter text by, plus its 'other' and 'unknown'
+  fallbacks
+- FSIS risk levels, processing categories and recall reasons as named by
+  the API's filters, with the ids the filters take; recalls spell the
+  same labels with a space after each dash ('High - Class I'), and a
+  recall without a risk level is 'Unknown'
+'''
+
+import re
+from typing import Dict, List
+
+# Standard response -> keywords of the letter text, checked in this order
+FDA_RESPONSE_KEYWORDS: Dict[str, List[str]] = {
+    'no questions': ['no questions', 'no further questions', 'fda has no questions'],
+    'insufficient basis': ['insufficient basis', 'insufficient information'],
+    'cease to evaluate': ['cease', 'ceased to evaluate', 'stopped evaluation', 'fda ceased to evaluate'],
+    'withdrawn': ['withdraw', 'withdrawn', 'at the notifier\'s request'],
+    'pending': ['pending', 'under evaluation', 'in progress']
+}
+# Letters matching no keyword, and notices without a letter
+FDA_RESPONSE_OTHER = 'other'
+FDA_RESPONSE_MISSING = 'unknown'
+FDA_RESPONSES = [*FDA_RESPONSE_KEYWORDS, FDA_RESPONSE_OTHER, FDA_RESPONSE_MISSING]
+
+# FSIS API filter label -> filter id
+FSIS_RISK_LEVELS = {
+    'High -Class I': '9',
+    'Low -Class II': '7',
+    'Marginal -Class III': '611',
+    'Medium -Class I': '8',
+    'Public Health Alert': '555'
+}
+FSIS_PROCESSING_CATEGORIES = {
+    'Eggs/Egg Products': '162',
+    'Fully Cooked -Not Shelf Stable': '159',
+    'Heat Treated -Not Fully Cooked -Not Shelf Stable': '160',
+    'Heat Treated -Shelf Stable': '158',
+    'Not Heat Treated -Shelf Stable': '157',
+    'Products with Secondary Inhibitors -Not Shelf Stable': '161',
+    'Raw -Intact': '154',
+    'Raw -Non Intact': '155',
+    'Slaughter': '153',
+    'Thermally Processed -Commercially Sterile': '156',
+    'Unknown': '625'
+}
+FSIS_RECALL_REASONS = {
+    'Import Violation': '19',
+    'Insanitary Conditions': '17',
+    'Misbranding': '13',
+    'Mislabeling': '15',
+    'Processing Defect': '21',
+    'Produced Without Benefit of Inspection': '18',
+    'Product Contamination': '16',
+    'Unfit for Human Consumption': '20',
+    'Unreported Allergens': '14'
+}
+FSIS_RISK_LEVEL_MISSING = 'Unknown'
+
+
+def recall_label(filter_label: str) -> str:
+    """A filter label as recalls spell it, e.g. 'Raw -Intact' -> 'Raw - Intact'"""
+    return re.sub(r'\s*-\s*', ' - ', filter_label)
+
+
+def recall_labels(filters: Dict[str, str]) -> List[str]:
+    return [recall_label(label) for label in filters]
+
+
+RECALL_RISK_LEVELS = recall_labels(FSIS_RISK_LEVELS) + [FSIS_RISK_LEVEL_MISSING]
+RECALL_PROCESSING_TYPES = recall_labels(FSIS_PROCESSING_CATEGORIES)
+RECALL_REASONS = recall_labels(FSIS_RECALL_REASONS)
@@ -28,22 +28,50 @@ The resulting dataset can be used for correlation analysis with the FSIS recall
 
 import pandas as pd
 import requests
-from time import sleep
+import time
 import json
 
-class CDCDataFetcher:
+from http_metrics import HTTPMetrics
+from instrumentation import configure, finish, instrumented
+from processor_base import BaseProcessor
+
+class CDCDataFetcher(BaseProcessor):
+    label = "CDC obesity data"
+    output_name = "processed_cdc_obesity_data.csv"
+    
     def __init__(self):
+        super().__init__()
         self.base_url = "https://data.cdc.gov/resource/hn4x-zwk7.json"
         self.total_records = None
+        self.metrics = HTTPMetrics('cdc')
+    
+    def get(self, url):
+        """GET a URL and decode its JSON body, recording latency, size and status"""
+        start = time.perf_counter()
+        try:
+            response = requests.get(url)
+        except requests.exceptions.RequestException as e:
+            self.metrics.record_error(type(e).__name__)
+            raise
+        self.metrics.observe_request(time.perf_counter() - start, response.status_code, len(response.content))
+        if response.status_code != 200:
+            self.metrics.record_error(f"status_{response.status_code}")
+        response.raise_for_status()
+        
+        decode_start = time.perf_counter()
+        data = response.json()
+        self.metrics.observe_decode(time.perf_counter() - decode_start)
+        return data
     
     def get_total_count(self):
         """Get total number of records using $select=count(*) query"""
         count_url = f"{self.base_url}?$select=count(*)"
-        response = requests.get(count_url)
-        if response.status_code == 200:
-            return int(response.json()[0]['count'])
-        return 0
+        try:
+            return int(self.get(count_url)[0]['count'])
+        except requests.exceptions.RequestException:
+            return 0
     
+    @instrumented('fetch')
     def fetch_data_with_pagination(self, batch_size=1000):
         """Fetch all data using pagination"""
         all_data = []
@@ -55,32 +83,33 @@ class CDCDataFetcher:
         while offset < self.total_records:
             url = f"{self.base_url}?$limit={batch_size}&$offset={offset}"
             try:
-                response = requests.get(url)
-                response.raise_for_status()
-                batch_data = response.json()
+                batch_data = self.get(url)
                 
                 if not batch_data:
                     break
                 
                 # Debug print first record
                 if offset == 0:
-                    print("\nFirst record structure:")
-                    print(json.dumps(batch_data[0], indent=2))
+                    self.logger.info("\nFirst record structure:")
+                    self.logger.info(json.dumps(batch_data[0], indent=2))
                     
                 all_data.extend(batch_data)
                 offset += batch_size
                 
                 # Respect rate limits
-                sleep(0.1)
+                self.metrics.sleep(0.1, 'throttle')
                 
             except requests.exceptions.RequestException as e:
-                print(f"Error fetching data at offset {offset}: {e}")
+                self.logger.error(f"Error fetching data at offset {offset}: {e}")
                 break
                 
         return pd.DataFrame(all_data)
     
+    @instrumented('process')
     def process_data(self, df):
         """Process and clean the CDC data"""
+        self.stats['total_records'] += len(df)
+        
         # Convert data value to numeric, handling percentages
         df['data_value'] = pd.to_numeric(df['data_value'], errors='coerce')
         
@@ -93,30 +122,33 @@ class CDCDataFetcher:
         return df
 
 def main():
+    configure('cdc_obesity')
     fetcher = CDCDataFetcher()
-    
-    print("Fetching CDC obesity data...")
-    df = fetcher.fetch_data_with_pagination()
-    
-    if df.empty:
-        print("No data retrieved")
-        return
-    
-    # Process the data
-    df = fetcher.process_data(df)
-    
-    # Save to CSV
-    output_file = 'cdc_obesity_data.csv'
-    df.to_csv(output_file, index=False)
-    print(f"\nData saved to {output_file}")
-    
-    # Print basic statistics
-    print("\nBasic Statistics:")
-    print(f"Total records: {len(df)}")
-    print(f"Year range: {df['year'].min().year} - {df['year'].max().year}")
-    print("\nAverage obesity rates by year:")
-    yearly_avg = df.groupby(df['year'].dt.year)['data_value'].mean()
-    print(yearly_avg)
+    try:
+        print("Fetching CDC obesity data...")
+        df = fetcher.fetch_data_with_pagination()
+        
+        if df.empty:
+            print("No data retrieved")
+            return
+        
+        # Process the data
+        df = fetcher.process_data(df)
+        
+        # Save to CSV
+        fetcher.write_output(df)
+        
+        # Print basic statistics
+        print("\nBasic Statistics:")
+        print(f"Total records: {len(df)}")
+        print(f"Year range: {df['year'].min().year} - {df['year'].max().year}")
+        print("\nAverage obesity rates by year:")
+        yearly_avg = df.groupby(df['year'].dt.year)['data_value'].mean()
+        print(yearly_avg)
+    finally:
+        # Failed fetches keep their telemetry too
+        fetcher.metrics.report()
+        finish()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,288 @@
+'''
+Data Quality Rules
+
+Declarative schemas for the processed datasets, following
+data-dictionary.md, checked while the processors stream their output:
+- Per column: required (no missing values), type (integer, number, date,
+  boolean), min/max, allowed values (split on a separator for
+  multi-valued columns such as recall reasons), a regex the whole value
+  must match, and unique across the file
+- Allowed categories come from categories.py, the definitions the
+  processors standardize to, not from the values seen in today's data
+- Years are checked against 1990 to the current year; CAS numbers against
+  NNNNNNN-NN-N; GRN and recall numbers must be unique
+- ValidatingWriter wraps a processor's output writer and checks each
+  chunk with vectorized column operations before it is written; only the
+  keys of unique columns are kept between chunks
+- Violations never stop a run. The per-rule report (rows checked,
+  violations and a few sample rows with their values) is logged and
+  saved as JSON under etl/data/quality
+
+Run this file directly to check existing processed CSVs against their
+schemas without rerunning the processors.
+'''
+
+import argparse
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from categories import FDA_RESPONSES, RECALL_PROCESSING_TYPES, RECALL_REASONS, RECALL_RISK_LEVELS
+
+REPORT_DIR = Path(__file__).parent.parent / 'data/quality'
+CURRENT_YEAR = datetime.now().year
+YEAR = {'type': 'integer', 'min': 1990, 'max': CURRENT_YEAR}
+CAS_PATTERN = r'\d{2,7}-\d{2}-\d'
+# Sample violating rows kept per rule
+SAMPLES = 5
+
+logger = logging.getLogger(__name__)
+
+# Processed file -> column -> rules
+SCHEMAS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    'processed_fda_substances.csv': {
+        'substance': {'required': True},
+        'cas_reg_no_(or_other_id)': {'required': True},
+        'cas_reg_no': {'pattern': CAS_PATTERN},
+        'gras_pub_no_year': YEAR,
+        'most_recent_gras_pub_update_year': YEAR,
+        'reg_administrative_year': YEAR,
+        'regs_labeling_&_standards_year': YEAR,
+        'grn_link_year': YEAR,
+        'approval_year': YEAR,
+        'data_source': {'required': True, 'allowed': ['FDA_SUBSTANCES']},
+        'processed_timestamp': {'required': True, 'type': 'date'}
+    },
+    'processed_gras_notices.csv': {
+        'grn_no': {'required': True, 'type': 'integer', 'min': 1, 'unique': True},
+        'substance': {'required': True},
+        'date_of_filing': {'type': 'date'},
+        'date_of_closure': {'type': 'date'},
+        'filing_year': YEAR,
+        'fda_response': {'required': True, 'allowed': FDA_RESPONSES},
+        'data_source': {'required': True, 'allowed': ['GRAS_NOTICES']}
+    },
+    'processed_who_obesity_data.csv': {
+        'GEO_NAME_SHORT': {'required': True},
+        'DIM_TIME': {'required': True, **YEAR},
+        'DIM_SEX': {'required': True, 'allowed': ['MALE', 'FEMALE', 'TOTAL']},
+        'RATE_PER_100_N': {'required': True, 'type': 'number', 'min': 0, 'max': 100},
+        'RATE_PER_100_NL': {'type': 'number', 'min': 0, 'max': 100},
+        'RATE_PER_100_NU': {'type': 'number', 'min': 0, 'max': 100},
+        'data_source': {'required': True, 'allowed': ['WHO']}
+    },
+    'processed_cdc_obesity_data.csv': {
+        'yearstart': {'required': True, **YEAR},
+        'yearend': YEAR,
+        'locationabbr': {'required': True, 'pattern': r'[A-Z]{2}'},
+        'data_value': {'type': 'number', 'min': 0, 'max': 100},
+        'low_confidence_limit': {'type': 'number', 'min': 0, 'max': 100},
+        'high_confidence_limit': {'type': 'number', 'min': 0, 'max': 100},
+        'sample_size': {'type': 'number', 'min': 0}
+    },
+    'processed_fsis_recalls.csv': {
+        'recall_number': {'required': True, 'unique': True},
+        'recall_date': {'required': True, 'type': 'date'},
+        'closed_date': {'type': 'date'},
+        'year': {'required': True, **YEAR},
+        'risk_level': {'required': True, 'allowed': RECALL_RISK_LEVELS},
+        'recall_reason': {'separator': ',', 'allowed': RECALL_REASONS},
+        'processing_type': {'separator': ',', 'allowed': RECALL_PROCESSING_TYPES},
+        'is_active': {'type': 'boolean'},
+        'related_to_outbreak': {'type': 'boolean'},
+        'quantity_lbs': {'type': 'number', 'min': 0},
+        'data_source': {'required': True, 'allowed': ['FSIS_RECALLS']}
+    }
+}
+
+
+def schema_for(path: Path) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Schema of a processed file, None for files without one"""
+    return SCHEMAS.get(Path(path).name)
+
+
+# Checking
+
+class QualityReport:
+    """Violation counts and samples per rule, accumulated chunk by chunk"""
+
+    def __init__(self, name: str, schema: Dict[str, Dict[str, Any]]):
+        self.name = name
+        self.schema = schema
+        self.rows = 0
+        self.missing_columns: List[str] = []
+        # (column, rule) -> {'checked', 'violations', 'samples'}
+        self.results: Dict[tuple, Dict[str, Any]] = {}
+        # Unique column -> keys seen in earlier chunks
+        self._seen: Dict[str, set] = {col: set() for col, rules in schema.items() if rules.get('unique')}
+
+    def _record(self, column: str, rule: str, values: pd.Series, checked: int, bad: np.ndarray) -> None:
+        result = self.results.setdefault((column, rule), {'checked': 0, 'violations': 0, 'samples': []})
+        result['checked'] += checked
+        positions = np.flatnonzero(bad)
+        result['violations'] += len(positions)
+        room = SAMPLES - len(result['samples'])
+        for position in positions[:max(room, 0)]:
+            value = values.iloc[position]
+            result['samples'].append([self.rows + int(position), None if pd.isna(value) else str(value)])
+
+    def check(self, chunk: pd.DataFrame) -> None:
+        """Check one chunk against every rule; rows are numbered across chunks from 0"""
+        chunk = chunk.reset_index(drop=True)
+        for column, rules in self.schema.items():
+            if column not in chunk.columns:
+                if column not in self.missing_columns:
+                    self.missing_columns.append(column)
+                continue
+
+            values = chunk[column]
+            present = values.notna().to_numpy()
+            checked = int(present.sum())
+            if rules.get('required'):
+                self._record(column, 'required', values, len(values), ~present)
+
+            kind = rules.get('type')
+            numbers = None
+            if kind in ('integer', 'number') or 'min' in rules or 'max' in rules:
+                numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+            if kind in ('integer', 'number'):
+                bad = present & np.isnan(numbers)
+                if kind == 'integer':
+                    bad |= present & ~np.isnan(numbers) & (numbers % 1 != 0)
+                self._record(column, f'type:{kind}', values, checked, bad)
+            elif kind == 'date':
+                parsed = values if pd.api.types.is_datetime64_any_dtype(values) else \
+                    pd.to_datetime(values, errors='coerce', format='ISO8601')
+                self._record(column, 'type:date', values, checked, present & parsed.isna().to_numpy())
+            elif kind == 'boolean':
+                self._record(column, 'type:boolean', values, checked,
+                             present & ~values.isin([True, False, 'True', 'False']).to_numpy())
+
+            if numbers is not None and ('min' in rules or 'max' in rules):
+                with np.errstate(invalid='ignore'):
+                    bad = (numbers < rules.get('min', -np.inf)) | (numbers > rules.get('max', np.inf))
+                self._record(column, 'range', values, checked, bad)
+
+            if 'allowed' in rules:
+                self._record(column, 'allowed', values, checked, present & ~self._allowed(values, rules))
+
+            if 'pattern' in rules:
+                matches = values.astype(str).str.fullmatch(rules['pattern']).to_numpy(dtype=bool)
+                self._record(column, 'pattern', values, checked, present & ~matches)
+
+            if rules.get('unique'):
+                keys = values.astype(str).where(values.notna())
+                seen = self._seen[column]
+                bad = present & (keys.duplicated() | keys.isin(seen)).to_numpy()
+                seen.update(keys[present])
+                self._record(column, 'unique', values, checked, bad)
+
+        self.rows += len(chunk)
+
+    @staticmethod
+    def _allowed(values: pd.Series, rules: Dict[str, Any]) -> np.ndarray:
+        """Rows whose value, or every part of it for multi-valued columns, is an allowed one"""
+        allowed = set(rules['allowed'])
+        separator = rules.get('separator')
+        if not separator:
+            return values.isin(allowed).to_numpy()
+        parts = values.astype(str).str.split(separator).explode().str.strip()
+        valid = parts.isin(allowed).groupby(level=0, sort=False).all()
+        return valid.reindex(values.index).fillna(False).to_numpy(dtype=bool)
+
+    # Reporting
+
+    @property
+    def violations(self) -> int:
+        return sum(result['violations'] for result in self.results.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'file': self.name,
+            'rows': self.rows,
+            'violations': self.violations,
+            'missing_columns': self.missing_columns,
+            'rules': [
+                {'column': column, 'rule': rule, **result}
+                for (column, rule), result in self.results.items()
+            ],
+            'checked_at': datetime.now().isoformat()
+        }
+
+    def save(self, report_dir: Path = REPORT_DIR) -> Path:
+        """Write the report as JSON named after the checked file"""
+        report_dir.mkdir(parents=True, exist_ok=True)
+        path = report_dir / f"{Path(self.name).stem}.json"
+        path.write_text(json.dumps(self.to_dict(), indent=2))
+        return path
+
+    def summary(self) -> str:
+        """One line per rule with violations, plus missing columns"""
+        lines = [f"Data quality of {self.name}: {self.violations} violations in {self.rows} rows"]
+        for (column, rule), result in self.results.items():
+            if result['violations']:
+                samples = ', '.join(f"row {row}: {value!r}" for row, value in result['samples'][:3])
+                lines.append(f"  {column} {rule}: {result['violations']} of {result['checked']} ({samples})")
+        if self.missing_columns:
+            lines.append(f"  missing columns: {', '.join(self.missing_columns)}")
+        return '\n'.join(lines)
+
+
+class ValidatingWriter:
+    """Wraps an output writer and checks every chunk against the output file's schema"""
+
+    def __init__(self, writer, schema: Dict[str, Dict[str, Any]], report_dir: Path = REPORT_DIR):
+        self.writer = writer
+        self.path = writer.path
+        self.report = QualityReport(Path(self.path).name, schema)
+        self.report_dir = report_dir
+
+    @property
+    def rows(self) -> int:
+        return self.writer.rows
+
+    def __enter__(self):
+        self.writer.__enter__()
+        return self
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        self.report.check(chunk)
+        self.writer.write(chunk)
+
+    def __exit__(self, *exc_info):
+        self.writer.__exit__(*exc_info)
+        if exc_info[0] is None:
+            path = self.report.save(self.report_dir)
+            logger.info(f"{self.report.summary()}\nReport saved to {path}")
+        return False
+
+
+def check_file(path: Path, chunksize: int = 100_000) -> QualityReport:
+    """Check an existing processed CSV against its schema"""
+    report = QualityReport(Path(path).name, schema_for(path))
+    for chunk in pd.read_csv(path, chunksize=chunksize, low_memory=False):
+        report.check(chunk)
+    return report
+
+
+if __name__ == '__main__':
+    processed_dir = Path(__file__).parent.parent / 'data/processed'
+    parser = argparse.ArgumentParser(description="Check processed CSVs against their data quality schemas")
+    parser.add_argument('files', nargs='*', type=Path, help="processed CSVs (default: every one with a schema)")
+    parser.add_argument('--save', action='store_true', help=f"also write the JSON reports to {REPORT_DIR}")
+    args = parser.parse_args()
+
+    files = args.files or [processed_dir / name for name in SCHEMAS if (processed_dir / name).exists()]
+    for path in files:
+        if schema_for(path) is None:
+            print(f"No schema for {path.name}")
+            continue
+        report = check_file(path)
+        print(report.summary())
+        if args.save:
+            print(f"Report saved to {report.save()}")
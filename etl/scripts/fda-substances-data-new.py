@@ -3,38 +3,42 @@ FDA Substances Data Processor (Enhanced Version)
 
 This script processes FDA food substances data with improved handling:
 - Advanced year extraction from multiple sources
+- Links to GRAS notices by CAS number and name (substance_linkage.py); an
+  exactly linked notice's filing year is the preferred approval year
 - Proper CAS number validation
 - Enhanced technical effects categorization
 - Improved data validation and cleaning
 - Detailed processing statistics
+- Chunked mode that streams the inventory through in fixed-size batches
+- Substance search index over names and synonyms (substance_index.py)
 '''
 
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import re
-from pathlib import Path
-import logging
-import html
+import argparse
+from collections import Counter
 
-class FDASubstancesProcessor:
+from instrumentation import configure, finish, instrumented, stage
+from processor_base import BaseProcessor
+from substance_index import save_dataset_index
+from substance_linkage import GRASLinker, link_years, save_links
+
+class FDASubstancesProcessor(BaseProcessor):
+    label = "FDA substances data"
+    source_file = "FoodSubstances.csv"
+    output_name = "processed_fda_substances.csv"
+    skiprows = 4
+    read_options = {'quoting': 1}
+    text_columns = ['substance', 'other_names', 'used_for_(technical_effect)']
+    replace_diamonds = True
+    
     def __init__(self):
-        # Set up paths using pathlib for cross-platform compatibility
-        self.base_path = Path(__file__).parent.parent.parent
-        self.input_file = self.base_path / "etl/data/source/FoodSubstances.csv"
-        self.output_dir = self.base_path / "etl/data/processed"
-        self.output_file = self.output_dir / "processed_fda_substances.csv"
+        super().__init__()
         self.year_summary_file = self.output_dir / "fda_approvals_by_year.csv"
-        
-        # Ensure output directory exists
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Set up logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s'
-        )
-        self.logger = logging.getLogger(__name__)
+        self.gras_file_name = "processed_gras_notices.csv"
+        self.linker = None
         
         # Define standard technical effect categories
         self.standard_effects = {
@@ -45,17 +49,24 @@ class FDASubstancesProcessor:
             'NUTRIENT': ['NUTRIENT', 'VITAMIN', 'MINERAL', 'SUPPLEMENT'],
             'PROCESSING': ['PROCESSING AID', 'CATALYST', 'ENZYME']
         }
-        
-        # Track processing statistics
+
+    def reset_stats(self):
+        """Reset processing statistics; process_data accumulates into them"""
         self.stats = {
             'total_records': 0,
             'valid_cas': 0,
             'valid_years': 0,
+            'grn_links': 0,
             'valid_effects': 0,
             'year_sources': {},
             'effect_categories': {}
         }
         
+        # Approval counts per year, the only aggregate needed for the year summary
+        self.year_counts = Counter()
+        # Substance-to-notice links of every processed chunk, saved as one table
+        self.links = []
+        
     def validate_cas_number(self, cas_str):
         """Validate CAS Registry Number format and checksum"""
         if pd.isna(cas_str):
@@ -100,25 +111,13 @@ class FDASubstancesProcessor:
             r'(?:19|20)\d{2}[-/]\d{1,2}[-/]\d{1,2}',  # YYYY-MM-DD
             r'\d{1,2}[-/]\d{1,2}[-/](?:19|20)\d{2}',  # DD-MM-YYYY or MM-DD-YYYY
             r'(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]* \d{1,2},? (?:19|20)\d{2}',  # Month DD, YYYY
-            r'(?:19|20)\d{2}(?!\d)',  # Just year (not part of larger number)
-            r'GRN[^\d]*(\d+)',  # GRN number
-            r'=T\("(\d+)"\)'  # Excel formula
+            r'(?:19|20)\d{2}(?!\d)'  # Just year (not part of larger number)
         ]
         
+        # GRN numbers are not dates; their notices' filing years come from link_gras_notices
         for pattern in year_patterns:
             match = re.search(pattern, text, re.IGNORECASE)
             if match:
-                # Handle GRN numbers differently
-                if 'GRN' in pattern or '=T' in pattern:
-                    grn_num = int(match.group(1))
-                    # Map GRN numbers to approximate years based on known timeline
-                    if grn_num <= 25:
-                        return 1990 + (grn_num // 5)
-                    elif grn_num <= 50:
-                        return 1997 + (grn_num - 25) // 5
-                    else:
-                        return None
-                
                 # Extract year from date formats
                 year_match = re.search(r'(?:19|20)\d{2}', match.group())
                 if year_match:
@@ -149,80 +148,51 @@ class FDASubstancesProcessor:
                 
         return sorted(list(standardized))
 
-    def clean_text(self, text):
-        """Clean text fields with improved handling"""
-        if pd.isna(text):
-            return text
-            
-        # Remove quotes and extra spaces
-        text = str(text).strip().strip('"').strip()
-        
-        # Remove HTML tags
-        text = re.sub(r'<[^>]+>', ' ', text)
-        
-        # Decode HTML entities
-        text = html.unescape(text)
-        
-        # Replace HTML diamonds with bullet points
-        text = text.replace('&diams;', '•')
-        
-        # Clean up whitespace and special characters
-        text = re.sub(r'\s+', ' ', text).strip()
-        text = re.sub(r'<br\s*/?>', ' ', text, flags=re.IGNORECASE)
-        
-        # Remove non-ASCII characters while preserving common symbols
-        text = ''.join(char if ord(char) < 128 or char in '•–—' else ' ' for char in text)
-        
-        return text.strip()
-
-    def read_data(self):
-        """Read FDA substances data with robust encoding handling"""
-        self.logger.info("Reading FDA substances data...")
-        
-        encodings = ['utf-8', 'latin1', 'cp1252', 'iso-8859-1']
-        
-        for encoding in encodings:
-            try:
-                self.logger.info(f"Trying {encoding} encoding...")
-                df = pd.read_csv(self.input_file, skiprows=4, encoding=encoding, quoting=1)
-                self.logger.info(f"Successfully read file with {encoding} encoding")
-                return df
-            except UnicodeDecodeError:
-                continue
-            except Exception as e:
-                self.logger.error(f"Error with {encoding}: {e}")
-                continue
-        
-        raise Exception("Failed to read file with any encoding")
+    def link_gras_notices(self, df):
+        """Link substances to GRAS notices and return each row's earliest exactly linked filing year"""
+        if self.linker is None:
+            gras_file = self.output_dir / self.gras_file_name
+            if not gras_file.exists():
+                self.logger.warning(f"{gras_file} not found; run the GRAS processor first to link notices")
+                return pd.Series(np.nan, index=df.index)
+            self.linker = GRASLinker.from_file(gras_file)
+        
+        with stage('link', rows_in=len(df)) as s:
+            links = self.linker.link(df)
+            s.rows_out = len(links)
+        self.links.append(links)
+        self.stats['grn_links'] += len(links)
+        self.logger.info(f"Linked {links['row'].nunique()} substances to {links['grn_no'].nunique()} GRAS notices")
+        
+        return link_years(links).reindex(df.index).astype(float)
 
+    @instrumented('process')
     def process_data(self, df):
         """Process and clean the FDA substances data"""
         self.logger.info("Processing FDA substances data...")
         
         # Track initial statistics
-        self.stats['total_records'] = len(df)
+        self.stats['total_records'] += len(df)
         
         # Clean column names
-        df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
+        df = self.clean_column_names(df)
         
         # Clean text fields
-        text_columns = ['substance', 'other_names', 'used_for_(technical_effect)']
-        for col in text_columns:
-            if col in df.columns:
-                df[col] = df[col].apply(self.clean_text)
-                self.logger.info(f"Cleaned {col} column")
+        df = self.clean_text_columns(df)
         
         # Process CAS numbers with validation
         if 'cas_reg_no_(or_other_id)' in df.columns:
             df['cas_reg_no'] = df['cas_reg_no_(or_other_id)'].apply(self.validate_cas_number)
-            self.stats['valid_cas'] = df['cas_reg_no'].notna().sum()
-            self.logger.info(f"Processed CAS numbers: {self.stats['valid_cas']} valid entries")
+            valid_cas = int(df['cas_reg_no'].notna().sum())
+            self.stats['valid_cas'] += valid_cas
+            self.logger.info(f"Processed CAS numbers: {valid_cas} valid entries")
         
         # Standardize technical effects
         if 'used_for_(technical_effect)' in df.columns:
             df['technical_effects'] = df['used_for_(technical_effect)'].apply(self.standardize_technical_effect)
-            self.stats['valid_effects'] = df['technical_effects'].apply(len).gt(0).sum()
-            self.logger.info(f"Processed technical effects: {self.stats['valid_effects']} substances with valid effects")
+            valid_effects = int(df['technical_effects'].apply(len).gt(0).sum())
+            self.stats['valid_effects'] += valid_effects
+            self.logger.info(f"Processed technical effects: {valid_effects} substances with valid effects")
         
         # Extract years from multiple sources
         year_columns = [
@@ -233,30 +203,45 @@ class FDASubstancesProcessor:
         ]
         
         # Create columns for each year source
-        for col in year_columns:
-            if col in df.columns:
-                year_col = f'{col}_year'
-                df[year_col] = df[col].apply(self.extract_year)
-                valid_years = df[year_col].notna().sum()
-                self.stats['year_sources'][col] = valid_years
-                self.logger.info(f"Extracted years from {col}: {valid_years} valid years")
+        with stage('parse', rows_in=len(df)):
+            for col in year_columns:
+                if col in df.columns:
+                    year_col = f'{col}_year'
+                    df[year_col] = df[col].apply(self.extract_year).astype(float)
+                    valid_years = int(df[year_col].notna().sum())
+                    self.stats['year_sources'][col] = self.stats['year_sources'].get(col, 0) + valid_years
+                    self.logger.info(f"Extracted years from {col}: {valid_years} valid years")
+        
+        # Filing year of the earliest linked GRAS notice
+        df['grn_link_year'] = self.link_gras_notices(df)
+        valid_years = int(df['grn_link_year'].notna().sum())
+        self.stats['year_sources']['grn_link'] = self.stats['year_sources'].get('grn_link', 0) + valid_years
         
         # Create final approval year using priority order
         df['approval_year'] = df.apply(lambda row: 
             next((year for year in (
+                row.get('grn_link_year'),
                 row.get('gras_pub_no_year'),
                 row.get('most_recent_gras_pub_update_year'),
                 row.get('reg_administrative_year'),
                 row.get('regs_labeling_&_standards_year')
             ) if pd.notna(year)), None),
-            axis=1)
+            axis=1).astype(float)
         
-        self.stats['valid_years'] = df['approval_year'].notna().sum()
+        self.stats['valid_years'] += int(df['approval_year'].notna().sum())
+        self.year_counts.update(df['approval_year'].dropna())
         
-        # Create year summary
+        # Add data source and processing timestamp
+        df['data_source'] = 'FDA_SUBSTANCES'
+        df['processed_timestamp'] = datetime.now().isoformat()
+        
+        return df
+
+    def save_year_summary(self):
+        """Create and save the approvals-by-year summary from the accumulated year counts"""
         year_summary = pd.DataFrame()
         if self.stats['valid_years'] > 0:
-            yearly_counts = df['approval_year'].value_counts().sort_index()
+            yearly_counts = pd.Series(self.year_counts, dtype='int64').sort_index()
             year_summary['year'] = yearly_counts.index
             year_summary['new_approvals'] = yearly_counts.values
             year_summary['cumulative_approvals'] = yearly_counts.cumsum()
@@ -266,18 +251,27 @@ class FDASubstancesProcessor:
             year_summary.to_csv(self.year_summary_file, index=False)
             self.logger.info(f"Year summary saved to {self.year_summary_file}")
         
-        # Add data source and processing timestamp
-        df['data_source'] = 'FDA_SUBSTANCES'
-        df['processed_timestamp'] = datetime.now().isoformat()
-        
-        return df
+        return year_summary
+
+    def save_gras_links(self):
+        """Save the substance_id <-> grn_no table from the accumulated links"""
+        if self.links:
+            table = save_links(pd.concat(self.links, ignore_index=True), self.output_dir)
+            self.logger.info(f"{len(table)} substance-notice links saved")
 
-    def print_statistics(self, df):
+    def save_search_index(self):
+        """Rebuild the substance search index from the written output"""
+        with stage('index'):
+            index = save_dataset_index('fda', self.output_file)
+        self.logger.info(f"Search index of {len(index)} substances saved")
+
+    def print_statistics(self, df=None):
         """Print detailed processing statistics"""
         self.logger.info("\nProcessing Statistics:")
         self.logger.info(f"Total records processed: {self.stats['total_records']}")
         self.logger.info(f"Valid CAS numbers: {self.stats['valid_cas']}")
         self.logger.info(f"Valid approval years: {self.stats['valid_years']}")
+        self.logger.info(f"GRAS notice links: {self.stats['grn_links']}")
         self.logger.info(f"Valid technical effects: {self.stats['valid_effects']}")
         
         self.logger.info("\nYear Sources:")
@@ -288,23 +282,36 @@ class FDASubstancesProcessor:
         for category, count in self.stats['effect_categories'].items():
             self.logger.info(f"  {category}: {count} substances")
         
-        if 'approval_year' in df.columns and df['approval_year'].notna().any():
-            year_range = df['approval_year'].agg(['min', 'max']).to_dict()
+        if self.year_counts:
+            year_range = {'min': min(self.year_counts), 'max': max(self.year_counts)}
             self.logger.info(f"\nApproval year range: {year_range['min']} - {year_range['max']}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Process FDA food substances data")
+    parser.add_argument('--chunksize', type=int,
+                        help="stream the source through in chunks of this many rows")
+    parser.add_argument('--profile', action='store_true',
+                        help="record stage timings and memory (also enabled by ETL_PROFILE=1)")
+    args = parser.parse_args()
+    
+    configure('fda_substances', args.profile)
     processor = FDASubstancesProcessor()
     
     try:
-        # Read data
-        df = processor.read_data()
-        
-        # Process the data
-        df = processor.process_data(df)
-        
-        # Save to CSV
-        df.to_csv(processor.output_file, index=False)
-        processor.logger.info(f"\nData saved to {processor.output_file}")
+        if args.chunksize:
+            # Stream chunks straight to the output; only stats and year counts stay in memory
+            processor.run_chunked(args.chunksize)
+            processor.save_year_summary()
+            processor.save_gras_links()
+            processor.save_search_index()
+            processor.print_statistics()
+            return
+        
+        # Read, process and save to CSV
+        df = processor.run()
+        processor.save_year_summary()
+        processor.save_gras_links()
+        processor.save_search_index()
         
         # Print statistics
         processor.print_statistics(df)
@@ -312,6 +319,8 @@ def main():
     except Exception as e:
         processor.logger.error(f"Error processing data: {e}")
         raise
+    finally:
+        finish()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -13,6 +13,9 @@
 - Processes in chunks for memory efficiency
 - Handles date formatting and data cleaning
 - Standardizes risk levels and states
+- Materializes the recall rollup cube (recall_cube.py) for the dashboard
+- Updates the establishment and product search index (recall_index.py)
+  with the recalls that are new or changed since the last run
 
 **Performance Improvements**
 - Async/concurrent requests
@@ -34,8 +37,16 @@ import logging
 import sys
 from typing import Dict, List, Optional
 from urllib.parse import urlencode
-import re
-import html
+import json
+
+from categories import FSIS_PROCESSING_CATEGORIES, FSIS_RECALL_REASONS, FSIS_RISK_LEVEL_MISSING, FSIS_RISK_LEVELS
+from geography import save_tables
+from http_metrics import HTTPMetrics
+from instrumentation import configure, finish, instrumented, stage
+from processor_base import BaseProcessor
+from recall_cube import save_cube
+from recall_index import update_recall_index
+from text_cleaning import strip_html_series
 
 # Set up detailed logging
 logging.basicConfig(
@@ -47,12 +58,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class FSISRecallAPI:
+class FSISRecallAPI(BaseProcessor):
+    label = "FSIS recall data"
+    output_name = "processed_fsis_recalls.csv"
+    
     def __init__(self):
+        super().__init__()
         self.base_url = "https://www.fsis.usda.gov/fsis/api/recall/v/1"
         self.session = None
         self.batch_size = 25  # Reduced batch size for better reliability
         self.timeout = aiohttp.ClientTimeout(total=120, connect=60)  # Increased timeout for historical data
+        self.metrics = HTTPMetrics('fsis')
         
         # API Filter Constants
         self.STATES = {
@@ -74,42 +90,9 @@ class FSISRecallAPI:
             'Nationwide': '557'
         }
         
-        self.RISK_LEVELS = {
-            'All': 'All',
-            'High -Class I': '9',
-            'Low -Class II': '7',
-            'Marginal -Class III': '611',
-            'Medium -Class I': '8',
-            'Public Health Alert': '555'
-        }
-        
-        self.PROCESSING_CATEGORIES = {
-            'All': 'All',
-            'Eggs/Egg Products': '162',
-            'Fully Cooked -Not Shelf Stable': '159',
-            'Heat Treated -Not Fully Cooked -Not Shelf Stable': '160',
-            'Heat Treated -Shelf Stable': '158',
-            'Not Heat Treated -Shelf Stable': '157',
-            'Products with Secondary Inhibitors -Not Shelf Stable': '161',
-            'Raw -Intact': '154',
-            'Raw -Non Intact': '155',
-            'Slaughter': '153',
-            'Thermally Processed -Commercially Sterile': '156',
-            'Unknown': '625'
-        }
-        
-        self.RECALL_REASONS = {
-            'All': 'All',
-            'Import Violation': '19',
-            'Insanitary Conditions': '17',
-            'Misbranding': '13',
-            'Mislabeling': '15',
-            'Processing Defect': '21',
-            'Produced Without Benefit of Inspection': '18',
-            'Product Contamination': '16',
-            'Unfit for Human Consumption': '20',
-            'Unreported Allergens': '14'
-        }
+        self.RISK_LEVELS = {'All': 'All', **FSIS_RISK_LEVELS}
+        self.PROCESSING_CATEGORIES = {'All': 'All', **FSIS_PROCESSING_CATEGORIES}
+        self.RECALL_REASONS = {'All': 'All', **FSIS_RECALL_REASONS}
         
         self.RECALL_TYPES = {
             'All': 'All',
@@ -205,10 +188,15 @@ class FSISRecallAPI:
                     await self.init_session()
                     
                 logger.debug(f"Fetching batch at offset {offset}, attempt {attempt + 1}")
+                start = time.perf_counter()
                 async with self.session.get(page_url, ssl=False, timeout=self.timeout) as response:
                     if response.status == 200:
                         try:
-                            data = await asyncio.wait_for(response.json(), timeout=60)
+                            body = await asyncio.wait_for(response.read(), timeout=60)
+                            self.metrics.observe_request(time.perf_counter() - start, response.status, len(body))
+                            decode_start = time.perf_counter()
+                            data = json.loads(body)
+                            self.metrics.observe_decode(time.perf_counter() - decode_start)
                             # Filter out Spanish language entries
                             data = [item for item in data if item.get('langcode') == 'English']
                             if offset == 0:
@@ -217,21 +205,29 @@ class FSISRecallAPI:
                             return data
                         except asyncio.TimeoutError:
                             logger.error(f"Timeout while parsing JSON at offset {offset}")
-                            await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                            self.metrics.record_retry('body_timeout')
+                            await self.metrics.async_sleep(2 ** attempt, 'backoff')  # Exponential backoff
                             continue
                     else:
                         response_text = await response.text()
+                        self.metrics.observe_request(time.perf_counter() - start, response.status,
+                                                     len(response_text.encode()))
                         logger.error(f"Error response for batch {offset}: {response_text}")
                         if response.status == 429:  # Rate limit
-                            await asyncio.sleep(30)  # Wait longer for rate limits
+                            self.metrics.record_retry('status_429')
+                            await self.metrics.async_sleep(30, 'rate_limit')  # Wait longer for rate limits
                             continue
+                        self.metrics.record_error(f"status_{response.status}")
                         return []
             except Exception as e:
                 logger.error(f"Error fetching batch at offset {offset}, attempt {attempt + 1}: {str(e)}", exc_info=True)
                 if attempt == retries - 1:
+                    self.metrics.record_error(type(e).__name__)
                     return []
-                await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                self.metrics.record_retry(type(e).__name__)
+                await self.metrics.async_sleep(2 ** attempt, 'backoff')  # Exponential backoff
 
+    @instrumented('fetch')
     async def fetch_all_data(self, filters: Optional[Dict] = None) -> pd.DataFrame:
         """Fetch all data using async requests with optional filters"""
         try:
@@ -257,7 +253,8 @@ class FSISRecallAPI:
                         if not batch_data and retry_count < max_retries:
                             logger.warning(f"No data received, attempt {retry_count + 1} of {max_retries}")
                             retry_count += 1
-                            await asyncio.sleep(2 ** retry_count)  # Exponential backoff
+                            self.metrics.record_retry('empty_batch')
+                            await self.metrics.async_sleep(2 ** retry_count, 'backoff')  # Exponential backoff
                             continue
                         elif not batch_data:
                             logger.info("No more data available after retries")
@@ -271,7 +268,7 @@ class FSISRecallAPI:
                         pbar.update(last_batch_size)
                         
                         offset += self.batch_size
-                        await asyncio.sleep(0.5)  # Rate limiting delay
+                        await self.metrics.async_sleep(0.5, 'throttle')  # Rate limiting delay
                         
                         # Log progress for historical data
                         if total_fetched % 500 == 0:
@@ -281,7 +278,8 @@ class FSISRecallAPI:
                         logger.error(f"Error fetching batch at offset {offset}: {str(e)}")
                         if retry_count < max_retries:
                             retry_count += 1
-                            await asyncio.sleep(2 ** retry_count)
+                            self.metrics.record_retry(type(e).__name__)
+                            await self.metrics.async_sleep(2 ** retry_count, 'backoff')
                             continue
                         else:
                             logger.error("Max retries reached, stopping fetch")
@@ -295,6 +293,7 @@ class FSISRecallAPI:
                 await self.session.close()
                 logger.debug("Session closed")
 
+    @instrumented('process')
     def process_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Process and clean the recall data"""
         logger.info("Processing recall data...")
@@ -303,12 +302,10 @@ class FSISRecallAPI:
             logger.warning("Empty DataFrame received for processing")
             return df
             
+        self.stats['total_records'] += len(df)
         try:
             # Clean HTML from text fields
-            text_columns = ['field_summary', 'field_product_items']
-            for col in text_columns:
-                if col in df.columns:
-                    df[col] = df[col].apply(lambda x: html.unescape(re.sub('<[^<]+?>', '', str(x))))
+            df = self.clean_text_columns(df, ['field_summary', 'field_product_items'], strip_html_series)
 
             # Convert dates to datetime
             date_columns = [
@@ -330,7 +327,7 @@ class FSISRecallAPI:
             
             # Standardize risk levels
             if 'field_risk_level' in df.columns:
-                df['risk_level'] = df['field_risk_level'].fillna('Unknown')
+                df['risk_level'] = df['field_risk_level'].fillna(FSIS_RISK_LEVEL_MISSING)
             
             # Clean up quantity information
             if 'field_qty_recovered' in df.columns:
@@ -398,8 +395,9 @@ class FSISRecallAPI:
             return df
 
 async def main():
+    configure('fsis_recalls')
+    api = FSISRecallAPI()
     try:
-        api = FSISRecallAPI()
         all_recalls = []
         
         # Basic filters for English language
@@ -422,9 +420,23 @@ async def main():
         df = df[df['year'].between(2011, 2023)]
         
         # Save to CSV
-        output_path = 'etl/data/processed/processed_fsis_recalls.csv'
-        df.to_csv(output_path, index=False)
-        logger.info(f"\nData saved to {output_path}")
+        api.write_output(df)
+        
+        # Geography dimension and recall-to-state bridge keyed by integer state codes
+        with stage('write_geography', rows_in=len(df)):
+            save_tables(df, api.output_dir)
+        logger.info("Geography dimension and recall state bridge saved")
+        
+        # Precomputed counts and quantities over every combination of the recall dimensions
+        with stage('write_cube', rows_in=len(df)) as s:
+            s.rows_out = len(save_cube(df, api.output_dir))
+        logger.info("Recall rollup cube saved")
+        
+        # Keyword and establishment index; only new or changed recalls are tokenized
+        with stage('index', rows_in=len(df)) as s:
+            changes = update_recall_index(df)
+            s.rows_out = changes['added'] + changes['replaced']
+        logger.info("Recall search index updated: " + ', '.join(f"{count} {kind}" for kind, count in changes.items()))
         
         # Print basic statistics
         logger.info("\nBasic Statistics:")
@@ -454,6 +466,9 @@ async def main():
             
     except Exception as e:
         logger.error(f"Error in main: {str(e)}", exc_info=True)
+    finally:
+        api.metrics.report(logger.info)
+        finish()
 
 if __name__ == "__main__":
     try:
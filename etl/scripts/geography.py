@@ -0,0 +1,94 @@
+'''
+Geography Dimension
+
+Shared state dimension for joining FSIS recalls, CDC and WHO data:
+- One row per state, DC and territory keyed by its integer FIPS code
+- Code 0 for the United States as a whole (FSIS "Nationwide", CDC "US", WHO)
+- Lookup from full names, USPS abbreviations and dataset-specific aliases
+- Recall-to-state bridge with one (recall_number, state_code) row per affected state
+
+Run this file directly to regenerate the dimension and bridge tables from
+the processed FSIS recalls.
+'''
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+NATIONAL_CODE = 0
+
+# (FIPS code, USPS abbreviation, name as used by the FSIS API)
+STATES = [
+    (NATIONAL_CODE, 'US', 'United States'),
+    (1, 'AL', 'Alabama'), (2, 'AK', 'Alaska'), (4, 'AZ', 'Arizona'), (5, 'AR', 'Arkansas'),
+    (6, 'CA', 'California'), (8, 'CO', 'Colorado'), (9, 'CT', 'Connecticut'), (10, 'DE', 'Delaware'),
+    (11, 'DC', 'District of Columbia'), (12, 'FL', 'Florida'), (13, 'GA', 'Georgia'), (15, 'HI', 'Hawaii'),
+    (16, 'ID', 'Idaho'), (17, 'IL', 'Illinois'), (18, 'IN', 'Indiana'), (19, 'IA', 'Iowa'),
+    (20, 'KS', 'Kansas'), (21, 'KY', 'Kentucky'), (22, 'LA', 'Louisiana'), (23, 'ME', 'Maine'),
+    (24, 'MD', 'Maryland'), (25, 'MA', 'Massachusetts'), (26, 'MI', 'Michigan'), (27, 'MN', 'Minnesota'),
+    (28, 'MS', 'Mississippi'), (29, 'MO', 'Missouri'), (30, 'MT', 'Montana'), (31, 'NE', 'Nebraska'),
+    (32, 'NV', 'Nevada'), (33, 'NH', 'New Hampshire'), (34, 'NJ', 'New Jersey'), (35, 'NM', 'New Mexico'),
+    (36, 'NY', 'New York'), (37, 'NC', 'North Carolina'), (38, 'ND', 'North Dakota'), (39, 'OH', 'Ohio'),
+    (40, 'OK', 'Oklahoma'), (41, 'OR', 'Oregon'), (42, 'PA', 'Pennsylvania'), (44, 'RI', 'Rhode Island'),
+    (45, 'SC', 'South Carolina'), (46, 'SD', 'South Dakota'), (47, 'TN', 'Tennessee'), (48, 'TX', 'Texas'),
+    (49, 'UT', 'Utah'), (50, 'VT', 'Vermont'), (51, 'VA', 'Virginia'), (53, 'WA', 'Washington'),
+    (54, 'WV', 'West Virginia'), (55, 'WI', 'Wisconsin'), (56, 'WY', 'Wyoming'),
+    (60, 'AS', 'American Samoa'), (66, 'GU', 'Guam'), (69, 'MP', 'Northern Mariana Islands'),
+    (72, 'PR', 'Puerto Rico'), (74, 'UM', 'U.S. Minor Outlying Islands'), (78, 'VI', 'U.S. Virgin Islands'),
+]
+
+# Names other datasets use for the same places
+ALIASES = {
+    'Nationwide': NATIONAL_CODE,                # FSIS
+    'National': NATIONAL_CODE,                  # CDC locationdesc
+    'United States of America': NATIONAL_CODE,  # WHO GEO_NAME_SHORT
+    'Virgin Islands': 78,                       # CDC locationdesc
+}
+
+# Every known name, abbreviation and alias mapped to its state code
+STATE_CODES = {
+    **{name: code for code, _, name in STATES},
+    **{abbr: code for code, abbr, _ in STATES},
+    **ALIASES,
+}
+
+DIMENSION_FILE = 'geography_states.csv'
+BRIDGE_FILE = 'recall_state_bridge.csv'
+
+
+def geography_table() -> pd.DataFrame:
+    """The state dimension: state_code, state_abbr, state_name and is_national"""
+    table = pd.DataFrame(STATES, columns=['state_code', 'state_abbr', 'state_name'])
+    table['is_national'] = table['state_code'] == NATIONAL_CODE
+    return table
+
+
+def state_codes(values: pd.Series) -> pd.Series:
+    """Map names, abbreviations or aliases to state codes (<NA> when unknown)"""
+    return values.str.strip().map(STATE_CODES).astype('Int64')
+
+
+def recall_state_bridge(recalls_df: pd.DataFrame) -> pd.DataFrame:
+    """One row per (recall_number, state_code) from the pipe-joined states column"""
+    pairs = recalls_df[['recall_number']].assign(
+        state_code=recalls_df['states'].str.split('|')
+    ).explode('state_code')
+    pairs['state_code'] = state_codes(pairs['state_code'])
+    pairs = pairs.dropna(subset=['state_code']).drop_duplicates()
+    return pairs.reset_index(drop=True)
+
+
+def save_tables(recalls_df: pd.DataFrame, output_dir: Path) -> None:
+    """Write the dimension and the recall bridge next to the processed datasets"""
+    output_dir = Path(output_dir)
+    geography_table().to_csv(output_dir / DIMENSION_FILE, index=False)
+    recall_state_bridge(recalls_df).to_csv(output_dir / BRIDGE_FILE, index=False)
+
+
+if __name__ == '__main__':
+    processed_dir = Path(__file__).parent.parent / 'data/processed'
+    recalls_path = Path(sys.argv[1]) if len(sys.argv) > 1 else processed_dir / 'processed_fsis_recalls.csv'
+    recalls = pd.read_csv(recalls_path, usecols=['recall_number', 'states'], dtype=str)
+    save_tables(recalls, processed_dir)
+    print(f"Saved {DIMENSION_FILE} and {BRIDGE_FILE} to {processed_dir}")
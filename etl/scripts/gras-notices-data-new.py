@@ -7,33 +7,40 @@ This script processes FDA GRAS notices data with improved date handling and vali
 - Enhanced data validation and cleaning
 - Detailed processing statistics
 - Improved error handling and logging
+- Incremental mode that only reprocesses new or changed notices
+- Chunked mode that streams the export through in fixed-size batches;
+  the manifest is built as chunks pass, holding one entry per distinct
+  GRN rather than per row
+- Substance search index over names and intended uses (substance_index.py)
 '''
 
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import re
-from pathlib import Path
-import logging
-import html
+import argparse
+import io
+import json
 
-class GRASNoticesProcessor:
+from categories import FDA_RESPONSE_KEYWORDS, FDA_RESPONSE_MISSING, FDA_RESPONSE_OTHER
+from instrumentation import configure, finish, instrumented, iter_stage, stage
+from processor_base import BaseProcessor
+from substance_index import save_dataset_index
+
+class GRASNoticesProcessor(BaseProcessor):
+    label = "GRAS notices data"
+    source_file = "GRASNotices.csv"
+    output_name = "processed_gras_notices.csv"
+    skiprows = 2
+    read_options = {'quoting': 1}
+    text_columns = ['substance', 'intended_use', 'basis', 'notifier', 'notifier_address']
+    
     def __init__(self):
-        # Set up paths using pathlib for cross-platform compatibility
-        self.base_path = Path(__file__).parent.parent.parent
-        self.input_file = self.base_path / "etl/data/source/GRASNotices.csv"
-        self.output_dir = self.base_path / "etl/data/processed"
-        self.output_file = self.output_dir / "processed_gras_notices.csv"
-        
-        # Ensure output directory exists
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Set up logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s'
-        )
-        self.logger = logging.getLogger(__name__)
+        super().__init__()
+        self.manifest_file = self.output_dir / "gras_notices_manifest.json"
+        # Manifest rows (GRN -> row hash) of the fingerprints tracked so far, and GRNs seen on several rows
+        self.manifest_rows = {}
+        self.duplicate_grns = set()
         
         # Define date format patterns
         self.date_patterns = [
@@ -42,14 +49,19 @@ class GRASNoticesProcessor:
             ('%B %d, %Y', r'^[A-Za-z]+ \d{1,2},? \d{4}$'),
             ('%Y', r'^\d{4}$')
         ]
-        
-        # Track processing statistics
+
+    def reset_stats(self):
+        """Reset processing statistics; process_data accumulates into them"""
         self.stats = {
             'total_records': 0,
+            # Set by incremental runs, where only new and changed rows go through process_data
+            'reprocessed_records': None,
             'valid_dates': {},
             'invalid_dates': {},
             'grn_numbers': 0,
-            'fda_responses': {}
+            'fda_responses': {},
+            'filing_year_range': {},
+            'incremental': {}
         }
 
     def parse_date(self, date_str):
@@ -125,107 +137,170 @@ class GRASNoticesProcessor:
         self.logger.warning(f"Invalid GRN number: {grn_str}")
         return None
 
-    def clean_text(self, text):
-        """Clean text fields with improved handling"""
-        if pd.isna(text):
-            return text
-            
-        # Remove quotes and extra spaces
-        text = str(text).strip().strip('"').strip()
-        
-        # Remove HTML tags
-        text = re.sub(r'<[^>]+>', ' ', text)
-        
-        # Decode HTML entities
-        text = html.unescape(text)
-        
-        # Clean up whitespace and special characters
-        text = re.sub(r'\s+', ' ', text).strip()
-        text = re.sub(r'<br\s*/?>', ' ', text, flags=re.IGNORECASE)
-        
-        # Remove non-ASCII characters while preserving common symbols
-        text = ''.join(char if ord(char) < 128 or char in '•–—' else ' ' for char in text)
-        
-        return text.strip()
-
     def standardize_fda_response(self, response):
         """Standardize FDA response categories"""
         if pd.isna(response):
-            return 'unknown'
+            return FDA_RESPONSE_MISSING
             
         response = self.clean_text(str(response)).lower()
         
-        # Define standard response categories
-        categories = {
-            'no questions': ['no questions', 'no further questions', 'fda has no questions'],
-            'insufficient basis': ['insufficient basis', 'insufficient information'],
-            'cease to evaluate': ['cease', 'ceased to evaluate', 'stopped evaluation', 'fda ceased to evaluate'],
-            'withdrawn': ['withdraw', 'withdrawn', 'at the notifier\'s request'],
-            'pending': ['pending', 'under evaluation', 'in progress']
-        }
-        
-        for category, keywords in categories.items():
+        for category, keywords in FDA_RESPONSE_KEYWORDS.items():
             if any(keyword in response for keyword in keywords):
                 return category
                 
-        return 'other'
+        return FDA_RESPONSE_OTHER
+
+    @instrumented('fingerprint')
+    def row_fingerprints(self, df):
+        """Hash each raw source row and key it by its cleaned GRN number"""
+        raw = self.clean_column_names(df.copy())
+        keys = raw['gras_notice_(grn)_no.'].apply(self.clean_grn_number)
+        
+        # Hash the text form so the result does not depend on inferred dtypes
+        hashes = pd.util.hash_pandas_object(raw.fillna('').astype(str), index=False)
+        
+        return pd.DataFrame({
+            'grn_no': keys.astype('Int64'),
+            'row_hash': hashes.map('{:016x}'.format)
+        }, index=df.index)
 
-    def read_data(self):
-        """Read GRAS notices data with robust encoding handling"""
-        self.logger.info("Reading GRAS notices data...")
-        
-        encodings = ['utf-8', 'latin1', 'cp1252', 'iso-8859-1']
-        
-        for encoding in encodings:
-            try:
-                self.logger.info(f"Trying {encoding} encoding...")
-                df = pd.read_csv(self.input_file, skiprows=2, encoding=encoding, quoting=1)
-                self.logger.info(f"Successfully read file with {encoding} encoding")
-                return df
-            except UnicodeDecodeError:
-                continue
-            except Exception as e:
-                self.logger.error(f"Error with {encoding}: {e}")
-                continue
-        
-        raise Exception("Failed to read file with any encoding")
+    def tracked_rows(self, fingerprints):
+        """Rows without a unique GRN cannot be tracked and are always reprocessed"""
+        return fingerprints['grn_no'].notna() & ~fingerprints['grn_no'].duplicated(keep=False)
 
+    def load_manifest(self):
+        """Load the row hash manifest written by the previous run"""
+        if not self.manifest_file.exists():
+            return {'rows': {}, 'deleted': {}}
+        with self.manifest_file.open() as f:
+            return json.load(f)
+
+    def track_fingerprints(self, fingerprints):
+        """Add a batch of row fingerprints to the manifest rows
+        
+        Batches can be consecutive chunks of one file: a GRN repeated within
+        the batch or seen in an earlier one is dropped, as tracked_rows() does
+        for a whole file. Memory grows with the distinct GRNs, not the rows.
+        """
+        batch = fingerprints[fingerprints['grn_no'].notna()]
+        keys = batch['grn_no'].astype(str)
+        repeated = keys.duplicated(keep=False)
+        self.duplicate_grns.update(keys[repeated])
+        for grn, row_hash in zip(keys[~repeated], batch['row_hash'][~repeated]):
+            if grn in self.manifest_rows:
+                self.duplicate_grns.add(grn)
+            elif grn not in self.duplicate_grns:
+                self.manifest_rows[grn] = row_hash
+        for grn in self.duplicate_grns.intersection(self.manifest_rows):
+            del self.manifest_rows[grn]
+
+    def save_manifest(self):
+        """Record the tracked row hashes keyed by GRN number, carrying over deleted notices"""
+        manifest = self.load_manifest()
+        rows = self.manifest_rows
+        
+        now = datetime.now().isoformat()
+        deleted = {grn: ts for grn, ts in manifest.get('deleted', {}).items() if grn not in rows}
+        for grn in manifest.get('rows', {}):
+            if grn not in rows:
+                deleted.setdefault(grn, now)
+        
+        with self.manifest_file.open('w') as f:
+            json.dump({
+                'source_file': self.input_file.name,
+                'updated_timestamp': now,
+                'rows': rows,
+                'deleted': deleted
+            }, f, indent=2)
+        self.logger.info(f"Manifest saved to {self.manifest_file}")
+
+    def process_incremental(self, df, fingerprints):
+        """Process only new or changed notices and merge them into the existing output"""
+        manifest = self.load_manifest()
+        previous = manifest.get('rows', {})
+        if not previous or not self.output_file.exists():
+            self.logger.info("No previous manifest or output found, processing all notices")
+            return self.process_data(df)
+        
+        keys = fingerprints['grn_no'].astype(str)
+        tracked = self.tracked_rows(fingerprints)
+        known = tracked & keys.isin(previous.keys())
+        unchanged = known & (fingerprints['row_hash'] == keys.map(previous))
+        current_keys = set(keys[tracked])
+        
+        self.stats['incremental'] = {
+            'new': int((~known).sum()),
+            'changed': int((known & ~unchanged).sum()),
+            'unchanged': int(unchanged.sum()),
+            'deleted': sum(1 for grn in previous if grn not in current_keys)
+        }
+        self.logger.info(f"Incremental run: {self.stats['incremental']}")
+        
+        # Keep previously processed rows that are still unchanged, in source order
+        existing = pd.read_csv(self.output_file, dtype=str)
+        existing_keys = pd.to_numeric(existing['grn_no'], errors='coerce').astype('Int64').astype(str)
+        source_positions = pd.Series(fingerprints.index[unchanged], index=keys[unchanged])
+        kept = existing[existing_keys.isin(source_positions.index)]
+        kept.index = existing_keys[kept.index].map(source_positions)
+        
+        delta = df[~unchanged].copy()
+        if not delta.empty:
+            delta = self.process_data(delta)
+        # process_data only counted the reprocessed rows; the output holds every notice
+        self.stats['reprocessed_records'] = int((~unchanged).sum())
+        self.stats['total_records'] = len(df)
+        if delta.empty:
+            return kept.sort_index()
+        
+        # Render the delta exactly as a full run would write it
+        delta_text = pd.read_csv(io.StringIO(delta.to_csv(index=False)), dtype=str)
+        delta_text.index = delta.index
+        if list(delta_text.columns) != list(existing.columns):
+            self.logger.warning("Output columns changed since last run, processing all notices")
+            self.reset_stats()
+            return self.process_data(df)
+        
+        return pd.concat([kept, delta_text]).sort_index()
+
+    @instrumented('process')
     def process_data(self, df):
         """Process and clean the GRAS notices data"""
         self.logger.info("Processing GRAS notices data...")
         
         # Track initial statistics
-        self.stats['total_records'] = len(df)
+        self.stats['total_records'] += len(df)
         
         # Clean column names
-        df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
+        df = self.clean_column_names(df)
         
         # Clean text fields
-        text_columns = ['substance', 'intended_use', 'basis', 'notifier', 'notifier_address']
-        for col in text_columns:
-            if col in df.columns:
-                df[col] = df[col].apply(self.clean_text)
-                self.logger.info(f"Cleaned {col} column")
+        df = self.clean_text_columns(df)
         
         # Process dates with improved handling
         date_columns = ['date_of_filing', 'date_of_closure']
-        for col in date_columns:
-            if col in df.columns:
-                df[col] = df[col].apply(self.parse_date)
-                valid_dates = df[col].notna().sum()
-                self.stats['valid_dates'][col] = valid_dates
-                self.stats['invalid_dates'][col] = len(df) - valid_dates
+        with stage('parse', rows_in=len(df)):
+            for col in date_columns:
+                if col in df.columns:
+                    df[col] = pd.to_datetime(df[col].apply(self.parse_date))
+                    valid_dates = int(df[col].notna().sum())
+                    self.stats['valid_dates'][col] = self.stats['valid_dates'].get(col, 0) + valid_dates
+                    self.stats['invalid_dates'][col] = self.stats['invalid_dates'].get(col, 0) + len(df) - valid_dates
                 
-        # Extract year from filing date
-        df['filing_year'] = df['date_of_filing'].dt.year
+        # Extract year from filing date (float keeps the output format stable across batches)
+        df['filing_year'] = df['date_of_filing'].dt.year.astype(float)
+        if df['filing_year'].notna().any():
+            year_range = self.stats['filing_year_range']
+            year_range['min'] = min(year_range.get('min', np.inf), df['filing_year'].min())
+            year_range['max'] = max(year_range.get('max', -np.inf), df['filing_year'].max())
         
         # Clean GRN numbers
-        df['grn_no'] = df['gras_notice_(grn)_no.'].apply(self.clean_grn_number)
-        self.stats['grn_numbers'] = df['grn_no'].notna().sum()
+        df['grn_no'] = df['gras_notice_(grn)_no.'].apply(self.clean_grn_number).astype('Int64')
+        self.stats['grn_numbers'] += int(df['grn_no'].notna().sum())
         
         # Standardize FDA responses
         df['fda_response'] = df["fda's_letter"].apply(self.standardize_fda_response)
-        self.stats['fda_responses'] = df['fda_response'].value_counts().to_dict()
+        for category, count in df['fda_response'].value_counts().items():
+            self.stats['fda_responses'][category] = self.stats['fda_responses'].get(category, 0) + int(count)
         
         # Add data source and processing timestamp
         df['data_source'] = 'GRAS_NOTICES'
@@ -233,10 +308,28 @@ class GRASNoticesProcessor:
         
         return df
 
-    def print_statistics(self, df):
+    def process_chunks(self, chunks, track=False):
+        """Process chunks lazily, adding their raw row fingerprints to the manifest rows with `track`"""
+        for chunk in iter_stage('read', chunks):
+            if track:
+                self.track_fingerprints(self.row_fingerprints(chunk))
+            yield self.process_data(chunk)
+
+    def save_search_index(self):
+        """Rebuild the substance search index from the written output"""
+        with stage('index'):
+            index = save_dataset_index('gras', self.output_file)
+        self.logger.info(f"Search index of {len(index)} notices saved")
+
+    def print_statistics(self, df=None):
         """Print detailed processing statistics"""
         self.logger.info("\nProcessing Statistics:")
-        self.logger.info(f"Total records processed: {self.stats['total_records']}")
+        self.logger.info(f"Total records: {self.stats['total_records']}")
+        processed = self.stats['total_records']
+        if self.stats['reprocessed_records'] is not None:
+            processed = self.stats['reprocessed_records']
+            self.logger.info(f"Reprocessed records: {processed} (new or changed; "
+                             f"the date, GRN and response figures below cover only these)")
         
         self.logger.info("\nDate Processing Results:")
         for col, valid_count in self.stats['valid_dates'].items():
@@ -244,31 +337,69 @@ class GRASNoticesProcessor:
             self.logger.info(f"{col}:")
             self.logger.info(f"  Valid dates: {valid_count}")
             self.logger.info(f"  Invalid dates: {invalid_count}")
-            self.logger.info(f"  Success rate: {valid_count/len(df)*100:.1f}%")
+            if processed:
+                self.logger.info(f"  Success rate: {valid_count/processed*100:.1f}%")
         
         self.logger.info(f"\nValid GRN numbers: {self.stats['grn_numbers']}")
         
+        if self.stats['incremental']:
+            self.logger.info("\nIncremental Run:")
+            for status, count in self.stats['incremental'].items():
+                self.logger.info(f"  {status}: {count}")
+        
         self.logger.info("\nFDA Response Categories:")
         for category, count in self.stats['fda_responses'].items():
             self.logger.info(f"  {category}: {count}")
         
-        if 'filing_year' in df.columns:
-            year_range = df['filing_year'].agg(['min', 'max']).to_dict()
+        if df is not None and 'filing_year' in df.columns:
+            year_range = pd.to_numeric(df['filing_year']).agg(['min', 'max']).to_dict()
+        else:
+            year_range = self.stats['filing_year_range']
+        if year_range:
             self.logger.info(f"\nFiling year range: {year_range['min']} - {year_range['max']}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Process FDA GRAS notices data")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--incremental', action='store_true',
+                      help="only reprocess notices that are new or changed since the last run")
+    mode.add_argument('--chunksize', type=int,
+                      help="stream the source through in chunks of this many rows")
+    parser.add_argument('--profile', action='store_true',
+                        help="record stage timings and memory (also enabled by ETL_PROFILE=1)")
+    args = parser.parse_args()
+    
+    configure('gras_notices', args.profile)
     processor = GRASNoticesProcessor()
     
     try:
+        if args.chunksize:
+            # Stream chunks straight to the output; only stats and one hash per distinct GRN stay in memory
+            chunks = processor.process_chunks(processor.read_chunks(args.chunksize), track=True)
+            rows = processor.write_chunks(chunks)
+            processor.logger.info(f"\n{rows} rows saved to {processor.output_file}")
+            processor.save_manifest()
+            processor.save_search_index()
+            processor.print_statistics()
+            return
+        
         # Read data
         df = processor.read_data()
         
+        # Fingerprint raw rows before processing modifies them
+        fingerprints = processor.row_fingerprints(df)
+        processor.track_fingerprints(fingerprints)
+        
         # Process the data
-        df = processor.process_data(df)
+        if args.incremental:
+            df = processor.process_incremental(df, fingerprints)
+        else:
+            df = processor.process_data(df)
         
         # Save to CSV
-        df.to_csv(processor.output_file, index=False)
-        processor.logger.info(f"\nData saved to {processor.output_file}")
+        processor.write_output(df)
+        processor.save_manifest()
+        processor.save_search_index()
         
         # Print statistics
         processor.print_statistics(df)
@@ -276,6 +407,8 @@ def main():
     except Exception as e:
         processor.logger.error(f"Error processing data: {e}")
         raise
+    finally:
+        finish()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,191 @@
+'''
+HTTP Client Metrics
+
+Request telemetry for the API clients (FSIS recalls, CDC obesity):
+- Latency histograms for the network round trip and for JSON decoding
+- Response bytes and request counts by status code
+- Retry counts and failures by reason
+- Time spent sleeping, split into rate-limit waits, backoff and throttling
+- Summary printed at the end of a run
+- Optional Prometheus text export, written next to the file named by the
+  ETL_HTTP_METRICS environment variable with the client name added
+  (http.prom -> http.fsis.prom), so clients running side by side in the
+  pipeline do not overwrite each other's file
+
+The clients are single-threaded (one asyncio loop or plain requests), so
+the collector keeps plain counters without locking.
+'''
+
+import asyncio
+import os
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+ENV_EXPORT = 'ETL_HTTP_METRICS'
+
+# Upper bounds in seconds of the latency histogram buckets (the last one is +Inf)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float('inf'))
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, observations at or below it) for every bucket"""
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            yield bound, running
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket containing the q-quantile"""
+        if not self.count:
+            return None
+        target = q * self.count
+        for bound, running in self.cumulative():
+            if running >= target:
+                return bound
+        return self.buckets[-1]
+
+
+class HTTPMetrics:
+    """Aggregated request, retry and sleep statistics for one API client"""
+
+    def __init__(self, client: str):
+        self.client = client
+        self.request_latency = Histogram()
+        self.decode_latency = Histogram()
+        self.status_codes = Counter()
+        self.retries = Counter()
+        self.errors = Counter()
+        self.sleep_seconds = Counter()
+        self.bytes_received = 0
+
+    def observe_request(self, seconds: float, status: int, nbytes: int = 0) -> None:
+        """Record one completed HTTP round trip"""
+        self.request_latency.observe(seconds)
+        self.status_codes[str(status)] += 1
+        self.bytes_received += nbytes
+
+    def observe_decode(self, seconds: float) -> None:
+        """Record the time spent decoding one JSON body"""
+        self.decode_latency.observe(seconds)
+
+    def record_retry(self, reason: str) -> None:
+        self.retries[reason] += 1
+
+    def record_error(self, reason: str) -> None:
+        self.errors[reason] += 1
+
+    def sleep(self, seconds: float, reason: str) -> None:
+        """time.sleep that is accounted under `reason`"""
+        self.sleep_seconds[reason] += seconds
+        time.sleep(seconds)
+
+    async def async_sleep(self, seconds: float, reason: str) -> None:
+        """asyncio.sleep that is accounted under `reason`"""
+        self.sleep_seconds[reason] += seconds
+        await asyncio.sleep(seconds)
+
+    def summary(self) -> Dict[str, object]:
+        """Machine-readable totals"""
+        latency = self.request_latency
+        return {
+            'client': self.client,
+            'requests': latency.count,
+            'request_seconds': latency.total,
+            'request_p50_le': latency.quantile(0.5),
+            'request_p95_le': latency.quantile(0.95),
+            'decode_seconds': self.decode_latency.total,
+            'bytes_received': self.bytes_received,
+            'status_codes': dict(self.status_codes),
+            'retries': dict(self.retries),
+            'errors': dict(self.errors),
+            'sleep_seconds': dict(self.sleep_seconds)
+        }
+
+    def summary_lines(self):
+        """Human-readable summary, one line per figure"""
+        s = self.summary()
+        mean = s['request_seconds'] / s['requests'] if s['requests'] else 0.0
+        return [
+            f"HTTP metrics ({self.client}):",
+            f"  Requests: {s['requests']} ({s['request_seconds']:.2f}s network, mean {mean:.3f}s, "
+            f"p50 <= {s['request_p50_le']}s, p95 <= {s['request_p95_le']}s)",
+            f"  JSON decoding: {s['decode_seconds']:.2f}s",
+            f"  Bytes received: {s['bytes_received']:,}",
+            f"  Status codes: {s['status_codes'] or 'none'}",
+            f"  Retries: {s['retries'] or 'none'}",
+            f"  Errors: {s['errors'] or 'none'}",
+            f"  Sleep: {sum(s['sleep_seconds'].values()):.2f}s {s['sleep_seconds'] or ''}".rstrip()
+        ]
+
+    def to_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        client = f'client="{self.client}"'
+        lines = []
+
+        def histogram(name: str, help_text: str, hist: Histogram) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for bound, running in hist.cumulative():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{{{client},le="{le}"}} {running}')
+            lines.append(f"{name}_sum{{{client}}} {hist.total}")
+            lines.append(f"{name}_count{{{client}}} {hist.count}")
+
+        def counter(name: str, help_text: str, label: str, values: Counter) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(values.items()):
+                lines.append(f'{name}{{{client},{label}="{key}"}} {value}')
+
+        histogram('etl_http_request_duration_seconds', 'HTTP round trip time including the body.',
+                  self.request_latency)
+        histogram('etl_http_decode_duration_seconds', 'Time spent decoding JSON responses.',
+                  self.decode_latency)
+        counter('etl_http_requests_total', 'Completed HTTP requests by status code.', 'status', self.status_codes)
+        counter('etl_http_retries_total', 'Retried requests by reason.', 'reason', self.retries)
+        counter('etl_http_errors_total', 'Failed requests by reason.', 'reason', self.errors)
+        counter('etl_http_sleep_seconds_total', 'Time spent sleeping by reason.', 'reason', self.sleep_seconds)
+        lines.append("# HELP etl_http_response_bytes_total Response body bytes received.")
+        lines.append("# TYPE etl_http_response_bytes_total counter")
+        lines.append(f"etl_http_response_bytes_total{{{client}}} {self.bytes_received}")
+        return '\n'.join(lines) + '\n'
+
+    def export_path(self) -> Optional[Path]:
+        """This client's Prometheus file under ETL_HTTP_METRICS, None when the variable is unset"""
+        base = os.environ.get(ENV_EXPORT)
+        if not base:
+            return None
+        base = Path(base)
+        return base.with_name(f"{base.stem}.{self.client}{base.suffix}")
+
+    def report(self, emit: Callable[[str], None] = print, path: Optional[Path] = None) -> Optional[Path]:
+        """Emit the summary and write the Prometheus file to `path` or this client's ETL_HTTP_METRICS file"""
+        for line in self.summary_lines():
+            emit(line)
+        path = path or self.export_path()
+        if not path:
+            return None
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.to_prometheus())
+        emit(f"HTTP metrics exported to {path}")
+        return path
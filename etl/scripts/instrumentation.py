@@ -0,0 +1,273 @@
+'''
+Stage Instrumentation
+
+Lightweight timing and memory profiling for the ETL scripts and the verifier:
+- stage() context manager and @instrumented decorator (sync and async)
+- iter_stage() for lazily produced chunks, timing each next() call
+- Wall time, self time (excluding nested stages), CPU time and call counts
+- Rows in / rows out and rows per second
+- Peak traced memory per stage via tracemalloc
+- JSON run profile and a plain-text summary table
+
+Profiling is off unless enabled with enable() or the ETL_PROFILE environment
+variable (ETL_PROFILE=1, optionally ETL_PROFILE_DIR=<dir> for the JSON output).
+When off, stage() returns a shared no-op object and @instrumented calls the
+function directly, so instrumented code pays only a flag check.
+
+CPU time is process-wide and tracemalloc tracks the whole process, so
+stages running concurrently on threads share those figures.
+'''
+
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+ENV_FLAG = 'ETL_PROFILE'
+ENV_DIR = 'ETL_PROFILE_DIR'
+
+# Default location of the JSON profiles, shared by all scripts
+DEFAULT_PROFILE_DIR = Path(__file__).parent.parent / 'data/profiles'
+
+
+class StageRecord:
+    """Measurements for one execution of a stage; set rows_in / rows_out inside the block"""
+
+    __slots__ = ('name', 'rows_in', 'rows_out', 'child_wall', 'peak')
+
+    def __init__(self, name: str, rows_in: Optional[int] = None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.child_wall = 0.0
+        self.peak = 0
+
+
+class _NullStage:
+    """Reusable no-op stage used while profiling is disabled; attribute writes are ignored"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Profiler:
+    """Collects per-stage measurements for one run, aggregated by stage name"""
+
+    def __init__(self):
+        self.enabled = False
+        self.run_name = None
+        self.output_dir = None
+        self.started = None
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self, run_name: str, output_dir: Optional[Path] = None) -> None:
+        """Start collecting; the JSON profile is written to output_dir by finish()"""
+        self.enabled = True
+        self.run_name = run_name
+        self.output_dir = Path(output_dir or os.environ.get(ENV_DIR) or DEFAULT_PROFILE_DIR)
+        self.started = datetime.now().isoformat()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def _measure(self, name: str, rows_in: Optional[int]):
+        stack = self._stack()
+        record = StageRecord(name, rows_in)
+
+        # The parent's peak so far is kept before the tracer's peak is reset for this stage
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1].peak = max(stack[-1].peak, peak)
+        tracemalloc.reset_peak()
+        start_memory = current
+
+        stack.append(record)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            stack.pop()
+
+            peak = max(record.peak, tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1].child_wall += wall
+                stack[-1].peak = max(stack[-1].peak, peak)
+            self._add(record, wall, cpu, max(peak - start_memory, 0))
+
+    def _add(self, record: StageRecord, wall: float, cpu: float, peak_bytes: int) -> None:
+        with self._lock:
+            totals = self.stages.setdefault(record.name, {
+                'calls': 0, 'wall_seconds': 0.0, 'self_seconds': 0.0, 'cpu_seconds': 0.0,
+                'rows_in': None, 'rows_out': None, 'peak_memory_bytes': 0
+            })
+            totals['calls'] += 1
+            totals['wall_seconds'] += wall
+            totals['self_seconds'] += max(wall - record.child_wall, 0.0)
+            totals['cpu_seconds'] += cpu
+            for key in ('rows_in', 'rows_out'):
+                value = getattr(record, key)
+                if value is not None:
+                    totals[key] = (totals[key] or 0) + int(value)
+            totals['peak_memory_bytes'] = max(totals['peak_memory_bytes'], peak_bytes)
+
+    def stage(self, name: str, rows_in: Optional[int] = None):
+        """Context manager measuring one stage; a no-op while profiling is disabled"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._measure(name, rows_in)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Machine-readable run profile"""
+        with self._lock:
+            stages = {}
+            for name, totals in self.stages.items():
+                rows = totals['rows_out'] if totals['rows_out'] is not None else totals['rows_in']
+                wall = totals['wall_seconds']
+                stages[name] = {
+                    **totals,
+                    'rows_per_second': rows / wall if rows is not None and wall > 0 else None
+                }
+        return {
+            'run': self.run_name,
+            'started': self.started,
+            'finished': datetime.now().isoformat(),
+            'stages': stages
+        }
+
+    def summary_table(self) -> str:
+        """Plain-text table of every stage, in order of first completion"""
+        header = (f"{'stage':<30} {'calls':>5} {'wall s':>9} {'self s':>9} {'cpu s':>9} "
+                  f"{'rows in':>10} {'rows out':>10} {'rows/s':>12} {'peak MB':>9}")
+        lines = [header, '-' * len(header)]
+        for name, stage in self.to_dict()['stages'].items():
+            def rows(value):
+                return f"{value:>10,}" if value is not None else f"{'-':>10}"
+            rate = stage['rows_per_second']
+            lines.append(
+                f"{name:<30} {stage['calls']:>5} {stage['wall_seconds']:>9.3f} "
+                f"{stage['self_seconds']:>9.3f} {stage['cpu_seconds']:>9.3f} "
+                f"{rows(stage['rows_in'])} {rows(stage['rows_out'])} "
+                f"{(f'{rate:,.0f}' if rate is not None else '-'):>12} "
+                f"{stage['peak_memory_bytes'] / 1e6:>9.1f}"
+            )
+        return '\n'.join(lines)
+
+    def finish(self) -> Optional[Path]:
+        """Print the summary table and write the JSON profile, returning its path"""
+        if not self.enabled:
+            return None
+        profile = self.to_dict()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = self.output_dir / f"{self.run_name}_{timestamp}.json"
+        path.write_text(json.dumps(profile, indent=2))
+        print(f"\nStage profile ({self.run_name}):")
+        print(self.summary_table())
+        print(f"Profile saved to {path}")
+        return path
+
+
+# Process-wide profiler used by the module-level helpers
+PROFILER = Profiler()
+
+
+def enable(run_name: str, output_dir: Optional[Path] = None) -> None:
+    """Turn profiling on for this process"""
+    PROFILER.enable(run_name, output_dir)
+
+
+def configure(run_name: str, flag: bool = False, output_dir: Optional[Path] = None) -> bool:
+    """Enable profiling when a command-line flag is set or ETL_PROFILE is truthy"""
+    if flag or os.environ.get(ENV_FLAG, '').lower() in ('1', 'true', 'yes'):
+        enable(run_name, output_dir)
+    return PROFILER.enabled
+
+
+def stage(name: str, rows_in: Optional[int] = None):
+    """Measure a block as a named stage: `with stage('clean', rows_in=len(df)) as s: ...`"""
+    return PROFILER.stage(name, rows_in)
+
+
+def finish() -> Optional[Path]:
+    """Print and save the run profile if profiling is enabled"""
+    return PROFILER.finish()
+
+
+def _row_count(value) -> Optional[int]:
+    """Length of a DataFrame-like value, None for anything else"""
+    if hasattr(value, 'shape') and getattr(value, 'ndim', 0) >= 1:
+        return int(value.shape[0])
+    return None
+
+
+def instrumented(name: str):
+    """Decorator measuring each call as a stage; rows in/out come from DataFrame arguments and results"""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not PROFILER.enabled:
+                    return await func(*args, **kwargs)
+                rows_in = next((_row_count(a) for a in args if _row_count(a) is not None), None)
+                with PROFILER.stage(name, rows_in) as record:
+                    result = await func(*args, **kwargs)
+                    record.rows_out = _row_count(result)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            rows_in = next((_row_count(a) for a in args if _row_count(a) is not None), None)
+            with PROFILER.stage(name, rows_in) as record:
+                result = func(*args, **kwargs)
+                record.rows_out = _row_count(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def iter_stage(name: str, iterable):
+    """Yield from an iterable, measuring the production of each item as a stage"""
+    if not PROFILER.enabled:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    while True:
+        with PROFILER.stage(name) as record:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            record.rows_out = _row_count(item)
+        yield item
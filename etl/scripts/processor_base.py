@@ -0,0 +1,219 @@
+'''
+Shared Processor Framework
+
+Common core of the dataset processors (GRAS notices, FDA substances,
+WHO obesity, CDC obesity and FSIS recalls):
+- Paths resolved from the repository root, logging and a stats dictionary
+- Encoding detection and CSV reading, whole or lazily in chunks
+- Column-name normalization and text cleaning through the vectorized
+  helpers in text_cleaning.py
+- Pluggable chunked output writers, CSVWriter by default, each wrapped in
+  a SnapshotWriter that also leaves a memory-mappable Arrow snapshot of
+  the output next to it (snapshot.py) when pyarrow is installed, and in a
+  ValidatingWriter that checks each chunk against the output's data
+  quality schema (data_quality.py)
+- read / clean / process / write stages recorded by the instrumentation
+- run() and run_chunked() driving read -> process -> write
+
+Subclasses describe their source and output with class attributes and
+implement process_data(); the API clients fetch instead of reading and
+reuse the rest.
+'''
+
+import logging
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from data_quality import ValidatingWriter, schema_for
+from instrumentation import instrumented, iter_stage, stage
+from snapshot import SnapshotWriter, snapshots_available
+from text_cleaning import clean_series, clean_text
+
+# Tried in order; the FDA exports currently only decode as latin1
+ENCODINGS = ['utf-8', 'latin1', 'cp1252', 'iso-8859-1']
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class CSVWriter:
+    """Streams DataFrame chunks into one UTF-8 CSV, writing the header with the first chunk"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.rows = 0
+        self._file = None
+        self._header = True
+
+    def __enter__(self):
+        self._file = self.path.open('w', encoding='utf-8', newline='')
+        return self
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        chunk.to_csv(self._file, index=False, header=self._header)
+        self._header = False
+        self.rows += len(chunk)
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+        return False
+
+
+class BaseProcessor:
+    """Paths, logging, reading, cleaning and writing shared by the dataset processors"""
+
+    # Description used in log messages, e.g. "GRAS notices data"
+    label = 'data'
+    # File names under etl/data/source and etl/data/processed
+    source_file: Optional[str] = None
+    output_name: Optional[str] = None
+    # Source CSV layout: preamble lines before the header and extra read_csv options
+    skiprows = 0
+    read_options = {}
+    encodings = ENCODINGS
+    # Text columns cleaned by clean_text_columns()
+    text_columns: List[str] = []
+    replace_diamonds = False
+    writer_class = CSVWriter
+    # Also write an Arrow snapshot of the output for readers to memory-map
+    write_snapshot = True
+    # Check the output against its schema in data_quality.py while writing it
+    validate_output = True
+
+    def __init__(self):
+        # Set up paths using pathlib for cross-platform compatibility
+        self.base_path = Path(__file__).parent.parent.parent
+        self.source_dir = self.base_path / "etl/data/source"
+        self.output_dir = self.base_path / "etl/data/processed"
+        self.input_file = self.source_dir / self.source_file if self.source_file else None
+        self.output_file = self.output_dir / self.output_name if self.output_name else None
+
+        # Ensure output directory exists
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        # Set up logging; a script that configured logging first keeps its setup
+        logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+        self.logger = logging.getLogger(type(self).__module__)
+
+        # Track processing statistics
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset processing statistics; process_data accumulates into them"""
+        self.stats = {'total_records': 0}
+
+    # Reading
+
+    def detect_encoding(self):
+        """Find the first encoding that decodes the whole file, reading it in blocks"""
+        for encoding in self.encodings:
+            try:
+                with self.input_file.open(encoding=encoding) as f:
+                    while f.read(1 << 20):
+                        pass
+                return encoding
+            except UnicodeDecodeError:
+                continue
+
+        raise Exception("Failed to read file with any encoding")
+
+    def read_chunks(self, chunksize):
+        """Read the source lazily in chunks of `chunksize` rows"""
+        encoding = self.detect_encoding()
+        self.logger.info(f"Reading {self.label} in chunks of {chunksize} with {encoding} encoding...")
+        return pd.read_csv(self.input_file, skiprows=self.skiprows, encoding=encoding,
+                           chunksize=chunksize, **self.read_options)
+
+    @instrumented('read')
+    def read_data(self):
+        """Read the source CSV, trying each encoding in turn"""
+        self.logger.info(f"Reading {self.label}...")
+
+        for encoding in self.encodings:
+            try:
+                self.logger.info(f"Trying {encoding} encoding...")
+                df = pd.read_csv(self.input_file, skiprows=self.skiprows, encoding=encoding, **self.read_options)
+                self.logger.info(f"Successfully read file with {encoding} encoding")
+                return df
+            except UnicodeDecodeError:
+                continue
+            except Exception as e:
+                self.logger.error(f"Error with {encoding}: {e}")
+                continue
+
+        raise Exception("Failed to read file with any encoding")
+
+    # Cleaning
+
+    def clean_column_names(self, df):
+        """Normalize column names to lowercase snake case"""
+        df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
+        return df
+
+    def clean_text(self, text):
+        """Clean one text value the way the text columns are cleaned"""
+        return clean_text(text, replace_diamonds=self.replace_diamonds)
+
+    def clean_text_columns(self, df, columns=None, cleaner=None):
+        """Clean text columns in place (see clean_series); missing columns are skipped"""
+        cleaner = cleaner or (lambda series: clean_series(series, replace_diamonds=self.replace_diamonds))
+        with stage('clean', rows_in=len(df)):
+            for col in (self.text_columns if columns is None else columns):
+                if col in df.columns:
+                    df[col] = cleaner(df[col])
+                    self.logger.info(f"Cleaned {col} column")
+        return df
+
+    # Processing
+
+    def process_data(self, df):
+        """Turn a raw frame (or chunk) into output rows; implemented by each processor"""
+        raise NotImplementedError
+
+    def process_chunks(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Process chunks lazily so only the running statistics stay in memory"""
+        for chunk in iter_stage('read', chunks):
+            yield self.process_data(chunk)
+
+    # Writing
+
+    def open_writer(self, path: Optional[Path] = None):
+        """Output writer for `path` (the processor's output file by default)"""
+        path = path or self.output_file
+        writer = self.writer_class(path)
+        if self.write_snapshot and snapshots_available():
+            writer = SnapshotWriter(writer)
+        schema = schema_for(path)
+        if self.validate_output and schema is not None:
+            writer = ValidatingWriter(writer, schema)
+        return writer
+
+    def write_chunks(self, chunks: Iterable[pd.DataFrame], path: Optional[Path] = None) -> int:
+        """Stream processed chunks to the output, returning the number of rows written"""
+        with self.open_writer(path) as writer:
+            for chunk in chunks:
+                with stage('write', rows_in=len(chunk)) as s:
+                    writer.write(chunk)
+                    s.rows_out = len(chunk)
+        return writer.rows
+
+    def write_output(self, df: pd.DataFrame, path: Optional[Path] = None) -> int:
+        """Write a whole processed frame to the output"""
+        rows = self.write_chunks([df], path)
+        self.logger.info(f"\nData saved to {path or self.output_file}")
+        return rows
+
+    # Driving
+
+    def run(self):
+        """Read, process and write the whole source; returns the processed frame"""
+        df = self.process_data(self.read_data())
+        self.write_output(df)
+        return df
+
+    def run_chunked(self, chunksize):
+        """Stream the source through in chunks; returns the number of rows written"""
+        rows = self.write_chunks(self.process_chunks(self.read_chunks(chunksize)))
+        self.logger.info(f"\n{rows} rows saved to {self.output_file}")
+        return rows
@@ -0,0 +1,148 @@
+'''
+Recall Rollup Cube
+
+Precomputed recall counts over every combination of the recall dimensions:
+- Dimensions: year, month, state, risk_level, recall_reason, processing_type
+- Measures: recalls (distinct recall count) and quantity_lbs (summed)
+- All 64 grouping sets, from the grand total down to the finest cells;
+  grouping_id has bit i set when DIMENSIONS[i] is rolled up, so a subtotal
+  is never confused with a missing member
+- States come from the recall-to-state bridge (USPS abbreviations, US for
+  nationwide). A multi-state recall counts once in each of its states and
+  once in every cell where the state is rolled up. Recalls without a state
+  in the bridge are kept under UNKNOWN_STATE, so every recall is in the
+  state cells too
+- Stored as Parquet next to the processed datasets
+
+Run this file directly to rebuild the cube from the processed recalls, or
+pass --by/--where to print cells from it.
+'''
+
+import argparse
+import sys
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from geography import BRIDGE_FILE, geography_table, recall_state_bridge
+
+DIMENSIONS = ['year', 'month', 'state', 'risk_level', 'recall_reason', 'processing_type']
+MEASURES = ['recalls', 'quantity_lbs']
+CUBE_FILE = 'recall_cube.parquet'
+# State of recalls that list none
+UNKNOWN_STATE = 'Unknown'
+
+
+def grouping_id(dimensions: Sequence[str]) -> int:
+    """Bitmask of the dimensions rolled up in the cells grouped by `dimensions`"""
+    return sum(1 << i for i, dim in enumerate(DIMENSIONS) if dim not in dimensions)
+
+
+def recall_facts(recalls_df: pd.DataFrame) -> pd.DataFrame:
+    """One row per recall with its year, month and the non-state dimensions"""
+    dates = pd.to_datetime(recalls_df['recall_date'], errors='coerce')
+    facts = pd.DataFrame({
+        'recall_number': recalls_df['recall_number'],
+        'year': dates.dt.year.astype('Int16'),
+        'month': dates.dt.month.astype('Int8'),
+        'risk_level': recalls_df['risk_level'],
+        'recall_reason': recalls_df['recall_reason'],
+        'processing_type': recalls_df['processing_type'],
+        'quantity_lbs': pd.to_numeric(recalls_df['quantity_lbs'], errors='coerce')
+    })
+    return facts.drop_duplicates('recall_number')
+
+
+def _finest(facts: pd.DataFrame, dimensions: List[str]) -> pd.DataFrame:
+    """Counts and sums at the finest grain of `dimensions`, each fact row counted once"""
+    return (facts.groupby(dimensions, dropna=False, observed=True)
+            .agg(recalls=('recall_number', 'size'), quantity_lbs=('quantity_lbs', 'sum'))
+            .reset_index())
+
+
+def build_cube(recalls_df: pd.DataFrame, bridge: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Every grouping set of DIMENSIONS with its recall count and quantity"""
+    facts = recall_facts(recalls_df)
+    if bridge is None:
+        bridge = recall_state_bridge(recalls_df)
+    states = geography_table().set_index('state_code')['state_abbr']
+    state_facts = facts.merge(bridge.assign(state=bridge['state_code'].map(states)), on='recall_number', how='left')
+    state_facts['state'] = state_facts['state'].fillna(UNKNOWN_STATE)
+
+    # Recalls are unique within each fact table, so coarser cells re-aggregate these finest ones
+    others = [dim for dim in DIMENSIONS if dim != 'state']
+    finest = {
+        False: _finest(facts, others),
+        True: _finest(state_facts, DIMENSIONS)
+    }
+
+    cells = []
+    for size in range(len(DIMENSIONS) + 1):
+        for dimensions in combinations(DIMENSIONS, size):
+            base = finest['state' in dimensions]
+            if dimensions:
+                grouped = base.groupby(list(dimensions), dropna=False, observed=True)[MEASURES].sum().reset_index()
+            else:
+                grouped = base[MEASURES].sum().to_frame().T
+            cells.append(grouped.assign(grouping_id=grouping_id(dimensions)))
+
+    cube = pd.concat(cells, ignore_index=True)
+    cube['recalls'] = cube['recalls'].astype('int64')
+    cube['quantity_lbs'] = cube['quantity_lbs'].astype('float64')
+    cube['grouping_id'] = cube['grouping_id'].astype('int8')
+    for dim in ['state', 'risk_level', 'recall_reason', 'processing_type']:
+        cube[dim] = cube[dim].astype('category')
+    return cube[DIMENSIONS + ['grouping_id'] + MEASURES]
+
+
+def save_cube(recalls_df: pd.DataFrame, output_dir: Path, bridge: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Build the cube and write it next to the processed datasets"""
+    cube = build_cube(recalls_df, bridge)
+    cube.to_parquet(Path(output_dir) / CUBE_FILE, index=False)
+    return cube
+
+
+def load_cube(processed_dir: Path) -> pd.DataFrame:
+    """Read the stored cube"""
+    return pd.read_parquet(Path(processed_dir) / CUBE_FILE)
+
+
+def select(cube: pd.DataFrame, by: Sequence[str] = (), **filters) -> pd.DataFrame:
+    """Cells grouped by `by` and restricted to `filters`, all other dimensions rolled up"""
+    cells = cube[cube['grouping_id'] == grouping_id(list(by) + list(filters))]
+    for dim, value in filters.items():
+        cells = cells[cells[dim] == value]
+    return cells[list(by) + MEASURES].reset_index(drop=True)
+
+
+def _parse_filters(pairs: List[str]) -> Dict[str, object]:
+    filters = {}
+    for pair in pairs:
+        dim, _, value = pair.partition('=')
+        if dim not in DIMENSIONS:
+            raise SystemExit(f"Unknown dimension: {dim}")
+        filters[dim] = int(value) if dim in ('year', 'month') else value
+    return filters
+
+
+if __name__ == '__main__':
+    processed_dir = Path(__file__).parent.parent / 'data/processed'
+    parser = argparse.ArgumentParser(description="Build or query the recall rollup cube")
+    parser.add_argument('recalls', nargs='?', type=Path, default=processed_dir / 'processed_fsis_recalls.csv',
+                        help="processed recalls to build the cube from")
+    parser.add_argument('--by', nargs='*', choices=DIMENSIONS, help="print cells grouped by these dimensions")
+    parser.add_argument('--where', nargs='*', default=[], metavar='DIM=VALUE', help="restrict printed cells")
+    args = parser.parse_args()
+
+    if args.by is not None or args.where:
+        cells = select(load_cube(processed_dir), args.by or (), **_parse_filters(args.where))
+        print(cells.sort_values('recalls', ascending=False).to_string(index=False))
+        sys.exit(0)
+
+    recalls = pd.read_csv(args.recalls, dtype={'recall_number': str, 'states': str})
+    bridge_path = processed_dir / BRIDGE_FILE
+    bridge = pd.read_csv(bridge_path) if bridge_path.exists() else None
+    cube = save_cube(recalls, processed_dir, bridge)
+    print(f"Saved {CUBE_FILE} with {len(cube)} cells to {processed_dir}")
@@ -0,0 +1,265 @@
+'''
+Recall Search Index
+
+Token and establishment index over the processed FSIS recalls:
+- Keyword search over establishment, products and title (text_index.py),
+  with prefix matching on the last word, e.g. "ground be"
+- Establishment keys: the name with HTML entities decoded, apostrophes,
+  parenthesized and d/b/a parts and legal suffixes (Inc, LLC, Corp, ...)
+  removed, so "Pilgrim&#039;s Pride Corporation" and "Pilgrims Pride"
+  share one key; establishment_id is a short hash of that key
+- Establishment lookup by id, and by name through a character trigram
+  index over the distinct keys, so spelling variants rank by similarity
+- Incremental: each FSIS run adds only recalls that are new or whose
+  text changed since the last run (tracked by a content digest per recall
+  number); replaced and withdrawn recalls are deleted from the index
+- Saved as etl/data/index/recalls.json
+
+Usage (from the repository root):
+    python etl/scripts/recall_index.py search "ground beef patties"
+    python etl/scripts/recall_index.py establishment "Pilgrims Pride"
+    python etl/scripts/recall_index.py build --rebuild
+'''
+
+import argparse
+import hashlib
+import html
+import re
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import pandas as pd
+
+from text_index import InvertedIndex, tokenize
+
+PROCESSED_DIR = Path(__file__).parent.parent / 'data/processed'
+INDEX_FILE = Path(__file__).parent.parent / 'data/index/recalls.json'
+
+# Indexed fields (establishment first, so hits on it rank highest) and columns returned with each hit
+FIELDS = ['establishment', 'products', 'title']
+STORED = ['recall_number', 'recall_date', 'establishment', 'establishment_id', 'risk_level']
+# Columns whose change makes a recall be re-indexed
+DIGEST_COLUMNS = ['title', 'establishment', 'products', 'recall_date', 'risk_level']
+
+LEGAL_SUFFIXES = {'co', 'company', 'corp', 'corporation', 'inc', 'incorporated', 'llc', 'lp', 'llp', 'ltd',
+                  'limited', 'the'}
+PARENTHESIZED_RE = re.compile(r'\([^)]*\)')
+DBA_RE = re.compile(r'\b(?:d/b/a|dba)\b.*', re.IGNORECASE)
+
+
+# Establishment keys
+
+def establishment_key(name) -> Optional[str]:
+    """Normalized establishment name that spelling and legal-form variants share"""
+    if not isinstance(name, str):
+        return None
+    name = html.unescape(name).replace("'", '').replace('’', '')
+    name = DBA_RE.sub('', PARENTHESIZED_RE.sub(' ', name))
+    tokens = [token for token in tokenize(name) if token not in LEGAL_SUFFIXES]
+    return ' '.join(tokens) or None
+
+
+def establishment_id(name) -> Optional[str]:
+    """Short stable hash of an establishment key"""
+    key = establishment_key(name)
+    return hashlib.sha1(key.encode()).hexdigest()[:16] if key else None
+
+
+def _trigrams(key: str) -> Set[str]:
+    text = f" {key} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _digests(df: pd.DataFrame) -> pd.Series:
+    columns = df.reindex(columns=DIGEST_COLUMNS).fillna('').astype(str)
+    return columns.agg('\x1f'.join, axis=1).map(lambda text: hashlib.sha1(text.encode()).hexdigest()[:16])
+
+
+# Index
+
+class RecallIndex:
+    """Keyword and establishment search over recalls, updated in place as recalls arrive"""
+
+    def __init__(self, text: Optional[InvertedIndex] = None):
+        self.text = text or InvertedIndex(FIELDS, STORED, meta={'dataset': 'fsis', 'recalls': {}})
+        # Recall number -> [document id, content digest] of its current document
+        self.recalls: Dict[str, list] = self.text.meta['recalls']
+        self._load_establishments()
+
+    def _load_establishments(self) -> None:
+        """Establishment id -> live documents, key and display name, plus trigram postings over the keys"""
+        self.establishments: Dict[str, List[int]] = defaultdict(list)
+        self.names: Dict[str, str] = {}
+        self.keys: Dict[str, str] = {}
+        self.grams: Dict[str, Set[str]] = defaultdict(set)
+        self._add_establishments(doc_id for doc_id, _ in self.recalls.values())
+
+    def _add_establishments(self, doc_ids) -> None:
+        column = self.text.stored.index('establishment_id')
+        name_column = self.text.stored.index('establishment')
+        for doc_id in doc_ids:
+            doc = self.text.docs[doc_id]
+            ident = doc[column]
+            if ident is None:
+                continue
+            self.establishments[ident].append(doc_id)
+            if ident not in self.keys:
+                self.names[ident] = doc[name_column]
+                self.keys[ident] = establishment_key(doc[name_column])
+                for gram in _trigrams(self.keys[ident]):
+                    self.grams[gram].add(ident)
+
+    @classmethod
+    def load(cls, path: Path = INDEX_FILE) -> 'RecallIndex':
+        return cls(InvertedIndex.load(path))
+
+    @classmethod
+    def open(cls, path: Path = INDEX_FILE) -> 'RecallIndex':
+        """The saved index, or an empty one before the first build"""
+        return cls.load(path) if Path(path).exists() else cls()
+
+    def save(self, path: Path = INDEX_FILE) -> None:
+        self.text.save(path)
+
+    def __len__(self) -> int:
+        return len(self.recalls)
+
+    # Updating
+
+    def update(self, df: pd.DataFrame, prune: bool = False) -> Dict[str, int]:
+        """Index new and changed recalls of a processed frame; with `prune`, drop recalls not in it
+
+        Returns the number of recalls added, replaced, unchanged and removed.
+        """
+        # Dates as written to the CSV, so the digest is the same for frames read back from it
+        df = (df.drop_duplicates('recall_number', keep='last')
+              .assign(recall_date=lambda d: pd.to_datetime(d['recall_date'], errors='coerce').dt.strftime('%Y-%m-%d')))
+        numbers = df['recall_number'].astype(str)
+        digests = _digests(df)
+        known = numbers.map(lambda number: (self.recalls.get(number) or [None, None])[1])
+        changed = (digests != known).to_numpy()
+
+        stale = [self.recalls[number][0] for number in numbers[changed] if number in self.recalls]
+        removed = []
+        if prune:
+            removed = sorted(set(self.recalls) - set(numbers))
+            stale += [self.recalls.pop(number)[0] for number in removed]
+
+        fresh = df[changed].assign(establishment_id=lambda d: d['establishment'].map(establishment_id))
+        doc_ids = self.text.add(fresh)
+        for number, doc_id, digest in zip(numbers[changed], doc_ids, digests[changed]):
+            self.recalls[number] = [doc_id, digest]
+
+        self.text.delete(stale)
+        if stale:
+            self._load_establishments()
+        else:
+            self._add_establishments(doc_ids)
+
+        return {
+            'added': len(doc_ids) - (len(stale) - len(removed)),
+            'replaced': len(stale) - len(removed),
+            'unchanged': int((~changed).sum()),
+            'removed': len(removed)
+        }
+
+    # Querying
+
+    def _frame(self, doc_ids, scores: Optional[List[float]] = None) -> pd.DataFrame:
+        rows = [self.text.doc(doc_id) for doc_id in doc_ids]
+        frame = pd.DataFrame(rows, columns=STORED)
+        if scores is not None:
+            frame.insert(0, 'score', scores)
+        return frame
+
+    def search(self, query: str, prefix: bool = True, limit: Optional[int] = 20) -> pd.DataFrame:
+        """Recalls whose establishment, products or title hold every query word, best first"""
+        hits = self.text.search(query, prefix=prefix, limit=limit)
+        return self._frame([doc_id for doc_id, _ in hits], [score for _, score in hits])
+
+    def find_establishments(self, name: str, min_score: float = 0.5, limit: int = 10) -> pd.DataFrame:
+        """Establishments whose key is similar to `name`'s (Dice coefficient of trigrams), best first"""
+        key = establishment_key(name)
+        columns = ['establishment_id', 'establishment', 'recalls', 'score']
+        if not key:
+            return pd.DataFrame(columns=columns)
+
+        grams = _trigrams(key)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for ident in self.grams.get(gram, ()):
+                shared[ident] += 1
+        scored = [
+            (ident, 2 * count / (len(grams) + len(_trigrams(self.keys[ident]))))
+            for ident, count in shared.items()
+        ]
+        scored = sorted((item for item in scored if item[1] >= min_score), key=lambda item: -item[1])[:limit]
+        return pd.DataFrame([
+            (ident, self.names[ident], len(self.establishments[ident]), round(score, 3)) for ident, score in scored
+        ], columns=columns)
+
+    def establishment_recalls(self, name_or_id: str) -> pd.DataFrame:
+        """Every recall of one establishment, given its id or any name with the same key"""
+        ident = name_or_id if name_or_id in self.establishments else establishment_id(name_or_id)
+        doc_ids = sorted(self.establishments.get(ident, []))
+        return self._frame(doc_ids).sort_values('recall_date', ascending=False).reset_index(drop=True)
+
+
+def update_recall_index(df: pd.DataFrame, path: Path = INDEX_FILE, prune: bool = True) -> Dict[str, int]:
+    """Bring the saved index up to date with a processed recall frame"""
+    index = RecallIndex.open(path)
+    changes = index.update(df, prune=prune)
+    index.save(path)
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or search the recall index")
+    parser.add_argument('--index-file', type=Path, default=INDEX_FILE)
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="update the index from the processed recalls")
+    build.add_argument('--processed-dir', type=Path, default=PROCESSED_DIR)
+    build.add_argument('--rebuild', action='store_true', help="start from an empty index")
+    search = commands.add_parser('search', help="find recalls by establishment, product or title words")
+    search.add_argument('query')
+    search.add_argument('--exact', action='store_true', help="match whole words only, not prefixes")
+    search.add_argument('--limit', type=int, default=20)
+    establishment = commands.add_parser('establishment', help="list one establishment's recalls")
+    establishment.add_argument('name', help="establishment name or id")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == 'build':
+        if args.rebuild:
+            args.index_file.unlink(missing_ok=True)
+        recalls = pd.read_csv(args.processed_dir / 'processed_fsis_recalls.csv', dtype={'recall_number': str})
+        changes = update_recall_index(recalls, args.index_file)
+        print(f"Updated {args.index_file}: " + ', '.join(f"{count} {kind}" for kind, count in changes.items()))
+        print(f"Built in {time.perf_counter() - start:.2f}s")
+        return
+
+    index = RecallIndex.load(args.index_file)
+    loaded = time.perf_counter()
+    with pd.option_context('display.max_colwidth', 60, 'display.width', 200):
+        if args.command == 'search':
+            result = index.search(args.query, prefix=not args.exact, limit=args.limit)
+        else:
+            result = index.establishment_recalls(args.name)
+            if result.empty:
+                matches = index.find_establishments(args.name)
+                print("No establishment with that key; similar names:" if len(matches) else "No matches")
+                result = matches
+        searched = time.perf_counter()
+        if len(result):
+            print(result.to_string(index=False))
+        elif args.command == 'search':
+            print("No matches")
+    print(f"\n{len(result)} rows; load {(loaded - start) * 1000:.1f} ms, "
+          f"query {(searched - loaded) * 1000:.2f} ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
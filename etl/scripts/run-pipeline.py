@@ -0,0 +1,361 @@
+'''
+## Key Features
+
+**Declared Pipeline**
+- Every stage names its script, input files, output files and the code
+  it depends on (the script plus the local modules it imports)
+- Dependencies between stages follow from inputs and outputs: a stage
+  runs after every stage that produces one of its inputs
+- Running a stage also runs the stages it depends on
+
+**Parallel Execution**
+- Independent stages (GRAS, WHO, FSIS, CDC) run side by side, each
+  in its own Python process; FDA follows GRAS, whose notices it links to
+- Output of every stage goes to etl/data/logs/<stage>.log
+- A failed stage stops its dependents; unrelated stages carry on
+
+**Up-to-date Skipping**
+- After a successful run, the SHA-256 hashes of the stage's inputs and
+  code are stored in etl/data/pipeline_state.json
+- A stage is skipped when those hashes are unchanged and its outputs
+  still exist; hashes are only recomputed when size or mtime change
+- API stages (FSIS, CDC) have no input files, so they rerun only when
+  their code changes, their outputs are missing or --force names them
+
+Usage (from anywhere):
+    python etl/scripts/run-pipeline.py              # everything that is out of date
+    python etl/scripts/run-pipeline.py verify --dry-run
+    python etl/scripts/run-pipeline.py --force cdc fsis
+'''
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+BASE_PATH = Path(__file__).parent.parent.parent
+SCRIPTS = Path('etl/scripts')
+SOURCE = Path('etl/data/source')
+PROCESSED = Path('etl/data/processed')
+INDEX = Path('etl/data/index')
+STATE_FILE = BASE_PATH / 'etl/data/pipeline_state.json'
+LOG_DIR = BASE_PATH / 'etl/data/logs'
+
+
+@dataclass
+class Stage:
+    """One pipeline step; all paths are relative to the repository root"""
+    name: str
+    script: Path
+    inputs: List[Path] = field(default_factory=list)
+    outputs: List[Path] = field(default_factory=list)
+    code: List[Path] = field(default_factory=list)
+    args: List[str] = field(default_factory=list)
+
+    @property
+    def code_files(self) -> List[Path]:
+        return [self.script] + self.code
+
+
+# Shared modules every dataset processor runs on
+PROCESSOR_CODE = [SCRIPTS / 'processor_base.py', SCRIPTS / 'text_cleaning.py', SCRIPTS / 'instrumentation.py',
+                  SCRIPTS / 'snapshot.py', SCRIPTS / 'data_quality.py', SCRIPTS / 'categories.py']
+# Search index modules the FDA and GRAS processors build with
+SEARCH_INDEX_CODE = [SCRIPTS / 'substance_index.py', SCRIPTS / 'text_index.py']
+
+STAGES = [
+    Stage('fda', SCRIPTS / 'fda-substances-data-new.py',
+          inputs=[SOURCE / 'FoodSubstances.csv', PROCESSED / 'processed_gras_notices.csv'],
+          outputs=[PROCESSED / 'processed_fda_substances.csv', PROCESSED / 'fda_approvals_by_year.csv',
+                   PROCESSED / 'substance_grn_links.csv', INDEX / 'substances_fda.json'],
+          code=PROCESSOR_CODE + SEARCH_INDEX_CODE + [SCRIPTS / 'substance_linkage.py']),
+    Stage('gras', SCRIPTS / 'gras-notices-data-new.py',
+          inputs=[SOURCE / 'GRASNotices.csv'],
+          outputs=[PROCESSED / 'processed_gras_notices.csv', INDEX / 'substances_gras.json'],
+          code=PROCESSOR_CODE + SEARCH_INDEX_CODE),
+    Stage('who', SCRIPTS / 'who-obesity-data.py',
+          inputs=[SOURCE / 'BEFA58B_ALL_LATEST.csv'],
+          outputs=[PROCESSED / 'processed_who_obesity_data.csv'],
+          code=PROCESSOR_CODE),
+    Stage('fsis', SCRIPTS / 'fsis-recall-api.py',
+          outputs=[PROCESSED / 'processed_fsis_recalls.csv', PROCESSED / 'geography_states.csv',
+                   PROCESSED / 'recall_state_bridge.csv', PROCESSED / 'recall_cube.parquet', INDEX / 'recalls.json'],
+          code=PROCESSOR_CODE + [SCRIPTS / 'geography.py', SCRIPTS / 'recall_cube.py', SCRIPTS / 'recall_index.py',
+                                 SCRIPTS / 'text_index.py', SCRIPTS / 'http_metrics.py']),
+    Stage('cdc', SCRIPTS / 'cdc-obesity-data.py',
+          outputs=[PROCESSED / 'processed_cdc_obesity_data.csv'],
+          code=PROCESSOR_CODE + [SCRIPTS / 'http_metrics.py']),
+    Stage('store', SCRIPTS / 'analytics_store.py', args=['build'],
+          inputs=[PROCESSED / 'processed_fda_substances.csv', PROCESSED / 'fda_approvals_by_year.csv',
+                  PROCESSED / 'processed_gras_notices.csv', PROCESSED / 'processed_who_obesity_data.csv',
+                  PROCESSED / 'processed_fsis_recalls.csv', PROCESSED / 'geography_states.csv',
+                  PROCESSED / 'recall_state_bridge.csv', PROCESSED / 'processed_cdc_obesity_data.csv'],
+          outputs=[Path('etl/data/analytics.sqlite')]),
+    Stage('verify', Path('verification/verify_statistics.py'),
+          inputs=[PROCESSED / 'processed_fda_substances.csv', PROCESSED / 'fda_approvals_by_year.csv',
+                  PROCESSED / 'processed_gras_notices.csv', PROCESSED / 'processed_who_obesity_data.csv',
+                  PROCESSED / 'processed_fsis_recalls.csv', PROCESSED / 'geography_states.csv',
+                  PROCESSED / 'recall_state_bridge.csv', PROCESSED / 'processed_cdc_obesity_data.csv'],
+          outputs=[Path('verification/verification_report.md'), Path('verification/verification_results.json'),
+                   Path('verification/lagged_correlations.csv')],
+          code=[Path('verification/dataset_cache.py'), Path('verification/dataset_registry.py'),
+                Path('verification/lagged_correlation.py'), Path('verification/significance.py'),
+                SCRIPTS / 'instrumentation.py', SCRIPTS / 'snapshot.py', SCRIPTS / 'analytics_store.py'])
+]
+
+
+class Pipeline:
+    """Schedules the stages as a DAG and skips those that are up to date"""
+
+    def __init__(self, stages: List[Stage], jobs: Optional[int] = None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.jobs = jobs or min(len(stages), os.cpu_count() or 1)
+        self.producers = {output: stage.name for stage in stages for output in stage.outputs}
+        self.dependencies = {
+            stage.name: {self.producers[path] for path in stage.inputs if path in self.producers}
+            for stage in stages
+        }
+        self.state = self.load_state()
+        self._check_acyclic()
+
+    def _check_acyclic(self) -> None:
+        """Raise if the declared inputs and outputs form a cycle"""
+        visiting, done = set(), set()
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through stage '{name}'")
+            visiting.add(name)
+            for dependency in self.dependencies[name]:
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def with_dependencies(self, names: List[str]) -> Set[str]:
+        """The named stages plus everything they transitively depend on"""
+        selected, pending = set(), list(names)
+        while pending:
+            name = pending.pop()
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.dependencies[name])
+        return selected
+
+    # State and hashing
+
+    def load_state(self) -> Dict[str, Dict]:
+        if not STATE_FILE.exists():
+            return {'stages': {}, 'hashes': {}}
+        try:
+            return json.loads(STATE_FILE.read_text())
+        except (OSError, ValueError):
+            return {'stages': {}, 'hashes': {}}
+
+    def save_state(self) -> None:
+        STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = STATE_FILE.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self.state, indent=2, sort_keys=True))
+        tmp_path.replace(STATE_FILE)
+
+    def file_hash(self, path: Path) -> Optional[str]:
+        """SHA-256 of a file, reusing the stored hash while size and mtime are unchanged"""
+        full_path = BASE_PATH / path
+        try:
+            stat = full_path.stat()
+        except FileNotFoundError:
+            return None
+        known = self.state['hashes'].get(str(path))
+        if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+            return known['sha256']
+
+        digest = hashlib.sha256()
+        with full_path.open('rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        self.state['hashes'][str(path)] = {
+            'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()
+        }
+        return digest.hexdigest()
+
+    def fingerprint(self, stage: Stage) -> Dict[str, Dict[str, Optional[str]]]:
+        return {
+            'inputs': {str(path): self.file_hash(path) for path in stage.inputs},
+            'code': {str(path): self.file_hash(path) for path in stage.code_files},
+            'args': stage.args
+        }
+
+    def stale_reason(self, stage: Stage) -> Optional[str]:
+        """Why the stage has to run, or None if it is up to date"""
+        missing_inputs = [str(path) for path in stage.inputs if not (BASE_PATH / path).exists()]
+        if missing_inputs:
+            return f"missing input {missing_inputs[0]}"
+        missing_outputs = [str(path) for path in stage.outputs if not (BASE_PATH / path).exists()]
+        if missing_outputs:
+            return f"missing output {missing_outputs[0]}"
+
+        previous = self.state['stages'].get(stage.name)
+        if previous is None:
+            return "no successful run recorded"
+        current = self.fingerprint(stage)
+        for kind in ('code', 'inputs'):
+            changed = [path for path, digest in current[kind].items()
+                       if previous['fingerprint'][kind].get(path) != digest]
+            if changed:
+                return f"{kind} changed: {changed[0]}"
+        if current['args'] != previous['fingerprint']['args']:
+            return "arguments changed"
+        return None
+
+    # Execution
+
+    def run_stage(self, stage: Stage) -> Tuple[int, float, Path]:
+        """Run one stage's script in its own process from the repository root"""
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        log_path = LOG_DIR / f"{stage.name}.log"
+        start = time.perf_counter()
+        with log_path.open('w') as log:
+            result = subprocess.run([sys.executable, str(stage.script), *stage.args], cwd=BASE_PATH,
+                                    stdout=log, stderr=subprocess.STDOUT)
+        return result.returncode, time.perf_counter() - start, log_path
+
+    def run(self, names: Optional[List[str]] = None, force: Optional[Set[str]] = None,
+            dry_run: bool = False) -> bool:
+        """Run the selected stages and their dependencies; True if nothing failed"""
+        selected = self.with_dependencies(names or list(self.stages))
+        force = force or set()
+        ran, failed, skipped = set(), set(), set()
+        waiting = {name: set(self.dependencies[name]) & selected for name in selected}
+        running = {}
+
+        def schedule_ready(pool):
+            # Skipped stages release their dependents at once, so repeat until nothing new is ready
+            ready = sorted(n for n, deps in waiting.items() if not deps)
+            while ready:
+                for name in ready:
+                    del waiting[name]
+                    start_or_skip(pool, name)
+                ready = sorted(n for n, deps in waiting.items() if not deps)
+
+        def start_or_skip(pool, name):
+            stage = self.stages[name]
+            upstream_failed = self.dependencies[name] & failed
+            if upstream_failed:
+                print(f"  {name:<8} not run: {', '.join(sorted(upstream_failed))} failed")
+                failed.add(name)
+                release(name)
+                return
+
+            reason = "forced" if name in force else self.stale_reason(stage)
+            upstream_ran = self.dependencies[name] & ran
+            if dry_run and reason is None and upstream_ran:
+                # Outputs of the upstream stages are not rewritten in a dry run
+                reason = f"if {', '.join(sorted(upstream_ran))} change its inputs"
+            if reason is None:
+                print(f"  {name:<8} up to date")
+                skipped.add(name)
+                release(name)
+            elif dry_run:
+                print(f"  {name:<8} would run ({reason})")
+                ran.add(name)
+                release(name)
+            else:
+                print(f"  {name:<8} scheduled ({reason})")
+                running[pool.submit(self.run_stage, stage)] = (name, time.time(), self.fingerprint(stage))
+
+        def release(name):
+            for deps in waiting.values():
+                deps.discard(name)
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            schedule_ready(pool)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, started, fingerprint = running.pop(future)
+                    returncode, seconds, log_path = future.result()
+                    self.finish_stage(name, started, fingerprint, returncode, seconds, log_path, ran, failed)
+                    release(name)
+                schedule_ready(pool)
+
+        self.save_state()
+        print(f"\n{'Would run' if dry_run else 'Ran'} {len(ran)}, skipped {len(skipped)}, failed {len(failed)}")
+        return not failed
+
+    def finish_stage(self, name, started, fingerprint, returncode, seconds, log_path, ran, failed) -> None:
+        """Record a finished stage, failing it if it did not write its declared outputs"""
+        stage = self.stages[name]
+        if returncode == 0:
+            # Some scripts log errors and exit cleanly; an output they did not touch means they failed
+            stale = [str(path) for path in stage.outputs
+                     if not (BASE_PATH / path).exists() or (BASE_PATH / path).stat().st_mtime < started]
+            if stale:
+                returncode = None
+                print(f"  {name:<8} failed after {seconds:.1f}s: did not write {stale[0]} (see {log_path})")
+        else:
+            print(f"  {name:<8} failed after {seconds:.1f}s with exit code {returncode} (see {log_path})")
+
+        if returncode != 0:
+            failed.add(name)
+            self.state['stages'].pop(name, None)
+            return
+
+        print(f"  {name:<8} done in {seconds:.1f}s")
+        ran.add(name)
+        self.state['stages'][name] = {
+            'fingerprint': fingerprint,
+            'completed': datetime.now().isoformat(),
+            'seconds': round(seconds, 3)
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ETL stages and verification in dependency order")
+    parser.add_argument('stages', nargs='*', metavar='STAGE',
+                        help=f"stages to bring up to date, with their dependencies "
+                             f"({', '.join(stage.name for stage in STAGES)}; default: all)")
+    parser.add_argument('--force', nargs='*', metavar='STAGE',
+                        help="rerun these stages (all selected stages if none are named) even if up to date")
+    parser.add_argument('--jobs', type=int, help="stages to run in parallel (default: CPU count)")
+    parser.add_argument('--dry-run', action='store_true', help="show what would run without running it")
+    parser.add_argument('--list', action='store_true', help="list the stages and their dependencies")
+    args = parser.parse_args()
+
+    pipeline = Pipeline(STAGES, jobs=args.jobs)
+    if args.list:
+        for name in pipeline.stages:
+            dependencies = ', '.join(sorted(pipeline.dependencies[name])) or '-'
+            print(f"{name:<8} after: {dependencies}")
+        return
+
+    unknown = set(args.stages + (args.force or [])) - set(pipeline.stages)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+
+    selected = args.stages or list(pipeline.stages)
+    if args.force is None:
+        force = set()
+    elif args.force:
+        force = set(args.force)
+    else:
+        force = pipeline.with_dependencies(selected)
+
+    print(f"Pipeline: {', '.join(sorted(pipeline.with_dependencies(selected)))}")
+    if not pipeline.run(selected, force=force, dry_run=args.dry_run):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
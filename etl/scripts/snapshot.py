@@ -0,0 +1,255 @@
+'''
+Dataset Snapshots
+
+Arrow IPC snapshots of the processed CSVs that readers memory-map instead
+of parsing text:
+- Written next to the CSV (processed_x.csv -> processed_x.arrow) by
+  SnapshotWriter, the processors' default output writer, from the same
+  chunks that go into the CSV
+- Numeric and boolean columns keep their type, with missing floats
+  stored as NaN rather than nulls; every other column holds the text the
+  CSV has for it as large_string, the layout pandas' Arrow-backed str
+  dtype uses
+- The schema metadata records the CSV's size, mtime and SHA-256, so a
+  reader can tell from one stat() call whether the snapshot still
+  matches the CSV next to it; when only the mtime moved (a checkout, a
+  touch), the first reader hashes the CSV once and restamps the snapshot
+- Opening a snapshot only reads its footer. Converting to pandas wraps
+  the mapped buffers of float, non-null integer and (with pandas 3's
+  default str dtype) text columns without copying, so concurrent readers
+  share one page-cached copy; integer columns with missing values,
+  columns cast to another dtype and text on pandas 2 (object dtype) are
+  still copied
+
+Chunks are kept as record batches until the writer closes and are
+written as one table, with a column that is text in any chunk cast to
+text in all of them.
+
+Run this file directly to snapshot existing processed CSVs without
+rerunning their processors.
+'''
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - snapshots are optional
+    pa = pc = None
+
+SUFFIX = '.arrow'
+METADATA_KEY = b'source'
+
+
+def _file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with Path(path).open('rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def snapshots_available() -> bool:
+    """Whether pyarrow is installed to write and read snapshots"""
+    return pa is not None
+
+
+def snapshot_path(csv_path: Path) -> Path:
+    """Snapshot file belonging to a processed CSV"""
+    return Path(csv_path).with_suffix(SUFFIX)
+
+
+def to_batch(chunk: pd.DataFrame) -> 'pa.RecordBatch':
+    """Record batch of a processed chunk: numbers as numbers, everything else as CSV text"""
+    arrays = []
+    for col in chunk.columns:
+        values = chunk[col]
+        if pd.api.types.is_float_dtype(values) and isinstance(values.dtype, np.dtype):
+            # NaN stays a value instead of becoming a null, so reading it back needs no mask
+            arrays.append(pa.array(values.to_numpy()))
+            continue
+        if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            arrays.append(pa.array(values, from_pandas=True))
+            continue
+        if pd.api.types.is_datetime64_any_dtype(values):
+            # Same rendering as to_csv: dates only unless some value has a time of day
+            values = values.dt.strftime('%Y-%m-%d' if (values.dropna() == values.dropna().dt.normalize()).all()
+                                        else '%Y-%m-%d %H:%M:%S')
+        text = values.map(str, na_action='ignore').astype(object).where(values.notna(), None)
+        arrays.append(pa.array(text, type=pa.large_string(), from_pandas=True))
+    return pa.RecordBatch.from_arrays(arrays, names=[str(col) for col in chunk.columns])
+
+
+def _as_text(column: 'pa.Array') -> 'pa.Array':
+    """A numeric column of one chunk as text, with NaN as missing"""
+    if pa.types.is_floating(column.type):
+        column = pc.if_else(pc.is_nan(column), pa.scalar(None, column.type), column)
+    return column.cast(pa.large_string())
+
+
+def _unify(batches: List['pa.RecordBatch']) -> 'pa.Table':
+    """One table with a single schema"""
+    # A column that is text in any chunk is text in all of them (e.g. all missing, so float, in one chunk)
+    text = {field.name for batch in batches for field in batch.schema if pa.types.is_large_string(field.type)}
+    tables = []
+    for batch in batches:
+        columns = [
+            _as_text(column) if name in text and not pa.types.is_large_string(column.type) else column
+            for name, column in zip(batch.schema.names, batch.columns)
+        ]
+        tables.append(pa.Table.from_arrays(columns, names=batch.schema.names))
+    # Remaining differences are numeric, e.g. int64 in one chunk and float64 in another
+    return pa.concat_tables(tables, promote_options='permissive')
+
+
+def _write_table(table: 'pa.Table', csv_path: Path, source: Dict[str, object]) -> Path:
+    table = table.replace_schema_metadata({METADATA_KEY: json.dumps(source).encode()})
+    path = snapshot_path(csv_path)
+    # Unique per writer, since readers restamping a snapshot may race each other
+    tmp_path = path.with_suffix(f"{SUFFIX}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with pa.OSFile(str(tmp_path), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    tmp_path.replace(path)
+    return path
+
+
+def write_snapshot(batches: List['pa.RecordBatch'], csv_path: Path) -> Path:
+    """Write the batches of a finished CSV as its snapshot, stamped with the CSV's fingerprint"""
+    csv_path = Path(csv_path)
+    stat = csv_path.stat()
+    source = {'file': csv_path.name, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+              'sha256': _file_sha256(csv_path)}
+    return _write_table(_unify(batches) if batches else pa.table({}), csv_path, source)
+
+
+def source_fingerprint(path: Path) -> Optional[Dict[str, object]]:
+    """Fingerprint of the CSV a snapshot was written from, None if the snapshot is unreadable"""
+    try:
+        with pa.memory_map(str(path)) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+        return json.loads(metadata[METADATA_KEY])
+    except (OSError, KeyError, ValueError, pa.ArrowInvalid):
+        return None
+
+
+def is_current(csv_path: Path) -> bool:
+    """Whether a CSV has a snapshot written from its current content
+
+    Matching size and mtime settle it with one stat(). A touched file with
+    the same size is hashed once to tell; if the content is unchanged the
+    snapshot is restamped with the new mtime, so later calls are a stat()
+    again.
+    """
+    path = snapshot_path(csv_path)
+    if pa is None or not path.exists() or not Path(csv_path).exists():
+        return False
+    source = source_fingerprint(path)
+    if source is None:
+        return False
+    stat = Path(csv_path).stat()
+    if stat.st_size != source['size']:
+        return False
+    if stat.st_mtime_ns == source['mtime_ns']:
+        return True
+    if _file_sha256(csv_path) != source['sha256']:
+        return False
+    try:
+        _write_table(open_snapshot(csv_path), csv_path, {**source, 'mtime_ns': stat.st_mtime_ns})
+    except OSError:
+        pass  # read-only checkout: still current, just hashed again next time
+    return True
+
+
+def open_snapshot(csv_path: Path, columns: Optional[List[str]] = None) -> 'pa.Table':
+    """Memory-mapped table of a CSV's snapshot; opening reads only the footer"""
+    # The table's buffers keep the mapping alive, so the file is not closed here
+    table = pa.ipc.open_file(pa.memory_map(str(snapshot_path(csv_path)))).read_all()
+    return table if columns is None else table.select(columns)
+
+
+def to_pandas(table: 'pa.Table', dtypes: Dict[str, object]) -> pd.DataFrame:
+    """Frame of a snapshot table with the declared dtypes, as read_csv would give it
+
+    Columns already stored in the declared dtype wrap the mapped buffers
+    instead of copying them (see the module docstring for which do), so
+    they are read-only; copy a frame before assigning into it.
+    """
+    data = {}
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_dictionary(column.type):
+            # Snapshots written before text was stored as large_string
+            column = column.cast(pa.large_string())
+        series = column.to_pandas()
+        dtype = dtypes.get(name)
+        if dtype is str:
+            if not (pa.types.is_large_string(column.type) or pa.types.is_string(column.type)):
+                # Numbers and flags declared as text, rendered the way the CSV has them
+                series = series.map(str, na_action='ignore')
+        elif dtype is not None and series.dtype != dtype:
+            series = series.astype(dtype)
+        data[name] = series
+    # The constructor copies a dict of Series unless told not to
+    return pd.DataFrame(data, columns=table.column_names, copy=False)
+
+
+class SnapshotWriter:
+    """Wraps an output writer and writes an Arrow snapshot of the same chunks once its file is complete"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.path = writer.path
+        self.batches: List['pa.RecordBatch'] = []
+
+    @property
+    def rows(self) -> int:
+        return self.writer.rows
+
+    def __enter__(self):
+        self.writer.__enter__()
+        return self
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        self.writer.write(chunk)
+        self.batches.append(to_batch(chunk))
+
+    def __exit__(self, *exc_info):
+        self.writer.__exit__(*exc_info)
+        if exc_info[0] is None:
+            write_snapshot(self.batches, self.path)
+        else:
+            # A partial CSV must not keep the previous run's snapshot looking current
+            snapshot_path(self.path).unlink(missing_ok=True)
+        self.batches = []
+        return False
+
+
+def snapshot_csv(csv_path: Path) -> Path:
+    """Snapshot an existing CSV, reading it with inferred types"""
+    df = pd.read_csv(csv_path, low_memory=False)
+    return write_snapshot([to_batch(df)], csv_path)
+
+
+if __name__ == '__main__':
+    processed_dir = Path(__file__).parent.parent / 'data/processed'
+    parser = argparse.ArgumentParser(description="Write Arrow snapshots of processed CSVs")
+    parser.add_argument('files', nargs='*', type=Path, help="CSVs to snapshot (default: every processed CSV)")
+    parser.add_argument('--force', action='store_true', help="rewrite snapshots that are already current")
+    args = parser.parse_args()
+
+    if pa is None:
+        raise SystemExit("pyarrow is required for snapshots")
+    for csv_path in args.files or sorted(processed_dir.glob('*.csv')):
+        if not args.force and is_current(csv_path):
+            print(f"{snapshot_path(csv_path).name} is current")
+            continue
+        path = snapshot_csv(csv_path)
+        print(f"Wrote {path.name} ({path.stat().st_size / 1e6:.1f} MB)")
@@ -0,0 +1,129 @@
+'''
+Substance Search Index
+
+Inverted indexes (text_index.py) over the substance names in the processed
+FDA inventory and GRAS notices:
+- FDA: substance and other_names, so synonyms find their substance
+- GRAS: substance and intended_use
+- One index file per dataset under etl/data/index, rebuilt by the FDA and
+  GRAS processors right after they write their output
+- SubstanceIndex searches both with prefix matching and returns the
+  matching rows' keys (CAS number or GRN) without reading any CSV
+
+Usage (from the repository root):
+    python etl/scripts/substance_index.py search "acesulfame"
+    python etl/scripts/substance_index.py search "soy isofl" --dataset gras
+    python etl/scripts/substance_index.py build
+'''
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from text_index import InvertedIndex
+
+PROCESSED_DIR = Path(__file__).parent.parent / 'data/processed'
+INDEX_DIR = Path(__file__).parent.parent / 'data/index'
+
+# Dataset -> processed file, indexed fields (name first) and columns returned with each hit
+SOURCES: Dict[str, Dict[str, object]] = {
+    'fda': {
+        'file': 'processed_fda_substances.csv',
+        'fields': ['substance', 'other_names'],
+        'stored': ['substance', 'cas_reg_no', 'approval_year']
+    },
+    'gras': {
+        'file': 'processed_gras_notices.csv',
+        'fields': ['substance', 'intended_use'],
+        'stored': ['substance', 'grn_no', 'filing_year', 'fda_response']
+    }
+}
+
+
+def index_path(dataset: str, index_dir: Path = INDEX_DIR) -> Path:
+    return Path(index_dir) / f"substances_{dataset}.json"
+
+
+def build_dataset_index(dataset: str, processed_file: Path) -> InvertedIndex:
+    """Index the name fields of a processed output file"""
+    source = SOURCES[dataset]
+    columns = list(dict.fromkeys(source['fields'] + source['stored']))
+    df = pd.read_csv(processed_file, usecols=lambda col: col in columns, dtype=str)
+    return InvertedIndex.from_frame(df, source['fields'], source['stored'],
+                                    meta={'dataset': dataset, 'source': Path(processed_file).name})
+
+
+def save_dataset_index(dataset: str, processed_file: Path, index_dir: Path = INDEX_DIR) -> InvertedIndex:
+    """Rebuild and save the index of one dataset from its processed output"""
+    index = build_dataset_index(dataset, processed_file)
+    index.save(index_path(dataset, index_dir))
+    return index
+
+
+class SubstanceIndex:
+    """Search over the saved FDA and GRAS substance indexes"""
+
+    def __init__(self, index_dir: Path = INDEX_DIR, datasets: Optional[Sequence[str]] = None):
+        self.indexes: Dict[str, InvertedIndex] = {}
+        for dataset in datasets or SOURCES:
+            path = index_path(dataset, index_dir)
+            if path.exists():
+                self.indexes[dataset] = InvertedIndex.load(path)
+        if not self.indexes:
+            raise FileNotFoundError(f"No substance index in {index_dir}; run substance_index.py build")
+
+    def search(self, query: str, prefix: bool = True, limit: Optional[int] = 20) -> pd.DataFrame:
+        """Matching substances from every loaded dataset, best first
+
+        Columns: dataset, row (position in the processed file), score and the
+        dataset's stored columns.
+        """
+        hits: List[dict] = []
+        for dataset, index in self.indexes.items():
+            for row, score in index.search(query, prefix=prefix, limit=limit):
+                hits.append({'dataset': dataset, 'row': row, 'score': score, **index.doc(row)})
+
+        result = pd.DataFrame(hits, columns=['dataset', 'row', 'score'] if not hits else None)
+        if hits:
+            result = result.sort_values(['score', 'dataset', 'row'], ascending=[False, True, True], kind='stable')
+        return result.head(limit).reset_index(drop=True) if limit else result.reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or search the substance name index")
+    parser.add_argument('--index-dir', type=Path, default=INDEX_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="rebuild the indexes from the processed outputs")
+    build.add_argument('--processed-dir', type=Path, default=PROCESSED_DIR)
+    search = commands.add_parser('search', help="find substances by name, synonym or intended use")
+    search.add_argument('query')
+    search.add_argument('--dataset', choices=sorted(SOURCES), action='append',
+                        help="only search this dataset (repeatable)")
+    search.add_argument('--exact', action='store_true', help="match whole tokens only, not prefixes")
+    search.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == 'build':
+        for dataset, source in SOURCES.items():
+            index = save_dataset_index(dataset, args.processed_dir / source['file'], args.index_dir)
+            print(f"Indexed {len(index)} {dataset} rows into {index_path(dataset, args.index_dir)}")
+        print(f"Built in {time.perf_counter() - start:.2f}s")
+        return
+
+    index = SubstanceIndex(args.index_dir, args.dataset)
+    loaded = time.perf_counter()
+    result = index.search(args.query, prefix=not args.exact, limit=args.limit)
+    searched = time.perf_counter()
+    with pd.option_context('display.max_colwidth', 60, 'display.width', 200):
+        print(result.to_string(index=False) if len(result) else "No matches")
+    print(f"\n{len(result)} matches; load {(loaded - start) * 1000:.1f} ms, "
+          f"search {(searched - loaded) * 1000:.2f} ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+'''
+Substance Linkage
+
+Links FDA inventory substances to the GRAS notices filed for them:
+- Exact on CAS number: checksum-valid CAS numbers found in a notice's
+  text join the inventory's validated cas_reg_no
+- Exact on name: a notice's substance equals the inventory substance or
+  one of its other_names synonyms after normalization (tokens from
+  text_index.py, filler words dropped, plural s removed, word order ignored)
+- Fuzzy on name: other pairs are only compared when they share a blocking
+  key, the Soundex code of a distinctive word, so each inventory name is
+  scored against a handful of notices instead of all of them; pairs whose
+  character trigram Jaccard similarity reaches MIN_SCORE are kept
+- The links are saved as a substance_id <-> grn_no table next to the
+  processed datasets, with the method, score and the notice's filing year
+- Only exact links (EXACT_METHODS) date a substance: a fuzzy pair can be
+  a related but different substance ("Distarch phosphate" for phosphated
+  distarch phosphate, "Curcumin from turmeric" for turmeric), so fuzzy
+  links stay in the table for review but never set its approval year
+
+substance_id is the inventory's own "CAS Reg No (or other ID)" value, or
+the substance name for the few rows without one.
+
+Run this file directly to relink the processed outputs, or pass --grn or
+--substance-id to print the saved links of one notice or substance.
+'''
+
+import argparse
+import re
+import sys
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from text_index import tokenize
+
+LINKS_FILE = 'substance_grn_links.csv'
+LINK_COLUMNS = ['substance_id', 'substance', 'cas_reg_no', 'grn_no', 'gras_substance', 'method', 'score',
+                'filing_year']
+
+# Fuzzy pairs below this trigram similarity are dropped; lower values start
+# linking distinct compounds such as bisulfite/bisulfate or rebaudioside A/M
+MIN_SCORE = 0.85
+# Link methods trusted to give a substance the filing year of its notice
+EXACT_METHODS = ('cas', 'name')
+# Blocking keys shared by more notices than this (e.g. "sodium") do not narrow anything down
+MAX_BLOCK = 40
+
+CAS_RE = re.compile(r'\b(\d{2,7})-(\d{2})-(\d)\b')
+SYNONYM_SEPARATOR_RE = re.compile(r'\s{3,}')
+FILLER_WORDS = {'a', 'an', 'and', 'as', 'by', 'derived', 'for', 'from', 'in', 'of', 'produced', 'the', 'with'}
+
+
+# Normalization
+
+def cas_is_valid(base: str, branch: str, check: str) -> bool:
+    """CAS check digit: weighted sum of the other digits, weights counting up from the right"""
+    digits = base + branch
+    total = sum(int(digit) * (len(digits) - i) for i, digit in enumerate(digits))
+    return total % 10 == int(check)
+
+
+def extract_cas_numbers(text) -> List[str]:
+    """Checksum-valid CAS numbers written as NNNNNNN-NN-N in a text value"""
+    if not isinstance(text, str):
+        return []
+    return [f"{base}-{branch}-{check}" for base, branch, check in CAS_RE.findall(text)
+            if cas_is_valid(base, branch, check)]
+
+
+def name_tokens(text) -> List[str]:
+    """Normalized tokens without filler words, singular form"""
+    tokens = []
+    for token in tokenize(text):
+        if token in FILLER_WORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+@lru_cache(maxsize=None)
+def soundex(token: str) -> str:
+    """American Soundex code, e.g. sulfate and sulphate both give S413"""
+    codes = {**dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+             'l': '4', **dict.fromkeys('mn', '5'), 'r': '6'}
+    first, rest = token[0], token[1:]
+    result = [first.upper()]
+    previous = codes.get(first, '')
+    for char in rest:
+        code = codes.get(char, '')
+        if code and code != previous:
+            result.append(code)
+        if char not in 'hw':
+            previous = code
+    return (''.join(result) + '000')[:4]
+
+
+def blocking_keys(tokens: Iterable[str]) -> Set[str]:
+    """Soundex codes of the alphabetic words long enough to be distinctive"""
+    return {soundex(token) for token in tokens if len(token) >= 4 and token.isalpha()}
+
+
+def trigrams(tokens: List[str]) -> Set[str]:
+    text = f" {' '.join(tokens)} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    """Jaccard similarity of two trigram sets"""
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def inventory_names(substance, other_names) -> List[str]:
+    """The substance name followed by its synonyms (other_names separates them with runs of spaces)"""
+    names = [substance] if isinstance(substance, str) else []
+    if isinstance(other_names, str):
+        names += [name for name in SYNONYM_SEPARATOR_RE.split(other_names.strip()) if name]
+    return names
+
+
+def substance_ids(df: pd.DataFrame) -> pd.Series:
+    """Inventory identifier of each row, falling back to the substance name"""
+    ids = df['cas_reg_no_(or_other_id)'].str.strip() if 'cas_reg_no_(or_other_id)' in df.columns else None
+    if ids is None:
+        return df['substance']
+    return ids.where(ids.notna() & (ids != ''), df['substance'])
+
+
+# Linking
+
+class GRASLinker:
+    """Lookup structures over the processed GRAS notices for linking inventory rows to them"""
+
+    def __init__(self, notices: pd.DataFrame):
+        self.notices = notices.reset_index(drop=True)
+        # Inventory name -> (exact-match positions, fuzzy scores by position); names repeat across rows and synonyms
+        self._matches: Dict[str, Tuple[List[int], Dict[int, float]]] = {}
+        self.by_cas: Dict[str, List[int]] = defaultdict(list)
+        self.by_key: Dict[str, List[int]] = defaultdict(list)
+        blocks: Dict[str, List[int]] = defaultdict(list)
+        self.trigrams: List[Set[str]] = []
+
+        text_columns = [col for col in ('substance', 'intended_use', 'notes') if col in self.notices.columns]
+        for position, row in enumerate(self.notices.itertuples(index=False)):
+            values = row._asdict()
+            for col in text_columns:
+                for cas in extract_cas_numbers(values[col]):
+                    if position not in self.by_cas[cas]:
+                        self.by_cas[cas].append(position)
+
+            tokens = name_tokens(values['substance'])
+            self.trigrams.append(trigrams(tokens))
+            if tokens:
+                self.by_key[' '.join(sorted(tokens))].append(position)
+            for key in blocking_keys(tokens):
+                blocks[key].append(position)
+
+        self.blocks = {key: positions for key, positions in blocks.items() if len(positions) <= MAX_BLOCK}
+
+    @classmethod
+    def from_file(cls, path: Path) -> 'GRASLinker':
+        """Linker over a processed GRAS notices file"""
+        columns = {'grn_no', 'substance', 'intended_use', 'notes', 'filing_year'}
+        return cls(pd.read_csv(path, usecols=lambda col: col in columns, dtype={'grn_no': 'Int64'}))
+
+    def match_name(self, name: str) -> Tuple[List[int], Dict[int, float]]:
+        """Notices whose substance equals `name` after normalization, and fuzzy scores of the other candidates
+
+        Candidates are the notices sharing a blocking key with the name.
+        """
+        cached = self._matches.get(name)
+        if cached is not None:
+            return cached
+
+        tokens = name_tokens(name)
+        # Sorted tokens make the exact match ignore word order
+        exact = self.by_key.get(' '.join(sorted(tokens)), [])
+        grams = trigrams(tokens)
+        candidates = set()
+        for key in blocking_keys(tokens):
+            candidates.update(self.blocks.get(key, ()))
+
+        fuzzy: Dict[int, float] = {}
+        for position in candidates.difference(exact):
+            other = self.trigrams[position]
+            # Jaccard can reach MIN_SCORE only if the set sizes are close enough
+            if min(len(grams), len(other)) < MIN_SCORE * max(len(grams), len(other)):
+                continue
+            score = similarity(grams, other)
+            if score >= MIN_SCORE:
+                fuzzy[position] = score
+        cached = self._matches[name] = (exact, fuzzy)
+        return cached
+
+    def link(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Links of inventory rows (cleaned columns, validated cas_reg_no) to notices
+
+        Columns are LINK_COLUMNS plus row, the index label of the inventory row.
+        """
+        ids = substance_ids(df)
+        cas_numbers = df['cas_reg_no'] if 'cas_reg_no' in df.columns else pd.Series(None, index=df.index)
+        other_names = df['other_names'] if 'other_names' in df.columns else pd.Series(None, index=df.index)
+
+        grn_numbers = self.notices['grn_no'].tolist()
+        notice_names = self.notices['substance'].tolist()
+        filing_years = (self.notices['filing_year'] if 'filing_year' in self.notices.columns
+                        else pd.Series(None, index=self.notices.index)).tolist()
+
+        links = []
+        for row, substance_id, substance, synonyms, cas in zip(df.index, ids, df['substance'], other_names,
+                                                                cas_numbers):
+            # Position -> (method, score); an exact match is never replaced by a fuzzy one
+            matches: Dict[int, Tuple[str, float]] = {}
+            if isinstance(cas, str):
+                for position in self.by_cas.get(cas, ()):
+                    matches[position] = ('cas', 1.0)
+
+            fuzzy: Dict[int, float] = {}
+            for name in inventory_names(substance, synonyms):
+                exact, scores = self.match_name(name)
+                for position in exact:
+                    matches.setdefault(position, ('name', 1.0))
+                for position, score in scores.items():
+                    fuzzy[position] = max(score, fuzzy.get(position, 0.0))
+            for position, score in fuzzy.items():
+                matches.setdefault(position, ('fuzzy', round(score, 3)))
+
+            for position, (method, score) in matches.items():
+                links.append({
+                    'row': row,
+                    'substance_id': substance_id,
+                    'substance': substance,
+                    'cas_reg_no': cas if isinstance(cas, str) else None,
+                    'grn_no': grn_numbers[position],
+                    'gras_substance': notice_names[position],
+                    'method': method,
+                    'score': score,
+                    'filing_year': filing_years[position]
+                })
+        return pd.DataFrame(links, columns=['row'] + LINK_COLUMNS)
+
+
+def link_years(links: pd.DataFrame) -> pd.Series:
+    """Earliest filing year of each inventory row's exactly linked notices, indexed by row"""
+    exact = links[links['method'].isin(EXACT_METHODS)]
+    return exact.groupby('row')['filing_year'].min()
+
+
+def save_links(links: pd.DataFrame, output_dir: Path) -> pd.DataFrame:
+    """Write the substance_id <-> grn_no table, one row per linked pair"""
+    table = (links[LINK_COLUMNS]
+             .drop_duplicates(['substance_id', 'grn_no'])
+             .sort_values(['substance_id', 'grn_no'])
+             .reset_index(drop=True))
+    table.to_csv(Path(output_dir) / LINKS_FILE, index=False)
+    return table
+
+
+def load_links(processed_dir: Path) -> Optional[pd.DataFrame]:
+    """The saved link table, None before the FDA processor has written one"""
+    path = Path(processed_dir) / LINKS_FILE
+    if not path.exists():
+        return None
+    return pd.read_csv(path, dtype={'substance_id': str, 'grn_no': 'Int64'})
+
+
+if __name__ == '__main__':
+    processed_dir = Path(__file__).parent.parent / 'data/processed'
+    parser = argparse.ArgumentParser(description="Link FDA inventory substances to GRAS notices")
+    parser.add_argument('--grn', type=int, help="print the saved links of this GRN")
+    parser.add_argument('--substance-id', help="print the saved links of this inventory substance")
+    args = parser.parse_args()
+
+    if args.grn is not None or args.substance_id:
+        links = load_links(processed_dir)
+        if links is None:
+            raise SystemExit(f"No {LINKS_FILE} in {processed_dir}; run this file without options first")
+        if args.grn is not None:
+            links = links[links['grn_no'] == args.grn]
+        if args.substance_id:
+            links = links[links['substance_id'] == args.substance_id]
+        print(links.to_string(index=False) if len(links) else "No links")
+        sys.exit(0)
+
+    linker = GRASLinker.from_file(processed_dir / 'processed_gras_notices.csv')
+    inventory = pd.read_csv(processed_dir / 'processed_fda_substances.csv', dtype=str)
+    table = save_links(linker.link(inventory), processed_dir)
+    print(f"Saved {len(table)} links to {processed_dir / LINKS_FILE}")
+    print(table['method'].value_counts().to_string())
@@ -0,0 +1,166 @@
+'''
+Shared Text Cleaning Helpers
+
+Fast text cleaning used by the dataset processors:
+- Precompiled regular expressions for tag and <br> removal
+- str.translate table for non-ASCII replacement
+- Cheap guards that skip steps which cannot change the string
+- clean_series(), which cleans each distinct value once in columns
+  where values repeat and maps clean_text over mostly distinct columns,
+  where deduplicating costs more than it saves
+- strip_html(), the lighter tag and entity removal of the FSIS API fields
+
+Output is byte-identical to the original per-character implementation.
+Run this file directly for a micro-benchmark against that implementation.
+'''
+
+import html
+import re
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Symbols kept even though they are outside the ASCII range
+KEEP_SYMBOLS = '•–—'
+
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+BR_TAG_RE = re.compile(r'<br\s*/?>', re.IGNORECASE)
+# Non-greedy variant used by the FSIS recall fields; it removes tags without adding spaces
+STRIP_TAG_RE = re.compile(r'<[^<]+?>')
+
+# clean_series deduplicates only below this share of distinct values, estimated from about
+# SAMPLE_SIZE evenly spaced rows; above it, hashing every value costs more than the repeats save
+DEDUPE_MAX_DISTINCT = 0.5
+SAMPLE_SIZE = 1000
+
+
+class _NonAsciiTable(dict):
+    """str.translate table that maps non-ASCII characters to spaces, filled lazily"""
+
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
+        value = codepoint if codepoint < 128 or char in KEEP_SYMBOLS else ' '
+        self[codepoint] = value
+        return value
+
+
+NON_ASCII_TABLE = _NonAsciiTable()
+
+
+def clean_text(text, replace_diamonds=False):
+    """Clean a text field: strip quotes, tags, entities, whitespace and non-ASCII"""
+    if not isinstance(text, str):
+        if pd.isna(text):
+            return text
+        text = str(text)
+
+    # Remove quotes and extra spaces
+    text = text.strip().strip('"').strip()
+
+    # Remove HTML tags
+    if '<' in text:
+        text = HTML_TAG_RE.sub(' ', text)
+
+    # Decode HTML entities
+    if '&' in text:
+        text = html.unescape(text)
+        if replace_diamonds:
+            text = text.replace('&diams;', '•')
+
+    # Collapse whitespace (same character class as the \s+ regex)
+    text = ' '.join(text.split())
+
+    # Entities such as &lt;br&gt; only become tags after unescaping
+    if '<' in text:
+        text = BR_TAG_RE.sub(' ', text)
+
+    # Remove non-ASCII characters while preserving common symbols
+    if not text.isascii():
+        text = text.translate(NON_ASCII_TABLE)
+
+    return text.strip()
+
+
+def clean_series(series, replace_diamonds=False):
+    """Clean a text column, once per distinct value when values repeat"""
+    sample = series.iloc[::max(1, len(series) // SAMPLE_SIZE)].dropna()
+    if sample.nunique() > DEDUPE_MAX_DISTINCT * len(sample) or sample.empty:
+        return series.map(lambda value: clean_text(value, replace_diamonds))
+
+    codes, uniques = pd.factorize(series)
+    # Missing values have code -1, which picks the trailing NaN
+    cleaned = np.array([clean_text(value, replace_diamonds) for value in uniques] + [np.nan], dtype=object)
+    return pd.Series(cleaned[codes], index=series.index, name=series.name, dtype=series.dtype)
+
+
+def strip_html(text):
+    """Remove tags and decode entities; missing values become the string 'nan' as in str()"""
+    text = str(text)
+    if '<' in text:
+        text = STRIP_TAG_RE.sub('', text)
+    if '&' in text:
+        text = html.unescape(text)
+    return text
+
+
+def strip_html_series(series):
+    """strip_html over a column, once per distinct value (missing values included)"""
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    cleaned = np.array([strip_html(value) for value in uniques], dtype=object)
+    return pd.Series(cleaned[codes], index=series.index, name=series.name)
+
+
+def _reference_clean_text(text, replace_diamonds=False):
+    """Original implementation, kept for the benchmark's identity check"""
+    if pd.isna(text):
+        return text
+    text = str(text).strip().strip('"').strip()
+    text = re.sub(r'<[^>]+>', ' ', text)
+    text = html.unescape(text)
+    if replace_diamonds:
+        text = text.replace('&diams;', '•')
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = re.sub(r'<br\s*/?>', ' ', text, flags=re.IGNORECASE)
+    text = ''.join(char if ord(char) < 128 or char in '•–—' else ' ' for char in text)
+    return text.strip()
+
+
+def benchmark(repeat=5):
+    """Compare per-string cost of the reference and fast cleaners on the source data"""
+    source_dir = Path(__file__).parent.parent / 'data/source'
+    # Both exports currently only decode as latin1
+    read_options = {'encoding': 'latin1', 'quoting': 1, 'dtype': str}
+    gras = pd.read_csv(source_dir / 'GRASNotices.csv', skiprows=2, **read_options)
+    fda = pd.read_csv(source_dir / 'FoodSubstances.csv', skiprows=4, **read_options)
+    samples = [
+        ('gras', gras[['Substance', 'Intended Use', 'Basis', 'Notifier', 'Notifier Address']], False),
+        ('fda', fda[['Substance', 'Other Names', 'Used for (Technical Effect)']], True),
+    ]
+
+    for name, frame, diamonds in samples:
+        texts = frame.stack().dropna().tolist()
+
+        # Verify byte-identical output before timing anything
+        for text in texts:
+            expected = _reference_clean_text(text, diamonds)
+            actual = clean_text(text, diamonds)
+            if expected != actual:
+                raise AssertionError(f"Mismatch for {text!r}: {expected!r} != {actual!r}")
+
+        # clean_series runs column by column, as the processors call it
+        timings = {
+            'reference': lambda: [_reference_clean_text(t, diamonds) for t in texts],
+            'clean_text': lambda: [clean_text(t, diamonds) for t in texts],
+            'clean_series': lambda: [clean_series(frame[col], diamonds) for col in frame.columns],
+        }
+        print(f"{name}: {len(texts):,} strings")
+        for label, func in timings.items():
+            best = min(timeit.repeat(func, number=1, repeat=repeat))
+            print(f"  {label:<12} {best * 1e9 / len(texts):>10,.0f} ns/string")
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
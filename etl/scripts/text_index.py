@@ -0,0 +1,213 @@
+'''
+Inverted Text Index
+
+Small on-disk inverted index for searching processed datasets by name:
+- Tokens are lowercase ASCII alphanumeric runs after accent folding, so
+  "Acésulfame-K" indexes as "acesulfame" and "k"
+- One posting list per (field, token); documents are row positions in the
+  indexed frame plus a few stored columns returned with each hit
+- Every query token must match in some field (AND across tokens); the
+  last one may also match as a prefix, found by binary search over the
+  sorted terms
+- Hits in the first field (the name) rank above hits in the others
+- Rows can be added to an existing index and documents deleted, so a
+  growing dataset is indexed incrementally; deleted documents keep their
+  id and are left out of every search
+- Saved as one JSON file; loading it never touches the indexed source
+
+Tokenizing runs once per distinct field value, so repeated values cost
+nothing extra.
+'''
+
+import json
+import re
+import unicodedata
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+FORMAT_VERSION = 1
+
+
+def normalize(text: str) -> str:
+    """Lowercase, accent-folded ASCII form of a text value"""
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return text.lower()
+
+
+def tokenize(text) -> List[str]:
+    """Normalized tokens of a text value in order; missing values have none"""
+    if not isinstance(text, str):
+        return []
+    return TOKEN_RE.findall(normalize(text))
+
+
+class InvertedIndex:
+    """Per-field postings from normalized tokens to document ids, with stored columns per document"""
+
+    def __init__(self, fields: Sequence[str], stored: Sequence[str] = (),
+                 docs: Optional[List[list]] = None,
+                 terms: Optional[Dict[str, List[str]]] = None,
+                 postings: Optional[Dict[str, List[List[int]]]] = None,
+                 meta: Optional[dict] = None,
+                 deleted: Iterable[int] = ()):
+        self.fields = list(fields)
+        self.stored = list(stored)
+        self.docs = docs or []
+        # Field -> sorted terms and the aligned, sorted document id lists
+        self.terms = terms or {field: [] for field in self.fields}
+        self.postings = postings or {field: [] for field in self.fields}
+        self.meta = meta or {}
+        self.deleted: Set[int] = set(deleted)
+
+    # Building
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, fields: Sequence[str], stored: Sequence[str] = (),
+                   meta: Optional[dict] = None) -> 'InvertedIndex':
+        """Index every row of a frame; a document id is the row's position"""
+        index = cls(fields, [col for col in stored if col in df.columns], meta=meta)
+        index.add(df)
+        return index
+
+    def add(self, df: pd.DataFrame) -> range:
+        """Index the rows of a frame after the existing documents and return their ids"""
+        start = len(self.docs)
+        stored = df.reindex(columns=self.stored)
+        self.docs.extend(
+            stored.astype(object).where(stored.notna(), None).values.tolist()
+            if self.stored else [[] for _ in range(len(df))]
+        )
+        for field in self.fields:
+            if field in df.columns:
+                self._index_field(field, df[field], start)
+        return range(start, len(self.docs))
+
+    def delete(self, doc_ids: Iterable[int]) -> None:
+        """Leave documents out of every later search; their ids are not reused"""
+        self.deleted.update(doc_ids)
+
+    def _index_field(self, field: str, values: pd.Series, start: int = 0) -> None:
+        codes, uniques = pd.factorize(values)
+        token_sets = [set(tokenize(value)) for value in uniques]
+
+        postings: Dict[str, List[int]] = {}
+        for offset, code in enumerate(codes):
+            if code < 0:
+                continue
+            for token in token_sets[code]:
+                postings.setdefault(token, []).append(start + offset)
+
+        terms = self.terms.setdefault(field, [])
+        lists = self.postings.setdefault(field, [])
+        if not terms:
+            terms.extend(sorted(postings))
+            lists.extend(postings[term] for term in terms)
+            return
+
+        # New ids are above every existing one, so appending keeps each posting list sorted
+        for term, ids in postings.items():
+            position = bisect_left(terms, term)
+            if position < len(terms) and terms[position] == term:
+                lists[position].extend(ids)
+            else:
+                terms.insert(position, term)
+                lists.insert(position, ids)
+
+    # Persistence
+
+    def save(self, path: Path) -> None:
+        """Write the index as JSON, replacing any previous file atomically"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with tmp_path.open('w') as f:
+            json.dump({
+                'version': FORMAT_VERSION,
+                'meta': self.meta,
+                'fields': self.fields,
+                'stored': self.stored,
+                'docs': self.docs,
+                'terms': self.terms,
+                'postings': self.postings,
+                'deleted': sorted(self.deleted)
+            }, f, separators=(',', ':'))
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'InvertedIndex':
+        """Read an index written by save()"""
+        with Path(path).open() as f:
+            data = json.load(f)
+        if data.get('version') != FORMAT_VERSION:
+            raise ValueError(f"{path} has index format {data.get('version')}, expected {FORMAT_VERSION}; rebuild it")
+        return cls(data['fields'], data['stored'], data['docs'], data['terms'], data['postings'], data['meta'],
+                   data.get('deleted', ()))
+
+    # Querying
+
+    def lookup(self, token: str, field: str, prefix: bool = False) -> Set[int]:
+        """Documents whose `field` holds `token`, or any token starting with it"""
+        terms = self.terms.get(field, [])
+        postings = self.postings.get(field, [])
+        start = bisect_left(terms, token)
+        if not prefix:
+            if start < len(terms) and terms[start] == token:
+                return set(postings[start])
+            return set()
+
+        # Every term starting with `token` sorts between it and token + a character above 'z'
+        end = bisect_left(terms, token + '{', lo=start)
+        docs: Set[int] = set()
+        for ids in postings[start:end]:
+            docs.update(ids)
+        return docs
+
+    def search(self, query: str, prefix: bool = True, fields: Optional[Iterable[str]] = None,
+               limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """(document id, score) of documents matching every query token, best first
+
+        With `prefix`, the last token also matches longer tokens, so partial
+        input like "acesulf" finds "acesulfame".
+
+        The score counts query tokens found in the first field, plus one when
+        every token was found there, so name matches rank above synonym and
+        description matches; ties keep document order.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        fields = list(fields or self.fields)
+        if not tokens:
+            return []
+
+        matched: Optional[Set[int]] = None
+        name_hits: Dict[int, int] = {}
+        # Only the last token may be incomplete while typing; longer tokens go first to shrink the candidates early
+        last = len(tokens) - 1
+        for position, token in sorted(enumerate(tokens), key=lambda item: len(item[1]), reverse=True):
+            is_prefix = prefix and position == last
+            per_field = {field: self.lookup(token, field, is_prefix) for field in fields}
+            docs = set().union(*per_field.values())
+            matched = (docs - self.deleted) if matched is None else matched & docs
+            if not matched:
+                return []
+            for doc_id in per_field.get(self.fields[0], ()):
+                name_hits[doc_id] = name_hits.get(doc_id, 0) + 1
+
+        def score(doc_id: int) -> float:
+            hits = name_hits.get(doc_id, 0)
+            return hits + (1 if hits == len(tokens) else 0)
+
+        ranked = sorted(((doc_id, score(doc_id)) for doc_id in matched), key=lambda hit: (-hit[1], hit[0]))
+        return ranked[:limit] if limit else ranked
+
+    def doc(self, doc_id: int) -> Dict[str, object]:
+        """Stored columns of a document"""
+        return dict(zip(self.stored, self.docs[doc_id]))
+
+    def __len__(self) -> int:
+        return len(self.docs) - len(self.deleted)
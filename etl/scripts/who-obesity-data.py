@@ -20,19 +20,19 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 
-class WHODataProcessor:
-    def __init__(self):
-        self.input_file = "data/downloaded/BEFA58B_ALL_LATEST.csv"
-        
-    def read_data(self):
-        """Read WHO obesity data from CSV"""
-        print("Reading WHO obesity data...")
-        df = pd.read_csv(self.input_file)
-        return df
+from instrumentation import configure, finish, instrumented
+from processor_base import BaseProcessor
+
+class WHODataProcessor(BaseProcessor):
+    label = "WHO obesity data"
+    source_file = "BEFA58B_ALL_LATEST.csv"
+    output_name = "processed_who_obesity_data.csv"
     
+    @instrumented('process')
     def process_data(self, df):
         """Process and clean the WHO data"""
-        print("Processing WHO data...")
+        self.logger.info("Processing WHO data...")
+        self.stats['total_records'] += len(df)
         
         # Convert rates to numeric, handling any errors
         rate_columns = ['RATE_PER_100_N', 'RATE_PER_100_NL', 'RATE_PER_100_NU']
@@ -54,6 +54,7 @@ class WHODataProcessor:
         return df
 
 def main():
+    configure('who_obesity')
     processor = WHODataProcessor()
     
     # Read data
@@ -61,15 +62,14 @@ def main():
     
     if df.empty:
         print("No data read")
+        finish()
         return
     
     # Process the data
     df = processor.process_data(df)
     
     # Save to CSV
-    output_file = 'processed_who_obesity_data.csv'
-    df.to_csv(output_file, index=False)
-    print(f"\nData saved to {output_file}")
+    processor.write_output(df)
     
     # Print basic statistics
     print("\nBasic Statistics:")
@@ -81,6 +81,8 @@ def main():
     
     # Print country coverage
     print(f"\nNumber of countries covered: {df['location'].nunique()}")
+    
+    finish()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Shared setup for the test suite.
+
+The ETL helpers, verification and dashboard modules import each other by
+bare module name, so their directories go on sys.path the same way the
+scripts arrange it. load_script() imports the hyphen-named ETL scripts.
+
+The verifier and pipeline resolve etl/data relative to the working
+directory; the processed_tree fixture runs a test inside a copy of the
+committed processed datasets, plus small synthetic CDC and WHO outputs
+(those come from APIs and are not committed).
+"""
+
+import importlib.util
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = REPO_ROOT / 'etl/scripts'
+SOURCE_DIR = REPO_ROOT / 'etl/data/source'
+PROCESSED_DIR = REPO_ROOT / 'etl/data/processed'
+sys.path[:0] = [str(SCRIPTS_DIR), str(REPO_ROOT / 'verification'), str(REPO_ROOT / 'dashboard')]
+
+
+def load_script(filename: str):
+    """Import one of the hyphen-named ETL scripts as a module"""
+    path = SCRIPTS_DIR / filename
+    spec = importlib.util.spec_from_file_location(path.stem.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_obesity_datasets(processed_dir: Path, seed: int = 0) -> None:
+    """Processed CDC and WHO outputs with the columns the verifier reads, 2011-2023"""
+    rng = np.random.default_rng(seed)
+    states = pd.read_csv(PROCESSED_DIR / 'geography_states.csv')['state_abbr']
+    years = np.arange(2011, 2024)
+    cdc = pd.DataFrame([(year, state) for year in years for state in states],
+                       columns=['yearstart', 'locationabbr'])
+    cdc['locationdesc'] = cdc['locationabbr']
+    cdc['data_value'] = (25 + 0.4 * (cdc['yearstart'] - 2011) + rng.normal(0, 2, len(cdc))).round(1)
+    cdc['year'] = cdc['yearstart'].astype(str) + '-01-01'
+    cdc.to_csv(processed_dir / 'processed_cdc_obesity_data.csv', index=False)
+
+    who = pd.DataFrame({
+        'DIM_TIME': np.repeat(np.arange(1990, 2023), 2),
+        'GEO_NAME_SHORT': ['United States of America', 'Canada'] * 33,
+        'DIM_SEX': 'TOTAL'
+    })
+    who['RATE_PER_100_N'] = (12 + 0.5 * (who['DIM_TIME'] - 1990) + rng.normal(0, 0.5, len(who))).round(2)
+    who.to_csv(processed_dir / 'processed_who_obesity_data.csv', index=False)
+
+
+@pytest.fixture
+def processed_tree(tmp_path, monkeypatch):
+    """Working directory holding etl/data/processed; returns that directory"""
+    processed_dir = tmp_path / 'etl/data/processed'
+    processed_dir.mkdir(parents=True)
+    for path in PROCESSED_DIR.iterdir():
+        if path.suffix in ('.csv', '.parquet'):
+            shutil.copy2(path, processed_dir)
+    write_obesity_datasets(processed_dir)
+    monkeypatch.chdir(tmp_path)
+    return processed_dir
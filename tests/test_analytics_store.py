@@ -0,0 +1,58 @@
+"""Verification sections run as SQL over the analytics store against the pandas path."""
+
+import json
+import math
+
+import pytest
+
+from analytics_store import AnalyticsStore
+from verify_statistics import DataVerifier
+
+
+def results(store_path=None):
+    """Section results of an uncached run, over the SQLite store at store_path when given"""
+    verifier = DataVerifier(use_cache=False, n_resamples=200, use_store=store_path is not None)
+    if store_path is not None:
+        verifier.store = AnalyticsStore(store_path, processed_dir=verifier.base_path)
+    verifier.verify_all()
+    # Through JSON, as the report stores them, so numpy and Python numbers compare alike
+    return json.loads(json.dumps(verifier.results, default=str))
+
+
+def assert_same(frames, store, path='results'):
+    """Equal structure and values; SQL sums in another order may differ in the last bits of a float"""
+    if isinstance(frames, dict):
+        assert isinstance(store, dict) and frames.keys() == store.keys(), path
+        for key in frames:
+            assert_same(frames[key], store[key], f"{path}.{key}")
+    elif isinstance(frames, list):
+        assert isinstance(store, list) and len(frames) == len(store), path
+        for i, (a, b) in enumerate(zip(frames, store)):
+            assert_same(a, b, f"{path}[{i}]")
+    elif isinstance(frames, float) and math.isnan(frames):
+        assert isinstance(store, float) and math.isnan(store), path
+    elif isinstance(frames, float):
+        assert store == pytest.approx(frames, rel=1e-9, abs=1e-12), path
+    else:
+        assert store == frames, path
+
+
+def test_store_sections_match_the_frame_sections(processed_tree):
+    frames, store = results(), results(processed_tree / 'analytics.sqlite')
+    for section in DataVerifier.SECTIONS:
+        assert frames[section], f"{section} is empty"
+        assert_same(frames[section], store[section], section)
+
+
+def test_store_is_only_reloaded_for_changed_csvs(processed_tree):
+    store = AnalyticsStore(processed_tree / 'analytics.sqlite', processed_dir=processed_tree)
+    assert 'gras' in store.refresh()
+    assert store.refresh() == []
+
+    path = processed_tree / 'processed_gras_notices.csv'
+    path.write_bytes(path.read_bytes())
+    assert store.refresh() == []
+    path.write_bytes(path.read_bytes() + path.read_bytes().splitlines(keepends=True)[-1])
+    assert store.refresh() == ['gras']
+    assert store.scalar("SELECT COUNT(*) FROM gras") == store.scalar(
+        "SELECT rows FROM _sources WHERE table_name = 'gras'")
@@ -0,0 +1,117 @@
+"""Dashboard API: parameter validation, ETag revalidation and cache invalidation by dataset content."""
+
+import asyncio
+import json
+
+import pandas as pd
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import server
+
+
+def fetch(processed_dir, *requests):
+    """Responses (status, headers, text) for (path, request headers) pairs sent to one running app
+
+    A callable in place of a request runs at that point, e.g. to rewrite a dataset.
+    """
+    async def run():
+        dashboard = server.Dashboard(processed_dir, use_cache=False)
+        responses = []
+        async with TestClient(TestServer(server.create_app(dashboard, warm=False))) as client:
+            for request in requests:
+                if callable(request):
+                    request()
+                    continue
+                path, headers = request
+                response = await client.get(path, headers=headers)
+                responses.append((response.status, response.headers, await response.text()))
+        return dashboard, responses
+    return asyncio.run(run())
+
+
+def get(processed_dir, *paths):
+    return fetch(processed_dir, *[path if callable(path) else (path, {}) for path in paths])
+
+
+def test_revalidation_with_the_etag_gets_a_bodiless_304(processed_tree):
+    path = '/api/recalls/by-year?state=TX'
+    _, [(status, headers, body)] = get(processed_tree, path)
+    assert status == 200
+    assert pd.DataFrame(json.loads(body)['rows'])['recalls'].sum() > 0
+
+    revalidate = {'If-None-Match': headers['ETag']}
+    _, [(status, _, body), (other_status, _, _)] = fetch(processed_tree, (path, revalidate),
+                                                         ('/api/recalls/by-year?state=CA', revalidate))
+    assert (status, body) == (304, '')
+    assert other_status == 200
+
+
+def test_repeated_requests_are_served_from_the_result_cache(processed_tree):
+    dashboard, responses = get(processed_tree, '/api/gras/responses', '/api/gras/responses?year=2010',
+                               '/api/gras/responses')
+    assert [status for status, _, _ in responses] == [200, 200, 200]
+    assert responses[0][1]['ETag'] == responses[2][1]['ETag'] != responses[1][1]['ETag']
+    assert dashboard.results.stats()['hits'] == 1
+
+
+def test_changed_dataset_content_changes_the_etag(processed_tree):
+    path = processed_tree / 'processed_gras_notices.csv'
+    gras = pd.read_csv(path, dtype=str)
+    dashboard, [(_, before, _), (_, rewritten, _), (_, changed, body)] = get(
+        processed_tree,
+        '/api/gras/responses',
+        # Same content under a new mtime: same fingerprint, so a cache hit
+        lambda: path.write_bytes(path.read_bytes()),
+        '/api/gras/responses',
+        lambda: gras.iloc[:-1].to_csv(path, index=False),
+        '/api/gras/responses',
+    )
+    assert rewritten['ETag'] == before['ETag']
+    assert dashboard.results.stats()['hits'] == 1
+    assert changed['ETag'] != before['ETag']
+    assert json.loads(body)['total'] == len(gras) - 1
+
+
+@pytest.mark.parametrize('query, message', [
+    ('/api/recalls/by-state?year=twenty', "Invalid value for year: 'twenty' is not an integer"),
+    ('/api/recalls/by-state?yaer=2020', 'Unknown parameters: yaer (accepted: risk_level, year)'),
+    ('/api/correlations?max_lag=-1', 'max_lag must be between 0 and'),
+    ('/api/correlations?max_lag=100000000', 'max_lag must be between 0 and'),
+    ('/api/correlations?max_lag=2&lag=3', 'lag must be between 0 and max_lag (2)'),
+])
+def test_invalid_parameters_are_a_400(processed_tree, query, message):
+    _, [(status, _, body)] = get(processed_tree, query)
+    assert status == 400
+    assert message in body
+
+
+def test_all_parameter_errors_are_reported_together(processed_tree):
+    _, [(status, _, body)] = get(processed_tree, '/api/recalls/by-state?year=x&colour=red')
+    assert status == 400
+    assert body.splitlines() == ["Invalid value for year: 'x' is not an integer",
+                                 'Unknown parameters: colour (accepted: risk_level, year)']
+
+
+def test_state_ranking_leaves_out_nationwide_and_unknown_states(processed_tree):
+    _, [(status, _, body)] = get(processed_tree, '/api/recalls/by-state?year=2020')
+    assert status == 200
+    states = pd.DataFrame(json.loads(body)['rows'])['state']
+    assert len(states) > 0
+    assert not states.isin(['US', 'Unknown']).any()
+
+
+def test_correlations_for_one_lag(processed_tree):
+    _, [(status, _, body)] = get(processed_tree, '/api/correlations?max_lag=2&lag=1&metric=gras_notices')
+    assert status == 200
+    rows = pd.DataFrame(json.loads(body)['rows'])
+    assert set(rows['lag']) == {1}
+    assert set(rows['leading_metric']) == {'gras_notices'}
+    assert 'gras_notices' not in set(rows['lagging_metric'])
+
+
+def test_missing_dataset_is_a_503(processed_tree):
+    (processed_tree / 'processed_cdc_obesity_data.csv').unlink()
+    _, [(status, _, body)] = get(processed_tree, '/api/obesity/trends')
+    assert status == 503
+    assert 'cdc not processed yet' in body
@@ -0,0 +1,137 @@
+"""Schema rules of data_quality.py and the validating output writer."""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from categories import (FDA_RESPONSE_KEYWORDS, FDA_RESPONSES, FSIS_PROCESSING_CATEGORIES, FSIS_RECALL_REASONS,
+                        FSIS_RISK_LEVELS, RECALL_RISK_LEVELS, recall_label)
+from conftest import PROCESSED_DIR, load_script
+from data_quality import SAMPLES, SCHEMAS, QualityReport, ValidatingWriter, check_file
+from processor_base import CSVWriter
+
+SCHEMA = {
+    'id': {'required': True, 'type': 'integer', 'min': 1, 'unique': True},
+    'rate': {'type': 'number', 'min': 0, 'max': 100},
+    'day': {'type': 'date'},
+    'flag': {'type': 'boolean'},
+    'code': {'pattern': r'[A-Z]{2}'},
+    'reasons': {'separator': ',', 'allowed': ['Misbranding', 'Unreported Allergens']},
+}
+
+
+def violations(report):
+    """(column, rule) -> violating row numbers"""
+    return {key: [row for row, _ in result['samples']] for key, result in report.results.items()
+            if result['violations']}
+
+
+def test_each_rule_flags_its_rows():
+    report = QualityReport('sample.csv', SCHEMA)
+    report.check(pd.DataFrame({
+        'id': [1, 2, None, 4.5, 0],
+        'rate': [10, 'n/a', 50, 101, np.nan],
+        'day': ['2023-01-05', 'yesterday', None, '2023-02-30', '2024-12-31T10:00:00'],
+        'flag': [True, 'False', 'yes', None, False],
+        'code': ['CA', 'ca', 'USA', None, 'NY'],
+        'reasons': ['Misbranding', 'Misbranding, Unreported Allergens', 'Misbranding, Spoiled', None, 'Other'],
+    }))
+    assert violations(report) == {
+        ('id', 'required'): [2],
+        ('id', 'type:integer'): [3],
+        ('id', 'range'): [4],
+        ('rate', 'type:number'): [1],
+        ('rate', 'range'): [3],
+        ('day', 'type:date'): [1, 3],
+        ('flag', 'type:boolean'): [2],
+        ('code', 'pattern'): [1, 2],
+        ('reasons', 'allowed'): [2, 4],
+    }
+    assert report.rows == 5
+    # Missing values are only counted by the required rule
+    assert report.results[('rate', 'range')]['checked'] == 4
+
+
+def test_unique_keys_and_row_numbers_carry_across_chunks():
+    report = QualityReport('sample.csv', {'id': {'unique': True}})
+    report.check(pd.DataFrame({'id': ['a', 'b', 'a']}, index=[7, 8, 9]))
+    report.check(pd.DataFrame({'id': ['c', 'b', None, None]}))
+    result = report.results[('id', 'unique')]
+    assert result['violations'] == 2
+    assert result['samples'] == [[2, 'a'], [4, 'b']]
+
+
+def test_samples_are_capped_and_missing_columns_reported():
+    report = QualityReport('sample.csv', {'rate': {'min': 0}, 'other': {'required': True}})
+    report.check(pd.DataFrame({'rate': [-1] * (SAMPLES + 3)}))
+    result = report.results[('rate', 'range')]
+    assert result['violations'] == SAMPLES + 3
+    assert len(result['samples']) == SAMPLES
+    assert report.missing_columns == ['other']
+    assert 'missing columns: other' in report.summary()
+
+
+def test_validating_writer_writes_and_reports(tmp_path):
+    path = tmp_path / 'processed_gras_notices.csv'
+    chunks = [
+        pd.DataFrame({'grn_no': [1, 2], 'substance': ['A', 'B'], 'fda_response': ['pending', 'other'],
+                      'data_source': 'GRAS_NOTICES'}),
+        pd.DataFrame({'grn_no': [2], 'substance': [None], 'fda_response': ['approved'],
+                      'data_source': 'GRAS_NOTICES'}),
+    ]
+    with ValidatingWriter(CSVWriter(path), SCHEMAS[path.name], report_dir=tmp_path / 'quality') as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+    assert writer.rows == 3
+    assert len(pd.read_csv(path)) == 3
+    saved = json.loads((tmp_path / 'quality/processed_gras_notices.json').read_text())
+    failed = {(rule['column'], rule['rule']): rule['violations'] for rule in saved['rules'] if rule['violations']}
+    assert failed == {('grn_no', 'unique'): 1, ('substance', 'required'): 1, ('fda_response', 'allowed'): 1}
+    assert saved['missing_columns'] == ['date_of_filing', 'date_of_closure', 'filing_year']
+
+
+@pytest.mark.parametrize('name', ['processed_gras_notices.csv', 'processed_fsis_recalls.csv'])
+def test_chunked_checks_match_a_single_pass(name):
+    whole = check_file(PROCESSED_DIR / name, chunksize=10 ** 7).to_dict()
+    chunked = check_file(PROCESSED_DIR / name, chunksize=97).to_dict()
+    for report in (whole, chunked):
+        report.pop('checked_at')
+    assert chunked == whole
+
+
+def validated(tmp_path, name, df):
+    """Violations (column, rule) -> count of a processor's output written through a ValidatingWriter"""
+    with ValidatingWriter(CSVWriter(tmp_path / name), SCHEMAS[name], report_dir=tmp_path / 'quality') as writer:
+        writer.write(df)
+    return {key: result['violations'] for key, result in writer.report.results.items() if result['violations']}
+
+
+def test_every_fda_response_the_processor_emits_is_allowed(tmp_path):
+    processor = load_script('gras-notices-data-new.py').GRASNoticesProcessor()
+    letters = [keywords[0].upper() for keywords in FDA_RESPONSE_KEYWORDS.values()] + ['Letter pending review', None]
+    letters.append('Some response no keyword covers')
+    responses = [processor.standardize_fda_response(letter) for letter in letters]
+    assert sorted(set(responses)) == sorted(FDA_RESPONSES)
+
+    df = pd.DataFrame({'grn_no': range(1, len(responses) + 1), 'substance': 'A', 'fda_response': responses,
+                       'data_source': 'GRAS_NOTICES'})
+    assert validated(tmp_path, 'processed_gras_notices.csv', df) == {}
+
+
+def test_every_fsis_category_the_processor_emits_is_allowed(tmp_path):
+    processor = load_script('fsis-recall-api.py').FSISRecallAPI()
+    risk_levels = [recall_label(label) for label in FSIS_RISK_LEVELS] + [None]
+    count = len(risk_levels)
+    df = processor.process_data(pd.DataFrame({
+        'field_recall_number': [f"{i:03d}-2023" for i in range(count)],
+        'field_recall_date': '2023-05-01',
+        'field_risk_level': risk_levels,
+        # Every label on one recall, as the multi-valued columns list them
+        'field_recall_reason': ', '.join(recall_label(label) for label in FSIS_RECALL_REASONS),
+        'field_processing': ', '.join(recall_label(label) for label in FSIS_PROCESSING_CATEGORIES),
+    }))
+    assert sorted(df['risk_level']) == sorted(RECALL_RISK_LEVELS)
+    assert validated(tmp_path, 'processed_fsis_recalls.csv', df) == {}
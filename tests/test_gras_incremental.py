@@ -0,0 +1,122 @@
+"""Incremental and chunked runs of the GRAS notices processor against a full run."""
+
+import json
+
+import pandas as pd
+import pytest
+
+from conftest import SOURCE_DIR, load_script
+
+gras = load_script('gras-notices-data-new.py')
+
+# Columns that differ between two runs of the same input
+VOLATILE = ['processed_timestamp']
+
+
+def write_source(path, rows):
+    """Write an export with the source's preamble and header and the given data lines"""
+    with (SOURCE_DIR / 'GRASNotices.csv').open(encoding='latin1', newline='') as f:
+        head = [next(f) for _ in range(3)]
+    path.write_text(''.join(head + rows), encoding='latin1', newline='')
+
+
+@pytest.fixture
+def source_rows():
+    with (SOURCE_DIR / 'GRASNotices.csv').open(encoding='latin1', newline='') as f:
+        lines = f.readlines()[3:]
+    return lines[:40]
+
+
+@pytest.fixture
+def make_processor(tmp_path):
+    def make():
+        processor = gras.GRASNoticesProcessor()
+        processor.input_file = tmp_path / 'GRASNotices.csv'
+        processor.output_dir = tmp_path
+        processor.output_file = tmp_path / processor.output_name
+        processor.manifest_file = tmp_path / 'gras_notices_manifest.json'
+        processor.validate_output = False
+        return processor
+    return make
+
+
+def run(processor, incremental=False):
+    """What main() does without --chunksize, minus the search index"""
+    df = processor.read_data()
+    fingerprints = processor.row_fingerprints(df)
+    processor.track_fingerprints(fingerprints)
+    if incremental:
+        df = processor.process_incremental(df, fingerprints)
+    else:
+        df = processor.process_data(df)
+    processor.write_output(df)
+    processor.save_manifest()
+    return processor
+
+
+def read_output(processor):
+    return pd.read_csv(processor.output_file, dtype=str).drop(columns=VOLATILE)
+
+
+def test_unchanged_source_reprocesses_nothing(tmp_path, source_rows, make_processor):
+    write_source(tmp_path / 'GRASNotices.csv', source_rows)
+    full = read_output(run(make_processor()))
+
+    processor = run(make_processor(), incremental=True)
+    assert processor.stats['incremental'] == {'new': 0, 'changed': 0, 'unchanged': 40, 'deleted': 0}
+    assert processor.stats['total_records'] == 40
+    assert processor.stats['reprocessed_records'] == 0
+    pd.testing.assert_frame_equal(read_output(processor), full)
+
+
+def test_changed_and_new_rows_match_a_full_run(tmp_path, source_rows, make_processor):
+    write_source(tmp_path / 'GRASNotices.csv', source_rows[:30])
+    run(make_processor())
+
+    edited = source_rows[:30]
+    # The substance is the first quoted text field after the GRN
+    edited[5] = edited[5].replace(',"', ',"Revised ', 1)
+    write_source(tmp_path / 'GRASNotices.csv', edited + source_rows[30:])
+    processor = run(make_processor(), incremental=True)
+    assert processor.stats['incremental'] == {'new': 10, 'changed': 1, 'unchanged': 29, 'deleted': 0}
+    assert processor.stats['total_records'] == 40
+    assert processor.stats['reprocessed_records'] == 11
+    incremental = read_output(processor)
+
+    assert incremental['substance'].str.startswith('Revised').sum() == 1
+    pd.testing.assert_frame_equal(incremental, read_output(run(make_processor())))
+
+
+def test_deleted_notices_are_recorded(tmp_path, source_rows, make_processor):
+    write_source(tmp_path / 'GRASNotices.csv', source_rows[:10])
+    first = run(make_processor())
+    removed = sorted(first.manifest_rows, key=int)[-1]
+
+    write_source(tmp_path / 'GRASNotices.csv', source_rows[:9])
+    processor = run(make_processor(), incremental=True)
+    assert processor.stats['incremental']['deleted'] == 1
+    assert len(read_output(processor)) == 9
+
+    manifest = json.loads(processor.manifest_file.read_text())
+    assert removed not in manifest['rows']
+    assert removed in manifest['deleted']
+
+    # A notice that comes back is tracked again
+    write_source(tmp_path / 'GRASNotices.csv', source_rows[:10])
+    manifest = json.loads(run(make_processor(), incremental=True).manifest_file.read_text())
+    assert removed in manifest['rows']
+    assert removed not in manifest['deleted']
+
+
+@pytest.mark.parametrize('chunksize', [1, 7, 100])
+def test_chunked_manifest_matches_whole_file(tmp_path, source_rows, make_processor, chunksize):
+    # Repeat one notice in a later chunk: it cannot be tracked by GRN in either mode
+    write_source(tmp_path / 'GRASNotices.csv', source_rows + source_rows[3:4])
+    whole = json.loads(run(make_processor()).manifest_file.read_text())['rows']
+    assert len(whole) == 39
+
+    processor = make_processor()
+    processor.manifest_file.unlink()
+    processor.write_chunks(processor.process_chunks(processor.read_chunks(chunksize), track=True))
+    processor.save_manifest()
+    assert json.loads(processor.manifest_file.read_text())['rows'] == whole
@@ -0,0 +1,64 @@
+"""The vectorized lagged correlation tensor against pandas' pairwise correlations."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lagged_correlation import MIN_OVERLAP, heatmap_table, lagged_correlation_tensor, lagged_correlations
+
+
+@pytest.fixture
+def metrics():
+    """Yearly metrics with gaps, a constant stretch and a series with too few years"""
+    rng = np.random.default_rng(3)
+    years = range(2001, 2021)
+    frame = pd.DataFrame({
+        'trend': np.arange(20) + rng.normal(0, 2, 20),
+        'noise': rng.normal(0, 1, 20),
+        'gappy': np.where(rng.random(20) < 0.3, np.nan, rng.normal(5, 2, 20)),
+        'flat': np.r_[np.full(10, 4.0), rng.normal(4, 1, 10)],
+        'sparse': np.r_[np.full(16, np.nan), rng.normal(0, 1, 4)],
+    }, index=years)
+    frame['echo'] = frame['trend'].shift(2) * 0.5 + rng.normal(0, 0.5, 20)
+    return frame
+
+
+@pytest.mark.parametrize('max_lag', [0, 3, 19, 25])
+def test_every_cell_matches_series_corr(metrics, max_lag):
+    correlation, overlap = lagged_correlation_tensor(metrics.to_numpy(), max_lag)
+    assert correlation.shape == overlap.shape == (max_lag + 1, metrics.shape[1], metrics.shape[1])
+
+    for lag in range(max_lag + 1):
+        lagging = metrics.shift(-lag)
+        for i, leading_name in enumerate(metrics):
+            for j, lagging_name in enumerate(metrics):
+                x, y = metrics[leading_name], lagging[lagging_name]
+                both = x.notna() & y.notna()
+                assert overlap[lag, i, j] == both.sum()
+                with np.errstate(invalid='ignore'):
+                    # Constant over the overlap: pandas warns and gives NaN
+                    expected = x.corr(y, min_periods=MIN_OVERLAP)
+                if np.isnan(expected) or both.sum() < MIN_OVERLAP:
+                    assert np.isnan(correlation[lag, i, j]), (lag, leading_name, lagging_name)
+                else:
+                    assert correlation[lag, i, j] == pytest.approx(expected, abs=1e-9), (lag, leading_name,
+                                                                                         lagging_name)
+
+
+def test_lag_picks_up_a_shifted_series(metrics):
+    result = lagged_correlations(metrics, max_lag=3)
+    table = heatmap_table(result).set_index(['leading_metric', 'lagging_metric', 'lag']).sort_index()
+    echo = table.loc[('trend', 'echo'), 'correlation']
+    assert echo.idxmax() == 2
+    assert echo[2] > 0.9
+
+
+def test_missing_years_are_filled_in_before_shifting(metrics):
+    # Dropping a year from the index must not turn a two-year lag into a one-year lag
+    result = lagged_correlations(metrics.drop(index=2010), max_lag=2)
+    assert result['year_range'] == '2001-2020'
+    filled = metrics.copy()
+    filled.loc[2010] = np.nan
+    x, y = filled['trend'], filled['echo'].shift(-2)
+    assert result['correlation'][2][0][5] == pytest.approx(x.corr(y))
+    assert result['overlap'][2][0][5] == (x.notna() & y.notna()).sum()
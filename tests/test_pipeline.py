@@ -0,0 +1,152 @@
+"""Scheduling and up-to-date skipping of run-pipeline.py, on small stages in a scratch tree."""
+
+import os
+import re
+from pathlib import Path
+
+import pytest
+
+from conftest import REPO_ROOT, load_script
+
+pipeline = load_script('run-pipeline.py')
+Stage = pipeline.Stage
+
+# Copies its input to its output in upper case and logs that it ran
+COPY_SCRIPT = '''
+import sys
+from pathlib import Path
+source, target = sys.argv[1:]
+Path(target).write_text(Path(source).read_text().upper())
+with open('runs.log', 'a') as log:
+    log.write(Path(__file__).stem + '\\n')
+'''
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, 'BASE_PATH', tmp_path)
+    monkeypatch.setattr(pipeline, 'STATE_FILE', tmp_path / 'pipeline_state.json')
+    monkeypatch.setattr(pipeline, 'LOG_DIR', tmp_path / 'logs')
+    for name in ('first', 'second', 'other'):
+        (tmp_path / f"{name}.py").write_text(COPY_SCRIPT)
+    (tmp_path / 'source.txt').write_text('data')
+    (tmp_path / 'other.txt').write_text('other')
+    return tmp_path
+
+
+def stages():
+    return [
+        Stage('second', Path('second.py'), args=['middle.txt', 'final.txt'],
+              inputs=[Path('middle.txt')], outputs=[Path('final.txt')]),
+        Stage('first', Path('first.py'), args=['source.txt', 'middle.txt'],
+              inputs=[Path('source.txt')], outputs=[Path('middle.txt')]),
+        Stage('other', Path('other.py'), args=['other.txt', 'other.out'],
+              inputs=[Path('other.txt')], outputs=[Path('other.out')]),
+    ]
+
+
+def run(tree, *names, force=None):
+    """Run a fresh Pipeline (state reloaded from disk); returns success and the stages that ran"""
+    log = tree / 'runs.log'
+    before = log.read_text().split() if log.exists() else []
+    ok = pipeline.Pipeline(stages(), jobs=2).run(list(names) or None, force=force)
+    return ok, log.read_text().split()[len(before):] if log.exists() else []
+
+
+def test_dependencies_follow_inputs_and_outputs():
+    p = pipeline.Pipeline(stages())
+    assert p.dependencies == {'first': set(), 'second': {'first'}, 'other': set()}
+    assert p.with_dependencies(['second']) == {'first', 'second'}
+
+
+def test_cycle_is_rejected():
+    looped = stages() + [Stage('back', Path('first.py'), inputs=[Path('final.txt')], outputs=[Path('source.txt')])]
+    with pytest.raises(ValueError, match='cycle'):
+        pipeline.Pipeline(looped)
+
+
+def test_up_to_date_stages_are_skipped(tree):
+    ok, ran = run(tree)
+    assert ok
+    assert ran.index('first') < ran.index('second')
+    assert sorted(ran) == ['first', 'other', 'second']
+    assert (tree / 'final.txt').read_text() == 'DATA'
+
+    assert run(tree) == (True, [])
+    # A new mtime with the same content is not a change
+    os.utime(tree / 'source.txt', ns=(1, 1))
+    assert run(tree) == (True, [])
+
+
+def test_changed_input_reruns_its_stage_and_dependents(tree):
+    run(tree)
+    (tree / 'source.txt').write_text('changed')
+    ok, ran = run(tree)
+    assert ran == ['first', 'second']
+    assert (tree / 'final.txt').read_text() == 'CHANGED'
+
+
+def test_unchanged_intermediate_output_stops_the_rerun(tree):
+    run(tree)
+    # Same upper-cased output, so the second stage's input hash is unchanged
+    (tree / 'source.txt').write_text('DATA')
+    assert run(tree) == (True, ['first'])
+
+
+def test_changed_code_and_missing_outputs_rerun(tree):
+    run(tree)
+    with (tree / 'second.py').open('a') as f:
+        f.write('# edited\n')
+    assert run(tree)[1] == ['second']
+
+    (tree / 'other.out').unlink()
+    assert run(tree)[1] == ['other']
+
+
+def test_forced_and_selected_stages(tree):
+    run(tree)
+    assert run(tree, 'first', force={'first'})[1] == ['first']
+    # Selecting a stage brings its dependencies up to date first
+    (tree / 'source.txt').write_text('new')
+    assert run(tree, 'second')[1] == ['first', 'second']
+
+
+def test_stage_that_writes_nothing_fails_and_stops_dependents(tree):
+    (tree / 'first.py').write_text("print('logged an error but exited cleanly')\n")
+    ok, ran = run(tree)
+    assert not ok
+    assert ran == ['other']
+    assert not (tree / 'final.txt').exists()
+    state = pipeline.Pipeline(stages()).state
+    assert set(state['stages']) == {'other'}
+
+
+def test_stage_code_lists_every_local_import():
+    """A module missing from a stage's code would let the stage skip after that module changes"""
+    local = {path.stem: path for folder in ('etl/scripts', 'verification')
+             for path in (REPO_ROOT / folder).glob('*.py')}
+    for stage in pipeline.STAGES:
+        declared = {path.stem for path in stage.code_files}
+        needed, pending = set(), [REPO_ROOT / stage.script]
+        while pending:
+            source = pending.pop().read_text()
+            for name in re.findall(r'^\s*(?:from|import)\s+(\w+)', source, re.MULTILINE):
+                if name in local and name not in needed:
+                    needed.add(name)
+                    pending.append(local[name])
+        assert needed <= declared, f"{stage.name} does not declare {sorted(needed - declared)}"
+
+
+def test_warm_verification_marks_its_outputs_checked(processed_tree):
+    """The verify stage's outputs must look written even when every section came from the cache"""
+    from verify_statistics import DataVerifier
+
+    DataVerifier(n_resamples=200).verify_all()
+    outputs = next(stage for stage in pipeline.STAGES if stage.name == 'verify').outputs
+    for path in outputs:
+        os.utime(path, ns=(1, 1))
+
+    verifier = DataVerifier(n_resamples=200)
+    verifier.verify_all()
+    assert verifier.timings == {}
+    assert all(path.stat().st_mtime_ns > 1 for path in outputs)
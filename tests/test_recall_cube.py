@@ -0,0 +1,83 @@
+"""Recall cube subtotals against direct counts over the processed recalls."""
+
+import pandas as pd
+import pytest
+
+from conftest import PROCESSED_DIR
+from geography import geography_table
+from recall_cube import DIMENSIONS, UNKNOWN_STATE, build_cube, grouping_id, load_cube, recall_facts, select
+
+
+@pytest.fixture(scope='module')
+def recalls():
+    return pd.read_csv(PROCESSED_DIR / 'processed_fsis_recalls.csv', dtype={'recall_number': str})
+
+
+@pytest.fixture(scope='module')
+def bridge():
+    return pd.read_csv(PROCESSED_DIR / 'recall_state_bridge.csv', dtype={'recall_number': str})
+
+
+@pytest.fixture(scope='module')
+def cube(recalls, bridge):
+    return build_cube(recalls, bridge)
+
+
+def test_grouping_ids():
+    assert grouping_id(DIMENSIONS) == 0
+    assert grouping_id([]) == 2 ** len(DIMENSIONS) - 1
+    assert grouping_id(['state']) == grouping_id([]) - (1 << DIMENSIONS.index('state'))
+
+
+def test_every_grouping_set_is_present(cube):
+    assert set(cube['grouping_id']) == set(range(2 ** len(DIMENSIONS)))
+
+
+def test_subtotals_match_direct_counts(cube, recalls):
+    facts = recall_facts(recalls)
+    assert select(cube)['recalls'].item() == len(facts)
+    assert select(cube)['quantity_lbs'].item() == pytest.approx(facts['quantity_lbs'].sum())
+
+    by_year = select(cube, ['year']).set_index('year')['recalls']
+    expected = facts.groupby('year', dropna=False).size()
+    assert by_year.sort_index().tolist() == expected.sort_index().tolist()
+
+    high = select(cube, ['year'], risk_level='High - Class I').set_index('year')['recalls']
+    expected = facts[facts['risk_level'] == 'High - Class I'].groupby('year').size()
+    assert high.to_dict() == expected.to_dict()
+
+
+def test_multi_state_recalls_count_once_per_state(cube, recalls, bridge):
+    states = select(cube, ['state']).set_index('state')['recalls']
+    stateless = ~recall_facts(recalls)['recall_number'].isin(bridge['recall_number'])
+    assert states.sum() == len(bridge.drop_duplicates()) + stateless.sum()
+    # With the state rolled up, a recall spanning several states is counted once
+    assert select(cube, ['risk_level'])['recalls'].sum() == recall_facts(recalls)['recall_number'].nunique()
+
+    codes = geography_table().set_index('state_abbr')['state_code']
+    texas = bridge[bridge['state_code'] == codes['TX']]['recall_number']
+    assert states['TX'] == texas.nunique()
+    in_2023 = select(cube, state='TX', year=2023)['recalls'].item()
+    assert in_2023 == recall_facts(recalls).query('year == 2023')['recall_number'].isin(texas).sum()
+
+
+def test_recalls_without_a_state_stay_in_the_state_cells(cube, recalls, bridge):
+    facts = recall_facts(recalls)
+    stateless = facts[~facts['recall_number'].isin(bridge['recall_number'])]
+    assert len(stateless) > 0
+    assert select(cube, ['state']).set_index('state')['recalls'][UNKNOWN_STATE] == len(stateless)
+
+    unknown = select(cube, ['risk_level'], state=UNKNOWN_STATE).set_index('risk_level')['recalls']
+    assert unknown.to_dict() == stateless.groupby('risk_level').size().to_dict()
+
+
+def test_a_recall_without_bridge_rows_is_not_dropped(recalls, bridge):
+    sample = recalls.drop_duplicates('recall_number').head(20)
+    cube = build_cube(sample, bridge.iloc[:0])
+    cells = select(cube, ['state', 'year'])
+    assert set(cells['state'].astype(str)) == {UNKNOWN_STATE}
+    assert cells['recalls'].sum() == select(cube)['recalls'].item() == 20
+
+
+def test_saved_cube_matches_a_rebuild(cube):
+    pd.testing.assert_frame_equal(load_cube(PROCESSED_DIR), cube)
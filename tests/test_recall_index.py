@@ -0,0 +1,103 @@
+"""Establishment keys and incremental updates of the recall search index."""
+
+import pandas as pd
+import pytest
+
+from conftest import PROCESSED_DIR
+from recall_index import RecallIndex, establishment_id, establishment_key
+
+
+def recalls(*rows):
+    return pd.DataFrame(rows, columns=['recall_number', 'recall_date', 'establishment', 'products', 'title',
+                                       'risk_level'])
+
+
+@pytest.fixture
+def frame():
+    return recalls(
+        ('001-2023', '2023-01-05', 'Pilgrim&#039;s Pride Corporation', 'chicken nuggets', 'Nugget recall', 'High'),
+        ('002-2023', '2023-02-10', 'Pilgrims Pride', 'breaded chicken tenders', 'Tender recall', 'Low'),
+        ('003-2023', '2023-03-15', 'Valley Meats, LLC', 'ground beef patties', 'Beef recall', 'High'),
+    )
+
+
+def numbers(result):
+    return sorted(result['recall_number'])
+
+
+@pytest.mark.parametrize('name', [
+    "Pilgrim's Pride Corporation",
+    'Pilgrim&#039;s Pride Corp.',
+    'PILGRIMS PRIDE, INC. (Plant 12)',
+    'Pilgrims Pride d/b/a Gold Kist',
+])
+def test_establishment_variants_share_a_key(name):
+    assert establishment_key(name) == 'pilgrims pride'
+    assert establishment_id(name) == establishment_id('Pilgrims Pride')
+
+
+def test_missing_names_have_no_key():
+    assert establishment_key(None) is None
+    assert establishment_id('The Inc.') is None
+
+
+def test_search_and_establishment_lookup(frame):
+    index = RecallIndex()
+    assert index.update(frame) == {'added': 3, 'replaced': 0, 'unchanged': 0, 'removed': 0}
+
+    assert numbers(index.search('chicken')) == ['001-2023', '002-2023']
+    assert numbers(index.search('ground be')) == ['003-2023']
+    assert index.search('ground be', prefix=False).empty
+    assert numbers(index.establishment_recalls("Pilgrim's Pride Inc")) == ['001-2023', '002-2023']
+
+    similar = index.find_establishments('Pilgrim Prides')
+    assert similar['establishment_id'].iloc[0] == establishment_id('Pilgrims Pride')
+    assert similar['recalls'].iloc[0] == 2
+
+
+def test_update_replaces_changed_and_prunes_withdrawn_recalls(frame):
+    index = RecallIndex()
+    index.update(frame)
+
+    changed = frame.copy()
+    changed.loc[0, 'products'] = 'frozen turkey burgers'
+    changed = changed.drop(index=2)
+    assert index.update(changed, prune=True) == {'added': 0, 'replaced': 1, 'unchanged': 1, 'removed': 1}
+
+    # The replaced document's old tokens and the removed recall no longer match
+    assert numbers(index.search('nuggets')) == []
+    assert numbers(index.search('turkey')) == ['001-2023']
+    assert index.search('beef').empty
+    assert numbers(index.establishment_recalls('Pilgrims Pride')) == ['001-2023', '002-2023']
+    assert index.establishment_recalls('Valley Meats').empty
+    assert len(index) == 2
+
+
+def test_saved_index_updates_incrementally(frame, tmp_path):
+    path = tmp_path / 'recalls.json'
+    index = RecallIndex()
+    index.update(frame)
+    index.save(path)
+
+    # Dates read back from the CSV are strings; the digests must still match
+    reread = frame.assign(recall_date=pd.to_datetime(frame['recall_date']))
+    loaded = RecallIndex.open(path)
+    assert loaded.update(reread) == {'added': 0, 'replaced': 0, 'unchanged': 3, 'removed': 0}
+    assert numbers(loaded.search('recall')) == numbers(index.search('recall'))
+
+
+def test_incremental_updates_match_a_fresh_build():
+    df = pd.read_csv(PROCESSED_DIR / 'processed_fsis_recalls.csv', dtype={'recall_number': str})
+    half = len(df) // 2
+
+    incremental = RecallIndex()
+    incremental.update(df.iloc[:half])
+    edited = df.copy()
+    edited.loc[edited.index[:20], 'products'] = 'relabelled sausage links'
+    incremental.update(edited.iloc[10:], prune=True)
+
+    fresh = RecallIndex()
+    fresh.update(edited.iloc[10:])
+    assert len(incremental) == len(fresh)
+    for query in ('ground beef', 'sausage links', 'chicken', 'listeria', 'pork sa'):
+        assert numbers(incremental.search(query, limit=None)) == numbers(fresh.search(query, limit=None))
@@ -0,0 +1,71 @@
+"""Batched permutation and bootstrap resampling against exact and looped references."""
+
+from itertools import permutations
+
+import numpy as np
+import pytest
+from scipy import stats
+
+from significance import bootstrap_ci, correlation_significance, permutation_p_value, rowwise_pearson
+
+X = np.array([3.1, 4.0, 2.2, 5.9, 6.3, 4.8, 7.5])
+Y = np.array([10.2, 11.9, 9.8, 12.1, 14.6, 11.0, 13.3])
+
+
+def exact_p_value(x, y):
+    """Two-sided p-value over every permutation of y"""
+    observed = abs(np.corrcoef(x, y)[0, 1])
+    correlations = np.abs([np.corrcoef(x, permuted)[0, 1] for permuted in permutations(y)])
+    return np.mean(correlations >= observed - 1e-12)
+
+
+def test_rowwise_pearson_matches_corrcoef():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(6, 12))
+    y = x * rng.normal(size=(6, 1)) + rng.normal(size=(6, 12))
+    y[3] = 2.0
+    expected = [np.nan if row == 3 else stats.pearsonr(x[row], y[row])[0] for row in range(6)]
+    np.testing.assert_allclose(rowwise_pearson(x, y), expected, atol=1e-12)
+
+
+def test_permutation_p_value_converges_to_the_exact_one():
+    exact = exact_p_value(X, Y)
+    n_resamples = 100000
+    estimate = permutation_p_value(X, Y, n_resamples, np.random.default_rng(1))
+    # Four standard errors of a binomial proportion
+    assert estimate == pytest.approx(exact, abs=4 * np.sqrt(exact * (1 - exact) / n_resamples) + 1e-5)
+
+
+def test_permutation_p_value_bounds():
+    rng = np.random.default_rng(2)
+    # No resample beats a perfect correlation, but the observed one counts itself
+    assert permutation_p_value(X, 2 * X + 1, 999, rng) == pytest.approx(1 / 1000, abs=2 / 1000)
+    assert np.isnan(permutation_p_value(X, np.full_like(X, 4.0), 999, rng))
+
+
+def test_bootstrap_ci_matches_a_looped_bootstrap():
+    n_resamples, confidence = 2000, 0.9
+    ci = bootstrap_ci(X, Y, n_resamples, np.random.default_rng(3), confidence)
+
+    indices = np.random.default_rng(3).integers(0, len(X), size=(n_resamples, len(X)))
+    looped = []
+    for sample in indices:
+        x, y = X[sample], Y[sample]
+        if x.std() > 0 and y.std() > 0:
+            looped.append(np.corrcoef(x, y)[0, 1])
+    lower, upper = np.percentile(looped, [5, 95])
+    assert (ci['lower'], ci['upper']) == (pytest.approx(lower), pytest.approx(upper))
+    assert ci['confidence'] == confidence
+    assert ci['lower'] < np.corrcoef(X, Y)[0, 1] < ci['upper']
+
+
+def test_bootstrap_ci_of_constant_series_is_empty():
+    ci = bootstrap_ci(np.ones(5), np.arange(5.0), 100, np.random.default_rng(4))
+    assert (ci['lower'], ci['upper']) == (None, None)
+
+
+def test_correlation_significance_is_reproducible_from_its_seed():
+    first = correlation_significance(list(X), list(Y), n_resamples=500, seed=7)
+    assert correlation_significance(X, Y, n_resamples=500, seed=7) == first
+    assert correlation_significance(X, Y, n_resamples=500, seed=8) != first
+    assert first['resamples'] == 500
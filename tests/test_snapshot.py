@@ -0,0 +1,102 @@
+"""Arrow snapshots: round trips against read_csv, staleness checks and zero-copy reads."""
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import PROCESSED_DIR
+from dataset_registry import DATASETS
+from processor_base import CSVWriter
+from snapshot import (SnapshotWriter, is_current, open_snapshot, snapshot_csv, snapshot_path, source_fingerprint,
+                      to_batch, to_pandas, write_snapshot)
+
+pytest.importorskip('pyarrow')
+
+
+def written(tmp_path, chunks, name='data.csv'):
+    """Write chunks through a SnapshotWriter like a processor does; returns the CSV path"""
+    path = tmp_path / name
+    with SnapshotWriter(CSVWriter(path)) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    return path
+
+
+@pytest.mark.parametrize('name, spec', [(name, spec) for name, spec in DATASETS.items()
+                                        if (PROCESSED_DIR / spec['file']).exists()])
+def test_declared_dtypes_read_as_from_the_csv(tmp_path, name, spec):
+    path = shutil.copy2(PROCESSED_DIR / spec['file'], tmp_path)
+    snapshot_csv(path)
+    columns = list(spec['dtypes'])
+    expected = pd.read_csv(path, usecols=columns, dtype=spec['dtypes'])[columns]
+    pd.testing.assert_frame_equal(to_pandas(open_snapshot(path, columns), spec['dtypes']), expected)
+
+
+def test_every_column_as_text_matches_the_csv_text(tmp_path):
+    path = shutil.copy2(PROCESSED_DIR / 'processed_fsis_recalls.csv', tmp_path)
+    snapshot_csv(path)
+    table = open_snapshot(path)
+    text = to_pandas(table, {name: str for name in table.column_names})
+    pd.testing.assert_frame_equal(text, pd.read_csv(path, dtype=str))
+
+
+def test_chunks_with_different_types_are_unified(tmp_path):
+    path = written(tmp_path, [
+        pd.DataFrame({'code': [np.nan, np.nan], 'count': [1, 2], 'when': pd.to_datetime(['2024-01-01', None])}),
+        pd.DataFrame({'code': ['A1', None], 'count': [2.5, np.nan], 'when': pd.to_datetime(['2024-02-03', None])}),
+    ])
+    table = open_snapshot(path)
+    assert str(table.schema.field('code').type) == 'large_string'
+    assert str(table.schema.field('count').type) == 'double'
+
+    frame = to_pandas(table, {'code': str, 'count': 'float64', 'when': str})
+    expected = pd.read_csv(path, dtype={'code': str, 'count': 'float64', 'when': str})
+    pd.testing.assert_frame_equal(frame, expected)
+
+
+def test_staleness_follows_the_csv_content(tmp_path):
+    path = written(tmp_path, [pd.DataFrame({'a': [1, 2], 'b': ['x', 'y']})])
+    assert is_current(path)
+
+    # Touched but unchanged: hashed once, then restamped so the next check is a stat()
+    os.utime(path, ns=(10 ** 18, 10 ** 18))
+    assert is_current(path)
+    assert source_fingerprint(snapshot_path(path))['mtime_ns'] == 10 ** 18
+
+    # Same size, different content
+    path.write_text(path.read_text().replace('x', 'z'))
+    assert not is_current(path)
+    path.write_text('a,b\n1,x\n')
+    assert not is_current(path)
+
+
+def test_failed_write_removes_the_previous_snapshot(tmp_path):
+    path = written(tmp_path, [pd.DataFrame({'a': [1]})])
+    with pytest.raises(RuntimeError):
+        with SnapshotWriter(CSVWriter(path)) as writer:
+            writer.write(pd.DataFrame({'a': [2]}))
+            raise RuntimeError("processor failed")
+    assert not snapshot_path(path).exists()
+
+
+def test_float_and_text_columns_are_not_copied(tmp_path):
+    path = written(tmp_path, [pd.DataFrame({'rate': [1.5, np.nan, 3.0], 'name': ['a', None, 'c']})])
+    table = open_snapshot(path)
+    frame = to_pandas(table, {'rate': 'float64', 'name': str})
+
+    rate = table.column('rate').chunk(0)
+    assert frame['rate'].to_numpy().ctypes.data == rate.buffers()[1].address
+    if isinstance(frame['name'].dtype, pd.StringDtype):
+        name = table.column('name').chunk(0)
+        assert frame['name'].array._pa_array.chunk(0).buffers()[2].address == name.buffers()[2].address
+
+
+def test_empty_output_writes_an_empty_snapshot(tmp_path):
+    path = tmp_path / 'empty.csv'
+    path.write_text('')
+    write_snapshot([], path)
+    assert open_snapshot(path).num_rows == 0
+    assert to_batch(pd.DataFrame({'a': []})).num_rows == 0
@@ -0,0 +1,109 @@
+"""CAS checksums, name normalization, Soundex blocking and the links built from them."""
+
+import pandas as pd
+import pytest
+
+from conftest import PROCESSED_DIR
+from substance_linkage import (GRASLinker, blocking_keys, cas_is_valid, extract_cas_numbers, inventory_names,
+                               link_years, load_links, name_tokens, soundex)
+
+
+@pytest.mark.parametrize('cas, valid', [
+    ('7732-18-5', True),    # water
+    ('64-17-5', True),      # ethanol
+    ('9004-34-6', True),    # cellulose
+    ('7732-18-6', False),
+    ('64-71-5', False),
+])
+def test_cas_check_digit(cas, valid):
+    assert cas_is_valid(*cas.split('-')) is valid
+
+
+def test_extract_keeps_only_valid_cas_numbers():
+    text = 'Water (CAS 7732-18-5), not 7732-18-6; ethanol 64-17-5 and lot 2023-01-5'
+    assert extract_cas_numbers(text) == ['7732-18-5', '64-17-5']
+    assert extract_cas_numbers(None) == []
+
+
+@pytest.mark.parametrize('word, code', [
+    ('robert', 'R163'), ('rupert', 'R163'), ('ashcraft', 'A261'), ('tymczak', 'T522'),
+    ('pfister', 'P236'), ('honeyman', 'H555'), ('sulfate', 'S413'), ('sulphate', 'S413'), ('lee', 'L000'),
+])
+def test_soundex(word, code):
+    assert soundex(word) == code
+
+
+def test_name_tokens_and_blocking_keys():
+    assert name_tokens('Extract of the Leaves from Stevia') == ['extract', 'leave', 'stevia']
+    assert name_tokens('Glass') == ['glass']
+    # Short and alphanumeric tokens are not distinctive enough to block on
+    assert blocking_keys(['oil', 'b12', 'sulphate']) == {'S413'}
+
+
+def test_inventory_names_split_synonyms():
+    assert inventory_names('Sucralose', 'TGS   Trichlorogalactosucrose') == [
+        'Sucralose', 'TGS', 'Trichlorogalactosucrose']
+    assert inventory_names(None, None) == []
+
+
+@pytest.fixture
+def linker():
+    notices = pd.DataFrame({
+        'grn_no': [1, 2, 3, 4],
+        'substance': ['Microcrystaline cellulose', 'Oil of Peppermint', 'Purified water', 'Calcium citrate'],
+        'intended_use': ['Nutrient', 'Flavor', 'Solvent; CAS 7732-18-5', 'Nutrient'],
+        'filing_year': [2001, 2002, 2003, 2004],
+    })
+    return GRASLinker(notices)
+
+
+def test_links_by_cas_name_and_fuzzy_name(linker):
+    inventory = pd.DataFrame({
+        'cas_reg_no_(or_other_id)': ['9004-34-6', '8006-90-4', '7732-18-5', '977051-32-7'],
+        'substance': ['MICROCRYSTALLINE CELLULOSE', 'PEPPERMINT OIL', 'WATER', 'CALCIUM LACTATE'],
+        'other_names': [None, None, None, None],
+        'cas_reg_no': ['9004-34-6', '8006-90-4', '7732-18-5', None],
+    })
+    links = linker.link(inventory).set_index('substance')
+
+    assert links.loc['WATER', ['grn_no', 'method', 'score']].tolist() == [3, 'cas', 1.0]
+    # Word order and filler words are ignored by exact name matching
+    assert links.loc['PEPPERMINT OIL', ['grn_no', 'method']].tolist() == [2, 'name']
+    # The misspelling shares a Soundex block and most trigrams
+    fuzzy = links.loc['MICROCRYSTALLINE CELLULOSE']
+    assert (fuzzy['grn_no'], fuzzy['method']) == (1, 'fuzzy')
+    assert 0.85 <= fuzzy['score'] < 1
+    assert fuzzy['filing_year'] == 2001
+    assert 'CALCIUM LACTATE' not in links.index
+
+
+def test_only_exact_links_date_a_substance(linker):
+    inventory = pd.DataFrame({
+        'substance': ['MICROCRYSTALLINE CELLULOSE', 'PEPPERMINT OIL'],
+        'cas_reg_no': [None, None],
+    }, index=[10, 11])
+    links = linker.link(inventory)
+    assert set(links['method']) == {'fuzzy', 'name'}
+    assert link_years(links).to_dict() == {11: 2002}
+
+
+def test_saved_fuzzy_links_do_not_set_approval_years():
+    links = load_links(PROCESSED_DIR)
+    substances = pd.read_csv(PROCESSED_DIR / 'processed_fda_substances.csv', low_memory=False,
+                             usecols=['cas_reg_no_(or_other_id)', 'substance', 'grn_link_year'])
+    fuzzy_only = set(links['substance_id']) - set(links.loc[links['method'] != 'fuzzy', 'substance_id'])
+    # e.g. phosphated distarch phosphate linked to a distarch phosphate notice
+    assert 'STARCH, FOOD, MODIFIED: PHOSPHATED DISTARCH PHOSPHATE' in set(
+        links.loc[links['substance_id'].isin(fuzzy_only), 'substance'])
+    dated = substances.loc[substances['cas_reg_no_(or_other_id)'].isin(fuzzy_only), 'grn_link_year']
+    assert dated.isna().all()
+
+
+def test_oversized_blocks_are_not_searched():
+    notices = pd.DataFrame({
+        'grn_no': range(50),
+        'substance': [f"Sodium compound {i}" for i in range(50)],
+    })
+    linker = GRASLinker(notices)
+    assert soundex('sodium') not in linker.blocks
+    assert linker.match_name('Sodium compoud 7') == ([], {})
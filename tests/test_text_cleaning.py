@@ -0,0 +1,58 @@
+"""The fast text cleaners against the original implementation."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import SOURCE_DIR
+from text_cleaning import SAMPLE_SIZE, _reference_clean_text, clean_series, clean_text, strip_html_series
+
+EDGE_CASES = [
+    '  "Quoted"  ', '<b>bold</b>text', 'a &amp; b', '&lt;br&gt;after', 'line<br/>break', 'tabs\tand\nnewlines',
+    'café • bullet – dash', '&diams; diamond', '', '   ', 42, 3.5, None, np.nan,
+]
+
+
+@pytest.mark.parametrize('value', EDGE_CASES)
+@pytest.mark.parametrize('replace_diamonds', [False, True])
+def test_clean_text_matches_the_reference(value, replace_diamonds):
+    expected = _reference_clean_text(value, replace_diamonds)
+    result = clean_text(value, replace_diamonds)
+    if pd.isna(expected):
+        assert pd.isna(result)
+    else:
+        assert result == expected
+
+
+@pytest.mark.parametrize('source, columns', [
+    ('GRASNotices.csv', ['Substance', 'Intended Use', 'Notifier']),
+    ('FoodSubstances.csv', ['Substance', 'Other Names']),
+])
+def test_clean_text_matches_the_reference_on_the_exports(source, columns):
+    skiprows = 2 if source == 'GRASNotices.csv' else 4
+    df = pd.read_csv(SOURCE_DIR / source, skiprows=skiprows, encoding='latin1', quoting=1, dtype=str,
+                     usecols=columns)
+    for column in columns:
+        values = df[column].dropna().unique()
+        assert [clean_text(value) for value in values] == [_reference_clean_text(value) for value in values]
+
+
+@pytest.mark.parametrize('distinct', [3, 2 * SAMPLE_SIZE])
+def test_clean_series_matches_mapping_clean_text(distinct):
+    values = pd.Series([f" <i>Value</i> {i % distinct} &amp; more " for i in range(4 * SAMPLE_SIZE)],
+                       index=range(10, 10 + 4 * SAMPLE_SIZE), name='substance', dtype=str)
+    values.iloc[::7] = None
+    result = clean_series(values)
+    pd.testing.assert_series_equal(result, values.map(clean_text))
+    assert result.iloc[1] == "Value 1 & more"
+    assert result.isna().sum() == values.isna().sum()
+
+
+def test_clean_series_of_missing_values():
+    values = pd.Series([None, np.nan], dtype=object)
+    assert clean_series(values).isna().all()
+
+
+def test_strip_html_series_keeps_missing_values_as_text():
+    values = pd.Series(['<p>Beef &amp; pork</p>', None, '<p>Beef &amp; pork</p>'])
+    assert strip_html_series(values).tolist() == ['Beef & pork', 'nan', 'Beef & pork']
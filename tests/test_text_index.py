@@ -0,0 +1,89 @@
+"""Tokenizing, prefix search, ranking and deletions of the inverted text index."""
+
+import pandas as pd
+import pytest
+
+from conftest import PROCESSED_DIR
+from substance_index import SubstanceIndex, save_dataset_index
+from text_index import InvertedIndex, tokenize
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'substance': ['Acésulfame-K', 'Sucralose', 'Potassium chloride', None],
+        'other_names': ['Acesulfame potassium', 'Trichlorogalactosucrose', None, 'Sweetener blend'],
+        'cas_reg_no': ['55589-62-3', '56038-13-2', '7447-40-7', None],
+    })
+
+
+def ids(hits):
+    return [doc_id for doc_id, _ in hits]
+
+
+def test_tokenize_folds_accents_and_punctuation():
+    assert tokenize('Acésulfame-K (E950)') == ['acesulfame', 'k', 'e950']
+    assert tokenize(None) == []
+
+
+def test_prefix_only_applies_to_the_last_token(frame):
+    index = InvertedIndex.from_frame(frame, ['substance', 'other_names'], ['cas_reg_no'])
+    assert ids(index.search('sucra')) == [1]
+    assert ids(index.search('sucra', prefix=False)) == []
+    assert ids(index.search('acesulf potassium')) == []
+    assert ids(index.search('potassium acesulf')) == [0]
+
+
+def test_name_hits_rank_above_synonym_hits(frame):
+    index = InvertedIndex.from_frame(frame, ['substance', 'other_names'], ['cas_reg_no'])
+    # Both match "potassium"; the chloride has it in its name, acesulfame only as a synonym
+    assert index.search('potassium') == [(2, 2), (0, 0)]
+    assert index.doc(2) == {'cas_reg_no': '7447-40-7'}
+
+
+def test_deleted_documents_stay_out_of_searches(frame, tmp_path):
+    index = InvertedIndex.from_frame(frame, ['substance', 'other_names'], ['cas_reg_no'])
+    index.delete([0])
+    replacement = frame.iloc[[0]].assign(substance='Acesulfame potassium salt')
+    assert list(index.add(replacement)) == [4]
+
+    assert ids(index.search('acesulfame')) == [4]
+    assert len(index) == 4
+
+    path = tmp_path / 'index.json'
+    index.save(path)
+    loaded = InvertedIndex.load(path)
+    assert ids(loaded.search('acesulfame')) == [4]
+    assert ids(loaded.search('salt')) == [4]
+    assert loaded.deleted == {0}
+
+
+def test_appending_rows_matches_indexing_them_at_once(frame):
+    whole = InvertedIndex.from_frame(frame, ['substance', 'other_names'])
+    appended = InvertedIndex.from_frame(frame.iloc[:2], ['substance', 'other_names'])
+    appended.add(frame.iloc[2:])
+    assert appended.terms == whole.terms
+    assert appended.postings == whole.postings
+
+
+def test_saved_index_of_another_format_is_rejected(frame, tmp_path):
+    path = tmp_path / 'index.json'
+    InvertedIndex.from_frame(frame, ['substance']).save(path)
+    path.write_text(path.read_text().replace('"version":1', '"version":0'))
+    with pytest.raises(ValueError, match='rebuild'):
+        InvertedIndex.load(path)
+
+
+def test_substance_index_over_the_processed_outputs(tmp_path):
+    for dataset, name in (('fda', 'processed_fda_substances.csv'), ('gras', 'processed_gras_notices.csv')):
+        save_dataset_index(dataset, PROCESSED_DIR / name, tmp_path)
+
+    result = SubstanceIndex(tmp_path).search('rebaudio', limit=None)
+    assert set(result['dataset']) == {'fda', 'gras'}
+    assert result['score'].is_monotonic_decreasing
+    # Scored hits matched on the name; the rest only on synonyms or intended use
+    named = result[result['score'] > 0]
+    assert len(named) and named['substance'].str.contains('rebaudio', case=False).all()
+
+    with pytest.raises(FileNotFoundError):
+        SubstanceIndex(tmp_path / 'missing')
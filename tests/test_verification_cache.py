@@ -0,0 +1,83 @@
+"""Section cache of DataVerifier.verify_all: which sections are reused and which are recomputed."""
+
+import json
+
+import pandas as pd
+import pytest
+
+import verify_statistics
+from verify_statistics import DataVerifier
+
+ALL_SECTIONS = set(DataVerifier.SECTIONS)
+
+
+def verify(**settings):
+    """Run verify_all and return the verifier; its timings list only the recomputed sections"""
+    verifier = DataVerifier(n_resamples=settings.pop('n_resamples', 200), **settings)
+    verifier.verify_all()
+    return verifier
+
+
+def recomputed(verifier):
+    return set(verifier.timings)
+
+
+def test_second_run_reuses_every_section(processed_tree):
+    first = verify()
+    assert recomputed(first) == ALL_SECTIONS
+
+    second = verify()
+    assert recomputed(second) == set()
+    assert json.dumps(second.results) == json.dumps(first.results)
+
+
+def test_changed_dataset_recomputes_its_readers(processed_tree):
+    verify()
+    path = processed_tree / 'processed_gras_notices.csv'
+    gras = pd.read_csv(path, dtype=str)
+    pd.concat([gras, gras.tail(1)]).to_csv(path, index=False)
+
+    verifier = verify()
+    assert recomputed(verifier) == {'gras', 'temporal_correlations', 'lagged_correlations'}
+    assert verifier.results['gras']['total'] == len(gras) + 1
+
+
+def test_changed_settings_recompute_every_section(processed_tree):
+    verify()
+    assert recomputed(verify(seed=1)) == ALL_SECTIONS
+
+
+@pytest.mark.parametrize('module, sections', [
+    ('significance', {'temporal_correlations'}),
+    ('lagged_correlation', {'lagged_correlations'}),
+    ('dataset_registry', ALL_SECTIONS),
+])
+def test_edited_module_recomputes_the_sections_using_it(processed_tree, monkeypatch, module, sections):
+    verify()
+    source = verify_statistics._module_source
+    monkeypatch.setattr(verify_statistics, '_module_source',
+                        lambda name: source(name) + '\n# edited' if name == module else source(name))
+    assert recomputed(verify()) == sections
+
+
+def test_store_runs_do_not_reuse_frame_results(processed_tree):
+    frames = DataVerifier()._section_signature('verify_fda_substances', {})
+    store = DataVerifier(use_store=True)._section_signature('verify_fda_substances', {})
+    assert frames['inputs'] == store['inputs']
+    assert frames['store'] != store['store']
+    # The store's module is part of the code when it is used
+    assert frames['code'] != store['code']
+
+
+def test_empty_results_are_not_cached(processed_tree, monkeypatch):
+    def failing_panel(self):
+        raise ValueError("no panel")
+
+    monkeypatch.setattr(DataVerifier, '_state_year_panel', failing_panel)
+    first = verify()
+    assert first.results['state_correlations'] == {}
+    cache = json.loads(first.section_cache_file.read_text())
+    assert 'state_correlations' not in cache
+
+    # Same code and inputs, but the failed section runs again
+    assert recomputed(verify()) == {'state_correlations'}
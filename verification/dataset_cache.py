@@ -0,0 +1,126 @@
+"""
+Fingerprinted binary cache of the processed datasets.
+
+Each processed CSV is parsed once into a typed, uncompressed Feather
+(Arrow IPC) file that later runs memory-map, reading only the columns
+they need. A cache entry is keyed by the source file's size, mtime and
+SHA-256 content hash plus the declared dtypes; the hash is only
+recomputed when size or mtime change, and the entry is rebuilt when the
+content really differs.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - the cache is optional
+    feather = None
+
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's content, read in blocks"""
+    digest = hashlib.sha256()
+    with Path(path).open('rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DatasetCache:
+    """Typed columnar copies of processed CSVs, rebuilt when the CSV changes"""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+
+    @property
+    def enabled(self) -> bool:
+        return feather is not None
+
+    def _paths(self, name: str):
+        return self.cache_dir / f"{name}.feather", self.cache_dir / f"{name}.json"
+
+    def _load_meta(self, name: str) -> Optional[Dict[str, Any]]:
+        _, meta_path = self._paths(name)
+        if not meta_path.exists():
+            return None
+        try:
+            return json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, name: str, meta: Dict[str, Any]) -> None:
+        _, meta_path = self._paths(name)
+        tmp_path = meta_path.with_suffix(self._tmp_suffix('.json'))
+        tmp_path.write_text(json.dumps(meta, indent=2))
+        os.replace(tmp_path, meta_path)
+
+    @staticmethod
+    def _tmp_suffix(suffix: str) -> str:
+        # Unique per writer so concurrent builds never share a temporary file
+        return f"{suffix}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    @staticmethod
+    def _spec_key(dtypes: Dict[str, Any]) -> str:
+        spec = json.dumps({col: str(dtype) for col, dtype in dtypes.items()}, sort_keys=True)
+        return hashlib.sha256(spec.encode()).hexdigest()[:16]
+
+    def fingerprint(self, name: str, csv_path: Path) -> Dict[str, Any]:
+        """Size, mtime and content hash of a CSV, reusing the stored hash when the file is untouched"""
+        stat = Path(csv_path).stat()
+        meta = self._load_meta(name)
+        if meta and meta['size'] == stat.st_size and meta['mtime_ns'] == stat.st_mtime_ns:
+            sha256 = meta['sha256']
+        else:
+            sha256 = file_sha256(csv_path)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+
+    def is_fresh(self, name: str, csv_path: Path, dtypes: Dict[str, Any]) -> bool:
+        """Whether the cached copy matches the CSV content and declared dtypes"""
+        data_path, _ = self._paths(name)
+        meta = self._load_meta(name)
+        if not meta or not data_path.exists() or meta.get('spec') != self._spec_key(dtypes):
+            return False
+
+        current = self.fingerprint(name, csv_path)
+        if current['sha256'] != meta['sha256']:
+            return False
+
+        # Same content under a new mtime: remember it so the hash is not recomputed next time
+        if current['mtime_ns'] != meta['mtime_ns']:
+            self._write_meta(name, {**meta, **current})
+        return True
+
+    def build(self, name: str, csv_path: Path, dtypes: Dict[str, Any]) -> None:
+        """Parse the whole CSV once with the declared dtypes and store it as Feather"""
+        data_path, _ = self._paths(name)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        fingerprint = self.fingerprint(name, csv_path)
+        df = pd.read_csv(csv_path, dtype=dtypes, low_memory=False)
+
+        tmp_path = data_path.with_suffix(self._tmp_suffix('.feather'))
+        feather.write_feather(df, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, data_path)
+        self._write_meta(name, {
+            'source': str(csv_path),
+            'spec': self._spec_key(dtypes),
+            'rows': len(df),
+            **fingerprint
+        })
+
+    def read(self, name: str, csv_path: Path, dtypes: Dict[str, Any],
+             columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Read columns of a dataset from the cache, rebuilding it first if the CSV changed"""
+        if not self.is_fresh(name, csv_path, dtypes):
+            print(f"Building cache for {name} from {Path(csv_path).name}...")
+            self.build(name, csv_path, dtypes)
+        data_path, _ = self._paths(name)
+        table = feather.read_table(data_path, columns=columns, memory_map=True)
+        return table.to_pandas()
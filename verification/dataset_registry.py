@@ -0,0 +1,210 @@
+"""
+Lazy dataset registry for the verification scripts.
+
+Datasets are read on first use and only the columns that the running
+verification sections declared through @requires are loaded, using the
+explicit dtypes below. Columns announced with plan() are read in the same
+pass as the first request, so each file is parsed once per run; anything
+requested later is read separately and added to the cached frame.
+
+Columns come from the first of these that is available:
+- the Arrow snapshot the processor wrote next to the CSV (snapshot.py),
+  memory-mapped and used only while it matches the CSV's fingerprint
+- the memory-mapped typed copy of an attached DatasetCache
+- the CSV text itself
+
+Loading is guarded by a lock per dataset so
+sections can run on a thread pool, and each read is recorded as a
+read:<name> stage when profiling is enabled.
+"""
+
+import functools
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from dataset_cache import DatasetCache, file_sha256
+from instrumentation import stage
+from snapshot import is_current, open_snapshot, to_pandas
+
+# Processed datasets and the dtypes of the columns the verifier reads
+DATASETS: Dict[str, Dict[str, Any]] = {
+    'fda': {
+        'file': 'processed_fda_substances.csv',
+        'dtypes': {
+            'technical_effects': str,
+            'cas_reg_no': str,
+            'approval_year': 'float64'
+        }
+    },
+    'gras': {
+        'file': 'processed_gras_notices.csv',
+        'dtypes': {
+            'fda_response': str,
+            'date_of_filing': str,
+            'date_of_closure': str,
+            'filing_year': 'float64'
+        }
+    },
+    'who': {
+        'file': 'processed_who_obesity_data.csv',
+        'dtypes': {
+            'DIM_TIME': 'float64',
+            'GEO_NAME_SHORT': str,
+            'DIM_SEX': str,
+            'RATE_PER_100_N': 'float64'
+        }
+    },
+    'cdc': {
+        'file': 'processed_cdc_obesity_data.csv',
+        'dtypes': {
+            'year': str,
+            'yearstart': 'float64',
+            'locationabbr': str,
+            'locationdesc': str,
+            'data_value': 'float64'
+        }
+    },
+    'recalls': {
+        'file': 'processed_fsis_recalls.csv',
+        'dtypes': {
+            'recall_number': str,
+            'risk_level': str,
+            'recall_reason': str,
+            'states': str,
+            'year': 'float64'
+        }
+    },
+    'fda_yearly': {
+        'file': 'fda_approvals_by_year.csv',
+        'dtypes': {
+            'year': 'float64',
+            'new_approvals': 'float64'
+        }
+    },
+    'geography': {
+        'file': 'geography_states.csv',
+        'dtypes': {
+            'state_code': 'int64',
+            'state_abbr': str,
+            'state_name': str
+        }
+    },
+    'recall_states': {
+        'file': 'recall_state_bridge.csv',
+        'dtypes': {
+            'recall_number': str,
+            'state_code': 'int64'
+        }
+    }
+}
+
+
+def requires(**columns: List[str]):
+    """Declare the dataset columns a verification section reads, loading them before it runs"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            for name, cols in columns.items():
+                self.datasets.require(name, cols)
+            return func(self, *args, **kwargs)
+        wrapper.required_columns = columns
+        return wrapper
+    return decorator
+
+
+class LazyDatasets(Mapping):
+    """Mapping of dataset name to DataFrame that reads columns on demand and caches them"""
+
+    def __init__(self, base_path: Path, specs: Dict[str, Dict[str, Any]] = DATASETS,
+                 cache: Optional[DatasetCache] = None, snapshots: bool = True):
+        self.base_path = Path(base_path)
+        self.specs = specs
+        self.cache = cache if cache is not None and cache.enabled else None
+        self.snapshots = snapshots
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._planned: Dict[str, List[str]] = {}
+        self._locks = {name: threading.Lock() for name in specs}
+
+    def path(self, name: str) -> Path:
+        """Path of the processed CSV backing a dataset"""
+        return self.base_path / self.specs[name]['file']
+
+    def fingerprint(self, name: str) -> str:
+        """Content hash of a dataset's CSV, reusing the cache's stored hash when the file is untouched"""
+        if self.cache is not None:
+            return self.cache.fingerprint(name, self.path(name))['sha256']
+        return file_sha256(self.path(name))
+
+    def _read(self, name: str, columns: List[str] = None) -> pd.DataFrame:
+        with stage(f"read:{name}") as s:
+            frame = self._load(name, columns)
+            s.rows_out = len(frame)
+        return frame
+
+    def _load(self, name: str, columns: List[str] = None) -> pd.DataFrame:
+        dtypes = self.specs[name]['dtypes']
+        try:
+            if self.snapshots and is_current(self.path(name)):
+                try:
+                    return to_pandas(open_snapshot(self.path(name), columns), dtypes)
+                except Exception as e:
+                    print(f"Warning: snapshot unusable for {name}, falling back: {e}")
+
+            if self.cache is not None:
+                try:
+                    return self.cache.read(name, self.path(name), dtypes, columns)
+                except FileNotFoundError:
+                    raise
+                except Exception as e:
+                    print(f"Warning: cache unavailable for {name}, reading CSV: {e}")
+            
+            if columns is not None:
+                dtypes = {col: dtypes[col] for col in columns if col in dtypes}
+            return pd.read_csv(self.path(name), usecols=columns, dtype=dtypes)
+        except FileNotFoundError as e:
+            print(f"Error loading datasets: {e}")
+            raise
+
+    def plan(self, name: str, columns: Iterable[str]) -> None:
+        """Announce columns that will be needed so they are read together on first access"""
+        planned = self._planned.setdefault(name, [])
+        planned.extend(col for col in columns if col not in planned)
+
+    def require(self, name: str, columns: Iterable[str]) -> pd.DataFrame:
+        """Make sure the given columns of a dataset are loaded and return the cached frame"""
+        with self._locks[name]:
+            frame = self._frames.get(name)
+            loaded = set() if frame is None else set(frame.columns)
+            missing = [col for col in columns if col not in loaded]
+            if missing:
+                missing += [
+                    col for col in self._planned.get(name, [])
+                    if col not in loaded and col not in missing
+                ]
+                loaded = self._read(name, missing)
+                frame = loaded if frame is None else pd.concat([frame, loaded], axis=1)
+                self._frames[name] = frame
+            return frame
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        if name not in self.specs:
+            raise KeyError(name)
+        with self._locks[name]:
+            if name not in self._frames:
+                # Undeclared access falls back to reading every column
+                self._frames[name] = self._read(name)
+            return self._frames[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.specs)
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+    def loaded(self) -> Dict[str, List[str]]:
+        """Columns currently held in memory for each dataset"""
+        return {name: list(frame.columns) for name, frame in self._frames.items()}
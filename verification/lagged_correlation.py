@@ -0,0 +1,90 @@
+"""
+Lagged cross-correlations between yearly metrics.
+
+Given a year × metric matrix on a contiguous year index, computes the
+Pearson correlation of every metric at year t with every metric at year
+t + lag for lags 0..max_lag. Each cell uses only the years where both
+series are present (pairwise-complete), and all cells of all lags are
+evaluated together with a handful of einsum reductions.
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Cells with fewer overlapping years than this are reported as missing
+MIN_OVERLAP = 3
+
+
+def lagged_correlation_tensor(values: np.ndarray, max_lag: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Correlation and overlap count of shape (lag, leading metric, lagging metric)"""
+    n_years, _ = values.shape
+    lags = np.arange(max_lag + 1)
+
+    # Leading values at year t and lagging values at year t + lag, NaN-padded past the end
+    t = np.arange(n_years)
+    shifted = t[None, :] + lags[:, None]
+    in_range = shifted < n_years
+    padded = np.vstack([values, np.full((1, values.shape[1]), np.nan)])
+    leading = np.where(in_range[:, :, None], values[None, :, :], np.nan)
+    lagging = padded[np.where(in_range, shifted, n_years)]
+
+    # Pairwise-complete mask over (lag, year, leading metric, lagging metric)
+    mask = (~np.isnan(leading))[:, :, :, None] & (~np.isnan(lagging))[:, :, None, :]
+    x = np.nan_to_num(leading)
+    y = np.nan_to_num(lagging)
+    m = mask.astype(float)
+
+    n = m.sum(axis=1)
+    sx = np.einsum('ltij,lti->lij', m, x)
+    sy = np.einsum('ltij,ltj->lij', m, y)
+    sxx = np.einsum('ltij,lti->lij', m, x * x)
+    syy = np.einsum('ltij,ltj->lij', m, y * y)
+    sxy = np.einsum('ltij,lti,ltj->lij', m, x, y)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covariance = n * sxy - sx * sy
+        variance = (n * sxx - sx * sx) * (n * syy - sy * sy)
+        correlation = covariance / np.sqrt(variance)
+    correlation[(n < MIN_OVERLAP) | ~(variance > 0)] = np.nan
+    return np.clip(correlation, -1.0, 1.0), n.astype(int)
+
+
+def lagged_correlations(yearly_metrics: pd.DataFrame, max_lag: int) -> Dict[str, object]:
+    """JSON-ready lagged correlation tensor for a year-indexed metrics frame"""
+    years = yearly_metrics.index.astype(int)
+    frame = yearly_metrics.reindex(range(years.min(), years.max() + 1)).astype(float)
+    correlation, overlap = lagged_correlation_tensor(frame.to_numpy(), max_lag)
+
+    metrics = list(frame.columns)
+    return {
+        'metrics': metrics,
+        'lags': list(range(max_lag + 1)),
+        'year_range': f"{years.min()}-{years.max()}",
+        'min_overlap': MIN_OVERLAP,
+        # correlation[lag][i][j] pairs metrics[i] in year t with metrics[j] in year t + lag
+        'correlation': [
+            [[None if np.isnan(r) else float(r) for r in row] for row in lag_slice]
+            for lag_slice in correlation
+        ],
+        'overlap': overlap.tolist()
+    }
+
+
+def heatmap_table(result: Dict[str, object]) -> pd.DataFrame:
+    """Long-format table with one row per (leading metric, lagging metric, lag) cell"""
+    metrics: List[str] = result['metrics']
+    rows = [
+        {
+            'leading_metric': leading,
+            'lagging_metric': lagging,
+            'lag': lag,
+            'correlation': result['correlation'][lag][i][j],
+            'overlap': result['overlap'][lag][i][j]
+        }
+        for lag in result['lags']
+        for i, leading in enumerate(metrics)
+        for j, lagging in enumerate(metrics)
+    ]
+    return pd.DataFrame(rows, columns=['leading_metric', 'lagging_metric', 'lag', 'correlation', 'overlap'])
@@ -0,0 +1,71 @@
+"""
+Resampling-based significance tests for small-sample correlations.
+
+The yearly series behind the temporal correlations have only about a
+dozen points, where the parametric Pearson p-value is unreliable. These
+helpers compute permutation p-values and bootstrap confidence intervals
+with every resample evaluated in one batched NumPy operation, so
+10k-100k resamples cost about as much as a single scipy call.
+"""
+
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+def rowwise_pearson(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Pearson correlation of each row of x with the same row of y (NaN for constant rows)"""
+    xc = x - x.mean(axis=-1, keepdims=True)
+    yc = y - y.mean(axis=-1, keepdims=True)
+    numerator = (xc * yc).sum(axis=-1)
+    denominator = np.sqrt((xc * xc).sum(axis=-1) * (yc * yc).sum(axis=-1))
+    return np.divide(numerator, denominator,
+                     out=np.full(numerator.shape, np.nan), where=denominator > 0)
+
+
+def permutation_p_value(x: np.ndarray, y: np.ndarray, n_resamples: int,
+                        rng: np.random.Generator) -> float:
+    """Two-sided permutation p-value for the Pearson correlation of x and y"""
+    xc = x - x.mean()
+    yc = y - y.mean()
+    scale = np.sqrt((xc @ xc) * (yc @ yc))
+    if scale == 0:
+        return float('nan')
+    observed = abs(xc @ yc) / scale
+
+    # Permuting y leaves its mean and norm unchanged, so every resample is one row of a matmul
+    permuted = rng.permuted(np.tile(yc, (n_resamples, 1)), axis=1)
+    resampled = np.abs(permuted @ xc) / scale
+
+    # Tolerance guards against ties lost to floating point rounding
+    hits = np.count_nonzero(resampled >= observed - 1e-12)
+    return float((hits + 1) / (n_resamples + 1))
+
+
+def bootstrap_ci(x: np.ndarray, y: np.ndarray, n_resamples: int, rng: np.random.Generator,
+                 confidence: float = 0.95) -> Dict[str, float]:
+    """Percentile bootstrap confidence interval for the Pearson correlation of x and y"""
+    indices = rng.integers(0, len(x), size=(n_resamples, len(x)))
+    resampled = rowwise_pearson(x[indices], y[indices])
+
+    # Resamples that drew a constant series have no correlation and are skipped
+    valid = resampled[~np.isnan(resampled)]
+    if valid.size == 0:
+        return {'lower': None, 'upper': None, 'confidence': confidence}
+
+    tail = (1 - confidence) / 2 * 100
+    lower, upper = np.percentile(valid, [tail, 100 - tail])
+    return {'lower': float(lower), 'upper': float(upper), 'confidence': confidence}
+
+
+def correlation_significance(x, y, n_resamples: int = 10000,
+                             seed: Optional[int] = None) -> Dict[str, Any]:
+    """Permutation p-value and bootstrap confidence interval for one pair of series"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    rng = np.random.default_rng(seed)
+    return {
+        'permutation_p_value': permutation_p_value(x, y, n_resamples, rng),
+        'bootstrap_ci': bootstrap_ci(x, y, n_resamples, rng),
+        'resamples': n_resamples
+    }
@@ -11,30 +11,76 @@ import numpy as np
 from pathlib import Path
 from datetime import datetime
 import json
-from typing import Dict, Any, List
+import argparse
+import functools
+import hashlib
+import inspect
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from scipy import stats
 
+# Shared ETL helpers live next to the processing scripts
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'etl' / 'scripts'))
+
+from dataset_cache import DatasetCache
+from dataset_registry import LazyDatasets, requires
+from lagged_correlation import heatmap_table, lagged_correlations
+from significance import correlation_significance
+from instrumentation import configure, finish, stage
+from analytics_store import AnalyticsStore
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+# Local modules that turn the processed files into frames; every section's result depends on them
+LOADING_MODULES = ('dataset_cache', 'dataset_registry', 'snapshot')
+
+@functools.lru_cache(maxsize=None)
+def _module_source(name: str) -> Optional[str]:
+    """Source of an imported module from this repository, None for third-party and standard modules"""
+    module = sys.modules.get(name)
+    path = getattr(module, '__file__', None)
+    if path is None or REPO_ROOT not in Path(path).resolve().parents:
+        return None
+    return Path(path).read_text()
+
+def _has_values(result: Any) -> bool:
+    """Whether a section result holds any value, not just empty containers"""
+    if isinstance(result, dict):
+        return any(_has_values(value) for value in result.values())
+    if isinstance(result, (list, tuple)):
+        return any(_has_values(value) for value in result)
+    return True
+
 class DataVerifier:
-    def __init__(self):
-        """Initialize paths and load datasets"""
+    # Result key and method of each verification section, in run order
+    SECTIONS = {
+        'fda': 'verify_fda_substances',
+        'gras': 'verify_gras_notices',
+        'obesity': 'verify_obesity_data',
+        'temporal_correlations': 'analyze_temporal_correlations',
+        'lagged_correlations': 'analyze_lagged_correlations',
+        'risk_patterns': 'analyze_risk_patterns',
+        'state_correlations': 'analyze_state_correlations',
+        'obesity_trends': 'analyze_obesity_trends'
+    }
+
+    def __init__(self, use_cache: bool = True, n_resamples: int = 10000, seed: int = 0,
+                 max_lag: int = 5, use_store: bool = False):
+        """Initialize paths; datasets are loaded lazily, column by column"""
         self.base_path = Path('etl/data/processed')
-        self.datasets = self._load_datasets()
+        self.cache_dir = Path('etl/data/cache')
+        cache = DatasetCache(self.cache_dir) if use_cache else None
+        self.datasets = LazyDatasets(self.base_path, cache=cache, snapshots=use_cache)
+        self.section_cache_file = self.cache_dir / 'verification_sections.json'
+        self.use_cache = use_cache
+        # With the SQLite store, the aggregating sections run as indexed SQL instead of frame scans
+        self.store = AnalyticsStore(processed_dir=self.base_path) if use_store else None
+        # Analysis parameters; they are part of every section's cache signature
+        self.settings = {'n_resamples': n_resamples, 'seed': seed, 'max_lag': max_lag}
         self.results = {}
-        
-    def _load_datasets(self) -> Dict[str, pd.DataFrame]:
-        """Load all processed datasets"""
-        try:
-            return {
-                'fda': pd.read_csv(self.base_path / 'processed_fda_substances.csv'),
-                'gras': pd.read_csv(self.base_path / 'processed_gras_notices.csv'),
-                'who': pd.read_csv(self.base_path / 'processed_who_obesity_data.csv'),
-                'cdc': pd.read_csv(self.base_path / 'processed_cdc_obesity_data.csv'),
-                'recalls': pd.read_csv(self.base_path / 'processed_fsis_recalls.csv'),
-                'fda_yearly': pd.read_csv(self.base_path / 'fda_approvals_by_year.csv')
-            }
-        except FileNotFoundError as e:
-            print(f"Error loading datasets: {e}")
-            raise
+        self.timings = {}
 
     def get_csv_headers(self) -> Dict[str, List[str]]:
         """Get headers from all CSV files in the processed directory"""
@@ -62,6 +108,7 @@ class DataVerifier:
             'memory_usage': df.memory_usage(deep=True).sum() / 1024 / 1024  # MB
         }
 
+    @requires(fda=['technical_effects', 'cas_reg_no', 'approval_year'])
     def verify_fda_substances(self) -> Dict[str, Any]:
         """Verify FDA substances statistics"""
         df = self.datasets['fda']
@@ -83,8 +130,11 @@ class DataVerifier:
             }
         }
 
+    @requires(gras=['fda_response', 'date_of_filing', 'date_of_closure', 'filing_year'])
     def verify_gras_notices(self) -> Dict[str, Any]:
         """Verify GRAS notices statistics"""
+        if self.store is not None:
+            return self._gras_summary_sql()
         df = self.datasets['gras']
         
         return {
@@ -102,8 +152,38 @@ class DataVerifier:
             }
         }
 
+    def _gras_summary_sql(self) -> Dict[str, Any]:
+        """verify_gras_notices as SQL over the store"""
+        totals = self.store.query("""
+            SELECT COUNT(*) AS total,
+                   AVG(date_of_filing IS NOT NULL) * 100 AS filing_dates,
+                   AVG(date_of_closure IS NOT NULL) * 100 AS closure_dates,
+                   MIN(filing_year) AS start, MAX(filing_year) AS end
+            FROM gras""").iloc[0]
+        responses = self.store.query("""
+            SELECT fda_response, COUNT(*) AS notices FROM gras
+            WHERE fda_response IS NOT NULL
+            GROUP BY fda_response ORDER BY notices DESC""")
+        return {
+            'total': int(totals['total']),
+            'response_distribution': {
+                str(k): int(v) for k, v in zip(responses['fda_response'], responses['notices'])
+            },
+            'validation_rates': {
+                'filing_dates': float(totals['filing_dates']),
+                'closure_dates': float(totals['closure_dates'])
+            },
+            'year_range': {
+                'start': float(totals['start']),
+                'end': float(totals['end'])
+            }
+        }
+
+    @requires(who=['DIM_TIME'], cdc=['year', 'data_value'])
     def verify_obesity_data(self) -> Dict[str, Any]:
         """Verify WHO and CDC obesity statistics"""
+        if self.store is not None:
+            return self._obesity_summary_sql()
         who_df = self.datasets['who']
         cdc_df = self.datasets['cdc']
         
@@ -137,28 +217,92 @@ class DataVerifier:
             }
         }
 
-    def analyze_temporal_correlations(self) -> Dict[str, Any]:
-        """Analyze correlations between food safety metrics and obesity rates over time"""
-        
-        # Prepare yearly metrics
-        yearly_metrics = pd.DataFrame()
-        
-        try:
+    def _obesity_summary_sql(self) -> Dict[str, Any]:
+        """verify_obesity_data as SQL over the store"""
+        who = self.store.query(
+            "SELECT COUNT(*) AS total, MIN(DIM_TIME) AS start, MAX(DIM_TIME) AS end FROM who"
+        ).iloc[0]
+        cdc = self.store.query("""
+            SELECT COUNT(*) AS total,
+                   MIN(CAST(substr(year, 1, 4) AS INTEGER)) AS start,
+                   MAX(CAST(substr(year, 1, 4) AS INTEGER)) AS end,
+                   AVG(CASE WHEN year LIKE '2011%' THEN data_value END) AS rate_2011,
+                   AVG(CASE WHEN year LIKE '2023%' THEN data_value END) AS rate_2023
+            FROM cdc""").iloc[0]
+        cdc_2011, cdc_2023 = float(cdc['rate_2011']), float(cdc['rate_2023'])
+        return {
+            'who': {
+                'total_records': int(who['total']),
+                'year_range': {'start': int(who['start']), 'end': int(who['end'])}
+            },
+            'cdc': {
+                'total_records': int(cdc['total']),
+                'year_range': {'start': int(cdc['start']), 'end': int(cdc['end'])},
+                'obesity_rates': {
+                    '2011': cdc_2011,
+                    '2023': cdc_2023,
+                    'change': cdc_2023 - cdc_2011
+                }
+            }
+        }
+
+    def _yearly_metrics(self) -> pd.DataFrame:
+        """Yearly food safety metrics and obesity rates aligned on integer calendar years"""
+        if self.store is not None:
+            metrics = self._yearly_metric_series_sql()
+        else:
             # FDA approvals by year
             fda_yearly = self.datasets['fda_yearly'].set_index('year')['new_approvals']
-            yearly_metrics['fda_approvals'] = fda_yearly
             
             # GRAS notices by year
             gras_yearly = self.datasets['gras']['filing_year'].value_counts().sort_index()
-            yearly_metrics['gras_notices'] = gras_yearly
             
             # FSIS recalls by year
             recalls_yearly = self.datasets['recalls']['year'].value_counts().sort_index()
-            yearly_metrics['recalls'] = recalls_yearly
             
-            # CDC obesity rates (average across states per year)
-            cdc_yearly = self.datasets['cdc'].groupby('year')['data_value'].mean()
-            yearly_metrics['obesity_rate'] = cdc_yearly
+            # CDC obesity rates (average across states per year; 'year' holds YYYY-01-01 dates)
+            cdc_df = self.datasets['cdc']
+            cdc_yearly = cdc_df.groupby(pd.to_datetime(cdc_df['year']).dt.year)['data_value'].mean()
+            
+            metrics = {
+                'fda_approvals': fda_yearly,
+                'gras_notices': gras_yearly,
+                'recalls': recalls_yearly,
+                'obesity_rate': cdc_yearly
+            }
+        for name, series in metrics.items():
+            series = series[series.index.notna()]
+            series.index = series.index.astype(int)
+            metrics[name] = series.astype(float)
+        
+        return pd.concat(metrics, axis=1).sort_index()
+
+    def _yearly_metric_series_sql(self) -> Dict[str, pd.Series]:
+        """The yearly series behind _yearly_metrics, each from one grouped query"""
+        queries = {
+            'fda_approvals': "SELECT year, new_approvals FROM fda_yearly",
+            'gras_notices': """
+                SELECT filing_year, COUNT(*) FROM gras
+                WHERE filing_year IS NOT NULL GROUP BY filing_year""",
+            'recalls': "SELECT year, COUNT(*) FROM recalls WHERE year IS NOT NULL GROUP BY year",
+            'obesity_rate': """
+                SELECT CAST(substr(year, 1, 4) AS INTEGER) AS cdc_year, AVG(data_value) FROM cdc
+                WHERE year IS NOT NULL GROUP BY cdc_year"""
+        }
+        metrics = {}
+        for name, sql in queries.items():
+            df = self.store.query(sql)
+            metrics[name] = df.set_index(df.columns[0])[df.columns[1]].astype(float)
+        return metrics
+
+    @requires(fda_yearly=['year', 'new_approvals'], gras=['filing_year'],
+              recalls=['year'], cdc=['year', 'data_value'])
+    def analyze_temporal_correlations(self) -> Dict[str, Any]:
+        """Analyze correlations between food safety metrics and obesity rates over time"""
+        
+        try:
+            # Prepare yearly metrics
+            yearly_metrics = self._yearly_metrics()
             
             # Calculate correlations
             correlations = {}
@@ -169,14 +313,16 @@ class DataVerifier:
                     obesity_data = yearly_metrics['obesity_rate'].dropna()
                     common_years = metric_data.index.intersection(obesity_data.index)
                     
-                    if len(common_years) > 1:  # Need at least 2 points for correlation
-                        correlation = stats.pearsonr(
-                            metric_data[common_years].astype(float),
-                            obesity_data[common_years].astype(float)
-                        )
+                    if len(common_years) > 2:  # Need at least 3 points for a meaningful test
+                        x = metric_data[common_years].to_numpy()
+                        y = obesity_data[common_years].to_numpy()
+                        correlation = stats.pearsonr(x, y)
                         correlations[metric] = {
                             'correlation': float(correlation[0]),
                             'p_value': float(correlation[1]),
+                            **correlation_significance(
+                                x, y, self.settings['n_resamples'], self.settings['seed']
+                            ),
                             'years_analyzed': len(common_years),
                             'year_range': f"{min(common_years)}-{max(common_years)}"
                         }
@@ -184,6 +330,9 @@ class DataVerifier:
                         correlations[metric] = {
                             'correlation': None,
                             'p_value': None,
+                            'permutation_p_value': None,
+                            'bootstrap_ci': None,
+                            'resamples': 0,
                             'years_analyzed': len(common_years),
                             'year_range': "Insufficient data for correlation"
                         }
@@ -193,6 +342,41 @@ class DataVerifier:
         
         return correlations
 
+    def _who_us_obesity(self) -> pd.Series:
+        """WHO adult obesity rate for the United States (both sexes) by year"""
+        who_df = self.datasets['who']
+        us = who_df[(who_df['GEO_NAME_SHORT'] == 'United States of America') & (who_df['DIM_SEX'] == 'TOTAL')]
+        yearly = us.groupby('DIM_TIME')['RATE_PER_100_N'].mean()
+        yearly.index = yearly.index.astype(int)
+        return yearly
+
+    @requires(fda_yearly=['year', 'new_approvals'], gras=['filing_year'],
+              recalls=['year'], cdc=['year', 'data_value'],
+              who=['DIM_TIME', 'GEO_NAME_SHORT', 'DIM_SEX', 'RATE_PER_100_N'])
+    def analyze_lagged_correlations(self) -> Dict[str, Any]:
+        """Correlate every yearly metric with every other at lags of 0 to max_lag years"""
+        try:
+            yearly_metrics = self._yearly_metrics()
+            yearly_metrics['who_obesity_rate'] = self._who_us_obesity()
+            return lagged_correlations(yearly_metrics, self.settings['max_lag'])
+        except Exception as e:
+            print(f"Warning: Error in lagged correlation analysis: {e}")
+            return {}
+
+    def _recall_state_pairs(self, recalls_df: pd.DataFrame) -> pd.DataFrame:
+        """One row per (recall, affected state), excluding nationwide recalls"""
+        # States are stored pipe-joined, e.g. "Texas|Ohio"
+        pairs = recalls_df[['year', 'risk_level']].assign(
+            state=recalls_df['states'].str.split('|')
+        ).explode('state')
+        pairs['state'] = pairs['state'].str.strip()
+        pairs = pairs[pairs['state'].notna() & (pairs['state'] != 'Nationwide')]
+        
+        # Categories in first-seen order keep ties in the same order as a dict count would
+        pairs['state'] = pd.Categorical(pairs['state'], categories=pd.unique(pairs['state']))
+        return pairs
+
+    @requires(recalls=['risk_level', 'recall_reason', 'states', 'year'])
     def analyze_risk_patterns(self) -> Dict[str, Any]:
         """Analyze patterns in food safety risks"""
         recalls_df = self.datasets['recalls']
@@ -204,36 +388,182 @@ class DataVerifier:
         recall_reasons = recalls_df['recall_reason'].value_counts().head(5).to_dict()
         
         # Geographic distribution
-        state_distribution = {}
-        for states in recalls_df['states'].dropna():
-            if isinstance(states, str):
-                for state in states.split('|'):  # Changed from comma to pipe since that's how we store it
-                    state = state.strip()
-                    if state != 'Nationwide':
-                        state_distribution[state] = state_distribution.get(state, 0) + 1
+        state_pairs = self._recall_state_pairs(recalls_df)
+        state_distribution = (
+            state_pairs['state'].value_counts(sort=False)
+            .sort_values(ascending=False, kind='stable')
+        )
+        state_distribution = state_distribution[state_distribution > 0]
+        
+        # Full state x year x risk level table
+        state_year_risk = (
+            state_pairs.groupby(['state', 'year', 'risk_level'], observed=True)
+            .size()
+            .reset_index(name='recalls')
+        )
         
         return {
             'risk_levels': {str(k): int(v) for k, v in risk_levels.items()},
             'top_recall_reasons': {str(k): int(v) for k, v in recall_reasons.items()},
-            'state_distribution': {k: v for k, v in sorted(state_distribution.items(), 
-                                                         key=lambda x: x[1], reverse=True)[:10]}
+            'state_distribution': {str(k): int(v) for k, v in state_distribution.head(10).items()},
+            'state_year_risk_counts': [
+                {
+                    'state': str(row.state),
+                    'year': int(row.year),
+                    'risk_level': str(row.risk_level),
+                    'recalls': int(row.recalls)
+                }
+                for row in state_year_risk.itertuples(index=False)
+            ]
         }
 
-    def analyze_obesity_trends(self) -> Dict[str, Any]:
-        """Analyze detailed obesity trends"""
+    def _state_year_panel(self) -> pd.DataFrame:
+        """Recall counts next to mean CDC obesity rate for every state and year both cover"""
+        if self.store is not None:
+            return self._state_year_panel_sql()
+        geography = self.datasets['geography']
+        states = geography.loc[geography['state_code'] > 0, ['state_code', 'state_abbr']]
+        
+        # CDC rows join the geography dimension on the abbreviation once, everything else on state_code
         cdc_df = self.datasets['cdc']
+        cdc = cdc_df.assign(year=pd.to_datetime(cdc_df['year']).dt.year).merge(
+            states, left_on='locationabbr', right_on='state_abbr'
+        )
+        obesity = (
+            cdc.groupby(['state_code', 'year'])['data_value'].mean()
+            .dropna()
+            .rename('obesity_rate')
+        )
         
+        # The bridge holds one row per recall and affected state (nationwide recalls are code 0)
+        recalls_df = self.datasets['recalls'][['recall_number', 'year']].dropna()
+        bridge = self.datasets['recall_states']
+        pairs = bridge[bridge['state_code'] > 0].merge(recalls_df, on='recall_number')
+        recalls = (
+            pairs.groupby(['state_code', pairs['year'].astype(int)])
+            .size()
+            .rename('recalls')
+        )
+        
+        # A state-year without recalls counts as zero, but only within the years the recall data covers
+        panel = obesity.to_frame().join(recalls, how='left')
+        years = panel.index.get_level_values('year')
+        panel = panel[(years >= recalls_df['year'].min()) & (years <= recalls_df['year'].max())]
+        panel['recalls'] = panel['recalls'].fillna(0).astype(float)
+        return panel.reset_index().merge(states, on='state_code')
+
+    def _state_year_panel_sql(self) -> pd.DataFrame:
+        """_state_year_panel as one query joining on the indexed state_code and recall_number"""
+        return self.store.query("""
+            WITH obesity AS (
+                SELECT g.state_code, g.state_abbr,
+                       CAST(substr(c.year, 1, 4) AS INTEGER) AS year,
+                       AVG(c.data_value) AS obesity_rate
+                FROM cdc c JOIN geography g ON g.state_abbr = c.locationabbr
+                WHERE g.state_code > 0
+                GROUP BY g.state_code, CAST(substr(c.year, 1, 4) AS INTEGER)
+                HAVING AVG(c.data_value) IS NOT NULL
+            ),
+            covered AS (
+                SELECT MIN(year) AS first_year, MAX(year) AS last_year FROM recalls
+                WHERE recall_number IS NOT NULL AND year IS NOT NULL
+            ),
+            state_recalls AS (
+                SELECT rs.state_code, CAST(r.year AS INTEGER) AS year, COUNT(*) AS recalls
+                FROM recall_states rs JOIN recalls r ON r.recall_number = rs.recall_number
+                WHERE rs.state_code > 0 AND r.year IS NOT NULL
+                GROUP BY rs.state_code, CAST(r.year AS INTEGER)
+            )
+            SELECT o.state_code, o.year, o.obesity_rate,
+                   CAST(COALESCE(s.recalls, 0) AS REAL) AS recalls, o.state_abbr
+            FROM obesity o
+            CROSS JOIN covered
+            LEFT JOIN state_recalls s ON s.state_code = o.state_code AND s.year = o.year
+            WHERE o.year BETWEEN covered.first_year AND covered.last_year
+            ORDER BY o.state_code, o.year""")
+
+    @requires(recalls=['recall_number', 'year'], recall_states=['recall_number', 'state_code'],
+              geography=['state_code', 'state_abbr'], cdc=['year', 'data_value', 'locationabbr'])
+    def analyze_state_correlations(self) -> Dict[str, Any]:
+        """Per-state correlation of recall counts with obesity rates, and trend slopes of both"""
         try:
+            panel = self._state_year_panel()
+            if panel.empty:
+                return {}
+            
+            # Sufficient statistics per state from a single grouped sum
+            t = panel['year'] - panel['year'].mean()
+            x, y = panel['recalls'], panel['obesity_rate']
+            sums = pd.DataFrame({
+                'n': 1.0, 't': t, 'x': x, 'y': y,
+                'tt': t * t, 'xx': x * x, 'yy': y * y,
+                'xy': x * y, 'tx': t * x, 'ty': t * y
+            }).groupby(panel['state_code']).sum()
+            
+            n = sums['n']
+            var_t = n * sums['tt'] - sums['t'] ** 2
+            var_x = n * sums['xx'] - sums['x'] ** 2
+            var_y = n * sums['yy'] - sums['y'] ** 2
+            cov_xy = n * sums['xy'] - sums['x'] * sums['y']
+            
+            stats_by_state = pd.DataFrame({
+                'years': n.astype(int),
+                'correlation': (cov_xy / np.sqrt(var_x * var_y)).clip(-1.0, 1.0)
+                               .where((var_x > 0) & (var_y > 0) & (n >= 3)),
+                'recall_slope': ((n * sums['tx'] - sums['t'] * sums['x']) / var_t).where(var_t > 0),
+                'obesity_slope': ((n * sums['ty'] - sums['t'] * sums['y']) / var_t).where(var_t > 0),
+                'total_recalls': sums['x'].astype(int)
+            })
+            
+            state_abbr = panel.drop_duplicates('state_code').set_index('state_code')['state_abbr']
+            correlated = stats_by_state['correlation'].dropna()
+            return {
+                'states_analyzed': int(len(stats_by_state)),
+                'states_with_correlation': int(len(correlated)),
+                'year_range': f"{panel['year'].min()}-{panel['year'].max()}",
+                'mean_correlation': float(correlated.mean()) if len(correlated) else None,
+                'positive_correlations': int((correlated > 0).sum()),
+                'negative_correlations': int((correlated < 0).sum()),
+                'by_state': {
+                    str(state_abbr[state]): {
+                        key: (None if pd.isna(value) else value)
+                        for key, value in {
+                            'years': int(row.years),
+                            'correlation': float(row.correlation),
+                            'recall_slope': float(row.recall_slope),
+                            'obesity_slope': float(row.obesity_slope),
+                            'total_recalls': int(row.total_recalls)
+                        }.items()
+                    }
+                    for state, row in stats_by_state.iterrows()
+                }
+            }
+        except Exception as e:
+            print(f"Warning: Error in state correlation analysis: {e}")
+            return {}
+
+    @requires(cdc=['year', 'data_value', 'locationabbr'])
+    def analyze_obesity_trends(self) -> Dict[str, Any]:
+        """Analyze detailed obesity trends"""
+        try:
+            if self.store is not None:
+                yearly_rates, state_rates = self._obesity_rates_sql()
+            else:
+                cdc_df = self.datasets['cdc']
+                
+                # Calculate yearly mean rates
+                yearly_rates = cdc_df.groupby('year')['data_value'].mean()
+                
+                # Find states with highest/lowest rates
+                latest_year = cdc_df['year'].max()
+                latest_data = cdc_df[cdc_df['year'] == latest_year]
+                
+                # Group by state (locationabbr) and get mean values
+                state_rates = latest_data.groupby('locationabbr')['data_value'].mean()
+            
             # Calculate year-over-year changes
-            yearly_rates = cdc_df.groupby('year')['data_value'].mean()
             yoy_changes = yearly_rates.pct_change() * 100
             
-            # Find states with highest/lowest rates
-            latest_year = cdc_df['year'].max()
-            latest_data = cdc_df[cdc_df['year'] == latest_year]
-            
-            # Group by state (locationabbr) and get mean values
-            state_rates = latest_data.groupby('locationabbr')['data_value'].mean()
             highest_states = state_rates.nlargest(5)
             lowest_states = state_rates.nsmallest(5)
             
@@ -253,6 +583,18 @@ class DataVerifier:
                 'state_extremes': {'highest': {}, 'lowest': {}}
             }
 
+    def _obesity_rates_sql(self) -> Tuple[pd.Series, pd.Series]:
+        """Mean CDC rate by year, and by state in the latest year, as grouped queries"""
+        yearly = self.store.query("""
+            SELECT year, AVG(data_value) AS rate FROM cdc
+            WHERE year IS NOT NULL GROUP BY year ORDER BY year""")
+        states = self.store.query("""
+            SELECT locationabbr, AVG(data_value) AS rate FROM cdc
+            WHERE year = (SELECT MAX(year) FROM cdc) AND locationabbr IS NOT NULL
+            GROUP BY locationabbr ORDER BY locationabbr""")
+        return (yearly.set_index('year')['rate'].astype(float),
+                states.set_index('locationabbr')['rate'].astype(float))
+
     def generate_markdown_report(self) -> str:
         """Generate markdown report with all statistics"""
         template = """# Data Verification Report
@@ -329,38 +671,161 @@ Generated: {timestamp}
         
         return template.format(**format_values)
 
-    def verify_all(self) -> None:
-        """Run all verifications and store results"""
+    def _code_fingerprint(self, method_name: str) -> str:
+        """Hash of a section's source, the private helpers it calls and the local modules they use"""
+        digest = hashlib.sha256()
+        modules = set(LOADING_MODULES) | ({'analytics_store'} if self.store is not None else set())
+        pending, seen = [method_name], set()
+        while pending:
+            name = pending.pop()
+            if name in seen or not hasattr(self, name):
+                continue
+            seen.add(name)
+            source = inspect.getsource(inspect.unwrap(getattr(self, name)))
+            digest.update(source.encode())
+            pending.extend(re.findall(r'self\.(_\w+)\(', source))
+            # Functions imported from this repository, e.g. correlation_significance
+            for called in re.findall(r'(?<![\w.])(\w+)\(', source):
+                module = getattr(globals().get(called), '__module__', None)
+                if module is not None and _module_source(module) is not None:
+                    modules.add(module)
+        for module in sorted(modules):
+            digest.update(_module_source(module).encode())
+        return digest.hexdigest()
+
+    def _section_signature(self, method_name: str, fingerprints: Dict[str, str]) -> Dict[str, Any]:
+        """Everything a section's result depends on: its code and the datasets it reads"""
+        required = getattr(getattr(self, method_name), 'required_columns', {})
+        inputs = {}
+        for name in sorted(required):
+            if name not in fingerprints:
+                fingerprints[name] = self.datasets.fingerprint(name)
+            inputs[name] = fingerprints[name]
+        return {
+            'code': self._code_fingerprint(method_name),
+            'inputs': inputs,
+            'settings': self.settings,
+            # SQL and pandas results differ in float rounding, so neither reuses the other's
+            'store': self.store is not None
+        }
+
+    def _load_section_cache(self) -> Dict[str, Any]:
+        """Results and signatures of the sections computed by previous runs"""
+        if not self.section_cache_file.exists():
+            return {}
+        try:
+            return json.loads(self.section_cache_file.read_text())
+        except ValueError:
+            return {}
+
+    def run_section(self, key: str) -> Tuple[Any, float]:
+        """Run one verification section, returning its result and wall time in seconds"""
+        start = time.perf_counter()
+        with stage(f"section:{key}"):
+            result = getattr(self, self.SECTIONS[key])()
+        return result, time.perf_counter() - start
+
+    def _run_sections(self, keys: List[str], workers: int, executor: str) -> Dict[str, Tuple[Any, float]]:
+        """Run sections sequentially or on a pool, gathering results in section order"""
+        if workers <= 1 or len(keys) <= 1:
+            return {key: self.run_section(key) for key in keys}
+        
+        if executor == 'process':
+            # Each worker process builds its own verifier and loads only its section's columns
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    key: pool.submit(_run_section_in_process, self.use_cache, self.settings, key,
+                                     self.store is not None)
+                    for key in keys
+                }
+                return {key: futures[key].result() for key in keys}
+        
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {key: pool.submit(self.run_section, key) for key in keys}
+            return {key: futures[key].result() for key in keys}
+
+    def print_timings(self) -> None:
+        """Print the wall time of every section"""
+        print("\nSection timings:")
+        for key in self.SECTIONS:
+            seconds = self.timings.get(key)
+            print(f"  {key:<24} {'cached' if seconds is None else f'{seconds:8.3f}s'}")
+
+    def verify_all(self, force: bool = False, workers: int = 1, executor: str = 'thread') -> None:
+        """Run all verifications and store results, reusing sections whose inputs are unchanged"""
         print("Starting enhanced verification process...")
         
-        # Run existing verifications
-        self.results = {
-            'fda': self.verify_fda_substances(),
-            'gras': self.verify_gras_notices(),
-            'obesity': self.verify_obesity_data()
+        if self.store is not None:
+            with stage('store_refresh'):
+                reloaded = self.store.refresh()
+            print(f"SQLite store: {self.store.path} (reloaded: {', '.join(reloaded) or 'none'})")
+        
+        # Decide which sections need recomputing
+        cache = {} if force else self._load_section_cache()
+        fingerprints = {}
+        signatures = {
+            key: self._section_signature(method_name, fingerprints)
+            for key, method_name in self.SECTIONS.items()
         }
+        stale = [key for key in self.SECTIONS if cache.get(key, {}).get('signature') != signatures[key]]
         
-        # Add new analyses
-        self.results.update({
-            'temporal_correlations': self.analyze_temporal_correlations(),
-            'risk_patterns': self.analyze_risk_patterns(),
-            'obesity_trends': self.analyze_obesity_trends()
-        })
+        # Announce stale sections' columns so each dataset is parsed only once
+        for key in stale:
+            required = getattr(getattr(self, self.SECTIONS[key]), 'required_columns', {})
+            for name, columns in required.items():
+                self.datasets.plan(name, columns)
         
-        # Generate enhanced report
-        report = self.generate_enhanced_report()
-        report_path = Path('verification/verification_report.md')
-        report_path.parent.mkdir(exist_ok=True)
-        report_path.write_text(report)
+        # Run stale verifications and analyses; datasets load on first use
+        computed = self._run_sections(stale, workers, executor)
+        self.results, self.timings = {}, {}
+        for key in self.SECTIONS:
+            if key in computed:
+                self.results[key], self.timings[key] = computed[key]
+                if _has_values(self.results[key]):
+                    cache[key] = {'signature': signatures[key], 'result': self.results[key]}
+                else:
+                    # Sections return empty results when they fail; run them again next time
+                    cache.pop(key, None)
+            else:
+                self.results[key] = cache[key]['result']
+        
+        reused = [key for key in self.SECTIONS if key not in stale]
+        print(f"Recomputed sections: {', '.join(stale) or 'none'}")
+        print(f"Reused cached sections: {', '.join(reused) or 'none'}")
+        self.print_timings()
         
-        # Save raw results
+        report_path = Path('verification/verification_report.md')
         results_path = Path('verification/verification_results.json')
-        with results_path.open('w') as f:
-            json.dump(self.results, f, indent=2)
+        lagged_path = Path('verification/lagged_correlations.csv')
+        if not stale and report_path.exists() and results_path.exists():
+            # Mark the outputs as checked, for timestamp-based tools like run-pipeline.py
+            for path in (report_path, results_path, lagged_path):
+                if path.exists():
+                    path.touch()
+            print("\nAll inputs unchanged, existing report is up to date")
+            return
+        
+        self.section_cache_file.parent.mkdir(parents=True, exist_ok=True)
+        self.section_cache_file.write_text(json.dumps(cache))
+        
+        with stage('write'):
+            # Generate enhanced report
+            report = self.generate_enhanced_report()
+            report_path.parent.mkdir(exist_ok=True)
+            report_path.write_text(report)
+            
+            # Save raw results
+            with results_path.open('w') as f:
+                json.dump(self.results, f, indent=2)
+            
+            # Save the lagged correlations as a long table for heatmaps
+            if self.results.get('lagged_correlations'):
+                heatmap_table(self.results['lagged_correlations']).to_csv(lagged_path, index=False)
         
         print(f"\nEnhanced verification complete!")
         print(f"Report saved to: {report_path}")
         print(f"Raw results saved to: {results_path}")
+        print(f"Lagged correlations saved to: {lagged_path}")
 
     def generate_enhanced_report(self) -> str:
         """Generate enhanced markdown report with correlation analysis"""
@@ -391,13 +856,37 @@ Generated: {timestamp}
                 continue
             correlation = data.get('correlation')
             p_value = data.get('p_value')
+            permutation_p = data.get('permutation_p_value')
+            ci = data.get('bootstrap_ci') or {}
             correlation_section += f"""
 #### {metric.replace('_', ' ').title()} vs Obesity Rate
 - Correlation Coefficient: {f"{correlation:.3f}" if correlation is not None else "Insufficient data"}
 - Statistical Significance (p-value): {f"{p_value:.3f}" if p_value is not None else "Not applicable"}
+- Permutation p-value ({data.get('resamples', 0):,} resamples): {f"{permutation_p:.4f}" if permutation_p is not None else "Not applicable"}
+- Bootstrap {ci.get('confidence', 0.95):.0%} CI: {f"[{ci['lower']:.3f}, {ci['upper']:.3f}]" if ci.get('lower') is not None else "Not applicable"}
 - Time Period Analyzed: {data.get('year_range', 'Unknown')} ({data.get('years_analyzed', 0)} years)
 """
 
+        lagged = self.results.get('lagged_correlations', {})
+        if lagged:
+            correlation_section += f"""
+### Lagged Correlations ({lagged['year_range']}, lags 0-{lagged['lags'][-1]} years)
+
+Strongest associations between a food safety metric and a later obesity rate:
+"""
+            cells = heatmap_table(lagged)
+            cells = cells[
+                ~cells['leading_metric'].str.contains('obesity')
+                & cells['lagging_metric'].str.contains('obesity')
+                & cells['correlation'].notna()
+            ]
+            strongest = cells.reindex(cells['correlation'].abs().sort_values(ascending=False).index).head(10)
+            for row in strongest.itertuples():
+                correlation_section += (
+                    f"- {row.leading_metric} -> {row.lagging_metric} (+{row.lag}y): "
+                    f"r = {row.correlation:.3f} over {row.overlap} years\n"
+                )
+
         risk_section = """
 ## Food Safety Risk Analysis
 
@@ -410,6 +899,27 @@ Generated: {timestamp}
         for reason, count in risk_patterns.get('top_recall_reasons', {}).items():
             risk_section += f"- {reason}: {count:,}\n"
 
+        state_correlations = self.results.get('state_correlations', {})
+        if state_correlations:
+            mean_correlation = state_correlations.get('mean_correlation')
+            risk_section += f"""
+### State-Level Recalls vs Obesity ({state_correlations['year_range']})
+- States Analyzed: {state_correlations['states_analyzed']} ({state_correlations['states_with_correlation']} with enough data for a correlation)
+- Mean Correlation: {f"{mean_correlation:.3f}" if mean_correlation is not None else "Insufficient data"}
+- Positive / Negative Correlations: {state_correlations['positive_correlations']} / {state_correlations['negative_correlations']}
+"""
+            by_state = {
+                state: data for state, data in state_correlations['by_state'].items()
+                if data['correlation'] is not None
+            }
+            strongest = sorted(by_state.items(), key=lambda item: abs(item[1]['correlation']), reverse=True)
+            for state, data in strongest[:5]:
+                risk_section += (
+                    f"- {state}: r = {data['correlation']:.3f}, "
+                    f"obesity trend {data['obesity_slope']:+.2f} pts/year, "
+                    f"recall trend {data['recall_slope']:+.2f}/year\n"
+                )
+
         obesity_section = """
 ## Detailed Obesity Analysis
 
@@ -425,14 +935,44 @@ Generated: {timestamp}
         # Combine all sections
         return report + headers_section + correlation_section + risk_section + obesity_section
 
+def _run_section_in_process(use_cache: bool, settings: Dict[str, Any], key: str,
+                            use_store: bool = False) -> Tuple[Any, float]:
+    """Process pool entry point: run a single section in a fresh verifier"""
+    return DataVerifier(use_cache=use_cache, use_store=use_store, **settings).run_section(key)
+
 def main():
     """Main execution function"""
+    parser = argparse.ArgumentParser(description="Verify processed datasets and generate reports")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="read the processed CSVs directly instead of their snapshots or the binary cache")
+    parser.add_argument('--force', action='store_true',
+                        help="recompute every section even if its inputs are unchanged")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of sections to run in parallel (default: 1)")
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread',
+                        help="pool type used when --workers is greater than 1")
+    parser.add_argument('--resamples', type=int, default=10000,
+                        help="permutation and bootstrap resamples per correlation (default: 10000)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="random seed for the resampling tests (default: 0)")
+    parser.add_argument('--max-lag', type=int, default=5,
+                        help="largest lag in years for the lagged correlations (default: 5)")
+    parser.add_argument('--store', action='store_true',
+                        help="run the aggregating sections as SQL over the SQLite store (refreshed first)")
+    parser.add_argument('--profile', action='store_true',
+                        help="record stage timings and memory (also enabled by ETL_PROFILE=1)")
+    args = parser.parse_args()
+    
+    configure('verification', args.profile)
     try:
-        verifier = DataVerifier()
-        verifier.verify_all()
+        verifier = DataVerifier(use_cache=not args.no_cache, n_resamples=args.resamples, seed=args.seed,
+                                max_lag=args.max_lag, use_store=args.store)
+        verifier.verify_all(force=args.force, workers=args.workers, executor=args.executor)
     except Exception as e:
         print(f"Error during verification: {e}")
         raise
+    finally:
+        finish()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file